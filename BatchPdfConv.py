@@ -1,11 +1,26 @@
 import os
 import sys
+import argparse
 import base64
 import csv
+import glob
+import hashlib
+import json
+import socket
+import threading
 import time
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pymupdf
 from mistralai import Mistral
 from dotenv import load_dotenv
+from app.services.cpu_tasks import pdf_page_count
+from app.services.export_renderer import assemble_markdown
+from app.services.ocr_clients import OCRClientPool, key_name, parse_api_keys
+from app.services.page_corpus import CorpusReader, CorpusWriter
+from app.services.page_pruning import find_prunable_pages
+from app.services.raw_archive import ARCHIVE_SUFFIX, append_pages, render_archive
+from app.services.text_layer import analyze_text_layer
 load_dotenv() 
 
 
@@ -16,6 +31,33 @@ DB_CSV = "processed_files.csv"
 LOG_FILE = "conversion.log"
 MAX_RETRIES = 5
 INITIAL_BACKOFF = 1  # in seconds
+REQUEST_INTERVAL = 3  # seconds a worker waits after each converted file (or pack) when KEY_REQUESTS_PER_SECOND is 0
+CONVERT_WORKERS = 0  # files (or packs) converted at the same time, 0 for one per API key
+TEXT_LAYER_FAST_PATH = True  # extract born-digital pages locally instead of OCR
+TEXT_LAYER_MIN_CHARS = 50
+PAGE_PRUNING = False  # skip OCR of blank pages and exact repeats of another page
+PAGE_BLANK_INK_RATIO = 0.00005
+PAGE_PRUNING_DPI = 72
+OCR_CHUNK_PAGES = 16  # pages per OCR request, each checkpointed (0 = whole document)
+CHECKPOINT_DIR = os.path.join(EXPORT_DIR, ".checkpoints")
+ARCHIVE_RAW = True  # keep the raw OCR response pages, so output can be rebuilt with --rerender
+RAW_DIR = os.path.join(EXPORT_DIR, ".raw")
+CLAIM_DIR = os.path.join(DOC_DIR, ".claims")  # must be on the mount shared by all nodes
+MANIFEST_DIR = os.path.join(EXPORT_DIR, ".manifests")
+SHARD_REPORT = os.path.join(EXPORT_DIR, "shard_report.csv")
+CLAIM_HEARTBEAT = 60  # seconds between refreshes of the claims a node holds
+CLAIM_TTL = 600  # claims not refreshed for this long belong to a dead node
+OUTPUT_FORMAT = "md"  # "md" for one file per PDF, or "jsonl"/"parquet" page shards in CORPUS_DIR
+CORPUS_DIR = os.path.join(EXPORT_DIR, "corpus")
+CORPUS_SHARD_BYTES = 256 * 1024 * 1024
+UPLOAD_ONCE = True  # upload each PDF to Mistral file storage once instead of sending it with every request
+SIGNED_URL_HOURS = 24
+PACK_SMALL_PDFS = False  # OCR PDFs of at most PACK_FILE_MAX_PAGES pages together, one request per pack
+PACK_FILE_MAX_PAGES = 2
+PACK_MAX_PAGES = 50  # pages per pack
+PACK_MAX_BYTES = 20 * 1024 * 1024  # combined PDF size per pack, sent inline
+KEY_REQUESTS_PER_SECOND = 0  # per API key, 0 for no client-side limit; paces the workers instead of REQUEST_INTERVAL
+KEY_QUARANTINE_SECONDS = 30  # how long a throttled or failing key is left out
 
 # Initialize logging
 logging.basicConfig(
@@ -32,8 +74,26 @@ if not API_KEY:
 
 client = Mistral(api_key=API_KEY)
 
+# OCR requests are spread over MISTRAL_API_KEY and the comma-separated
+# MISTRAL_EXTRA_API_KEYS; uploads use the first key, whose signed URLs any key can fetch
+API_KEYS = parse_api_keys(API_KEY, os.getenv("MISTRAL_EXTRA_API_KEYS", ""))
+ocr_client = OCRClientPool(
+    [(key_name(index, api_key), client if index == 0 else Mistral(api_key=api_key))
+     for index, api_key in enumerate(API_KEYS)],
+    requests_per_second=KEY_REQUESTS_PER_SECOND,
+    quarantine_seconds=KEY_QUARANTINE_SECONDS
+)
+
 FIELDNAMES = ['filename', 'status', 'attempts', 'error']
 
+corpus_writer = None  # opened on first use when OUTPUT_FORMAT is not "md"
+
+# PDF filename -> (file ID, signed URL, expiry timestamp) of uploaded files
+uploaded_files = {}
+
+# Serializes the CSV database, manifests and page shards between conversion workers
+output_lock = threading.Lock()
+
 
 def ensure_export_directory():
     """Ensure the export directory exists."""
@@ -55,12 +115,13 @@ def load_processed():
 
 def append_to_db(record):
     """Append a processing record to the CSV database."""
-    file_exists = os.path.exists(DB_CSV)
-    with open(DB_CSV, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(record)
+    with output_lock:
+        file_exists = os.path.exists(DB_CSV)
+        with open(DB_CSV, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow(record)
 
 
 def get_pdf_files():
@@ -90,38 +151,492 @@ def encode_pdf(pdf_path):
         return None
 
 
-def convert_pdf_to_markdown(pdf_filename):
-    """Perform OCR on the PDF and write the output as a markdown file in the export directory."""
+def get_document_url(pdf_filename, full_path):
+    """Return the URL OCR requests fetch the PDF from.
+
+    With UPLOAD_ONCE the PDF is uploaded on the first attempt and every later
+    attempt reuses its signed URL; otherwise the PDF is sent inline.
+    """
+    if not UPLOAD_ONCE:
+        b64 = encode_pdf(full_path)
+        if not b64:
+            raise RuntimeError("PDF encoding failed.")
+        return f"data:application/pdf;base64,{b64}"
+
+    cached = uploaded_files.get(pdf_filename)
+    if cached and cached[2] > time.time() + 600:
+        return cached[1]
+    if cached:
+        file_id = cached[0]
+    else:
+        with open(full_path, "rb") as pdf_file:
+            file_id = client.files.upload(
+                file={"file_name": os.path.basename(pdf_filename), "content": pdf_file},
+                purpose="ocr"
+            ).id
+        logging.info(f"Uploaded {pdf_filename} as file {file_id}")
+    signed = client.files.get_signed_url(file_id=file_id, expiry=SIGNED_URL_HOURS)
+    uploaded_files[pdf_filename] = (file_id, signed.url, time.time() + SIGNED_URL_HOURS * 3600)
+    return signed.url
+
+
+def release_upload(pdf_filename):
+    """Delete the uploaded copy of a PDF once it is no longer needed."""
+    cached = uploaded_files.pop(pdf_filename, None)
+    if cached:
+        try:
+            client.files.delete(file_id=cached[0])
+        except Exception as e:
+            logging.warning(f"Failed to delete uploaded file {cached[0]}: {e}")
+
+
+def detect_text_pages(pdf_path):
+    """Return the page count and the markdown of pages with a usable text layer.
+
+    The page count is None when the PDF could not be analyzed, in which case
+    the whole document goes to OCR.
+    """
+    try:
+        pages = analyze_text_layer(pdf_path, TEXT_LAYER_MIN_CHARS)
+    except Exception as e:
+        logging.warning(f"Text layer pre-pass failed for {pdf_path}: {e}")
+        return None, {}
+    return len(pages), {page.index: page.markdown for page in pages if page.usable}
+
+
+def prune_pages(pdf_path, page_indices):
+    """Return the blank pages and a map of duplicate page to the page it repeats."""
+    try:
+        pruned = find_prunable_pages(pdf_path, page_indices, PAGE_BLANK_INK_RATIO, PAGE_PRUNING_DPI)
+    except Exception as e:
+        logging.warning(f"Page pruning failed for {pdf_path}: {e}")
+        return [], {}
+    blank = [index for index, page in pruned.items() if page.reason == 'blank']
+    duplicates = {index: page.duplicate_of for index, page in pruned.items() if page.reason == 'duplicate'}
+    return blank, duplicates
+
+
+def checkpoint_path(pdf_filename):
+    """Path of the page checkpoint of a PDF, mirroring its place under DOC_DIR."""
+    return os.path.join(CHECKPOINT_DIR, pdf_filename.rsplit('.', 1)[0] + '.pages.jsonl')
+
+
+def load_checkpoint(pdf_filename):
+    """Load the pages stored by earlier attempts, keyed by page index."""
+    pages = {}
+    path = checkpoint_path(pdf_filename)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as checkpoint:
+            for line in checkpoint:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # line cut short by a crash
+                pages[record['index']] = record
+    return pages
+
+
+def save_checkpoint(pdf_filename, records):
+    """Append page records to the checkpoint of a PDF."""
+    path = checkpoint_path(pdf_filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as checkpoint:
+        for record in records:
+            checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def raw_archive_path(pdf_filename):
+    """Path of the raw OCR archive of a PDF, mirroring its place under DOC_DIR."""
+    return os.path.join(RAW_DIR, pdf_filename.rsplit('.', 1)[0] + ARCHIVE_SUFFIX)
+
+
+def archive_pages(pdf_filename, pages, source='ocr', index_offset=0):
+    """Append pages to the raw archive of a PDF; a failure only loses the archive."""
+    if not ARCHIVE_RAW or not pages:
+        return
+    try:
+        append_pages(raw_archive_path(pdf_filename), pages, source=source, index_offset=index_offset,
+                     model="mistral-ocr-latest")
+    except Exception as e:
+        logging.warning(f"Failed to archive raw pages of {pdf_filename}: {e}")
+
+
+def get_corpus_writer(prefix="0"):
+    """Open the page shard writer on first use."""
+    global corpus_writer
+    if corpus_writer is None:
+        corpus_writer = CorpusWriter(CORPUS_DIR, OUTPUT_FORMAT, prefix=prefix, max_shard_bytes=CORPUS_SHARD_BYTES)
+    return corpus_writer
+
+
+def close_corpus_writer():
+    global corpus_writer
+    if corpus_writer is not None:
+        corpus_writer.close()
+        corpus_writer = None
+
+
+def materialize_markdown(sources):
+    """Write .md files for documents stored in the page shards (all of them if none are given)."""
+    reader = CorpusReader(CORPUS_DIR)
+    for source in sources or reader.sources():
+        output_path = reader.materialize(source.replace(os.sep, '/'), EXPORT_DIR)
+        if output_path:
+            print(f"Saved markdown file: {output_path}")
+        else:
+            print(f"Not in the corpus: {source}")
+
+
+def convert_pdf_to_markdown(pdf_filename, attempt=1):
+    """Perform OCR on the PDF and write the output as a markdown file in the export directory.
+
+    Pages are checkpointed as each OCR request returns, so a retry (or a later
+    run of the script) only sends the pages that are still missing.
+    """
     full_path = os.path.join(DOC_DIR, pdf_filename)
-    b64 = encode_pdf(full_path)
-    if not b64:
-        raise RuntimeError("PDF encoding failed.")
-
-    # Call Mistral OCR
-    response = client.ocr.process(
-        model="mistral-ocr-latest",
-        document={
-            "type": "document_url",
-            "document_url": f"data:application/pdf;base64,{b64}"
-        },
-        include_image_base64=False
-    )
-
-    # Create output directory structure
-    output_name = pdf_filename.rsplit('.', 1)[0] + '.md'
-    output_path = os.path.join(EXPORT_DIR, output_name)
-    
-    # Ensure the output directory exists
-    output_dir = os.path.dirname(output_path)
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    with open(output_path, 'w', encoding='utf-8') as md_file:
-        for page in response.pages:
-            md_file.write(f"## Page {page.index + 1}\n\n")
-            md_file.write(page.markdown + "\n\n")
-    
-    print(f"Saved markdown file: {output_path}")
+
+    # Pages with a usable embedded text layer skip OCR entirely
+    page_count, text_pages = None, {}
+    if TEXT_LAYER_FAST_PATH:
+        page_count, text_pages = detect_text_pages(full_path)
+    if page_count is None:
+        # Counted anyway, so resume, chunking and pruning only send the missing pages
+        try:
+            page_count = pdf_page_count(full_path)
+        except Exception as e:
+            logging.warning(f"Cannot count the pages of {pdf_filename}, sending the whole document: {e}")
+
+    pages = load_checkpoint(pdf_filename)
+    resumed = len(pages)
+    new_text_pages = [
+        {'index': index, 'source': 'text_layer', 'markdown': markdown, 'attempt': attempt, 'seconds': 0}
+        for index, markdown in text_pages.items() if index not in pages
+    ]
+    save_checkpoint(pdf_filename, new_text_pages)
+    archive_pages(pdf_filename, [
+        {'index': record['index'], 'markdown': record['markdown']} for record in new_text_pages
+    ], source='text_layer')
+    pages.update((record['index'], record) for record in new_text_pages)
+
+    duplicates = {}
+    if page_count is None:
+        ocr_chunks = [None]  # Unknown layout, send the whole document
+    else:
+        missing = [index for index in range(page_count) if index not in pages]
+        if PAGE_PRUNING and missing:
+            # Blank pages are stored empty, repeats get their original's markdown after OCR
+            blank, duplicates = prune_pages(full_path, missing)
+            records = [
+                {'index': index, 'source': 'blank', 'markdown': '', 'attempt': attempt, 'seconds': 0}
+                for index in blank
+            ]
+            save_checkpoint(pdf_filename, records)
+            archive_pages(pdf_filename, [{'index': index, 'markdown': ''} for index in blank], source='blank')
+            pages.update((record['index'], record) for record in records)
+            missing = [index for index in missing if index not in pages and index not in duplicates]
+        if OCR_CHUNK_PAGES > 0:
+            ocr_chunks = [missing[i:i + OCR_CHUNK_PAGES] for i in range(0, len(missing), OCR_CHUNK_PAGES)]
+        else:
+            ocr_chunks = [missing] if missing else []
+    if resumed:
+        print(f"Resuming {pdf_filename} with {resumed} stored pages")
+
+    if ocr_chunks:
+        document_url = get_document_url(pdf_filename, full_path)
+
+        pending = list(ocr_chunks)
+        while pending:
+            chunk = pending.pop(0)
+            options = {}
+            if chunk is not None:
+                options['pages'] = chunk
+
+            # Call Mistral OCR
+            started = time.monotonic()
+            response = ocr_client.ocr.process(
+                model="mistral-ocr-latest",
+                document={
+                    "type": "document_url",
+                    "document_url": document_url
+                },
+                include_image_base64=False,
+                **options
+            )
+            seconds = round((time.monotonic() - started) / max(len(response.pages), 1), 3)
+            archive_pages(pdf_filename, response.pages)
+            records = [
+                {'index': page.index, 'source': 'ocr', 'markdown': page.markdown, 'attempt': attempt, 'seconds': seconds}
+                for page in response.pages
+            ]
+            save_checkpoint(pdf_filename, records)
+            pages.update((record['index'], record) for record in records)
+
+            if not pending:
+                # A repeat whose original the response left out is OCR'd itself
+                orphans = sorted(index for index, original in duplicates.items() if original not in pages)
+                if orphans:
+                    logging.warning(f"{pdf_filename}: originals of pages {orphans} missing from OCR, sending them")
+                    for index in orphans:
+                        del duplicates[index]
+                    pending.append(orphans)
+
+    if duplicates:
+        records = [
+            {'index': index, 'source': 'duplicate', 'markdown': pages[original]['markdown'], 'attempt': attempt, 'seconds': 0}
+            for index, original in duplicates.items()
+        ]
+        save_checkpoint(pdf_filename, records)
+        archive_pages(pdf_filename, [
+            {'index': index, 'duplicate_of': original} for index, original in duplicates.items()
+        ], source='duplicate')
+        pages.update((record['index'], record) for record in records)
+
+    for index in sorted(pages):
+        record = pages[index]
+        logging.info(
+            f"{pdf_filename} page {index + 1}: {record['source']} "
+            f"(attempt {record['attempt']}, {record['seconds']}s)"
+        )
+
+    output_path = save_markdown(pdf_filename, pages)
+
+    # The markdown is complete, the checkpoint is no longer needed
+    os.remove(checkpoint_path(pdf_filename))
+
+    counts = {}
+    for record in pages.values():
+        counts[record['source']] = counts.get(record['source'], 0) + 1
+    print(f"Saved markdown file: {output_path} "
+          f"({counts.get('text_layer', 0)} text layer pages, {counts.get('ocr', 0)} OCR pages, "
+          f"{counts.get('blank', 0)} blank, {counts.get('duplicate', 0)} duplicate, {resumed} resumed)")
+
+
+def save_markdown(pdf_filename, pages):
+    """Write the pages of a PDF as a markdown file or to the page shards; returns where they went."""
+    if OUTPUT_FORMAT == "md":
+        # Create output directory structure
+        output_name = pdf_filename.rsplit('.', 1)[0] + '.md'
+        output_path = os.path.join(EXPORT_DIR, output_name)
+        
+        # Ensure the output directory exists
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        
+        with open(output_path, 'w', encoding='utf-8') as md_file:
+            md_file.write(assemble_markdown((index, record['markdown']) for index, record in pages.items()))
+    else:
+        with output_lock:
+            get_corpus_writer().add_document(
+                pdf_filename.replace(os.sep, '/'),
+                ((index, record['markdown']) for index, record in pages.items())
+            )
+        output_path = f"{CORPUS_DIR} ({OUTPUT_FORMAT} shards)"
+    return output_path
+
+
+def conversion_workers():
+    return CONVERT_WORKERS or len(API_KEYS)
+
+
+def pace_requests():
+    """Without a per key rate limit, each worker waits REQUEST_INTERVAL between files."""
+    if not KEY_REQUESTS_PER_SECOND:
+        time.sleep(REQUEST_INTERVAL)
+
+
+def convert_with_retries(pdf):
+    """Convert one PDF, retrying with exponential backoff. Returns (success, attempts, error)."""
+    attempts = 0
+    backoff = INITIAL_BACKOFF
+    success = False
+    error_msg = ''
+
+    while attempts < MAX_RETRIES and not success:
+        attempts += 1
+        try:
+            convert_pdf_to_markdown(pdf, attempts)
+            success = True
+            append_to_db({'filename': pdf, 'status': 'success', 'attempts': attempts, 'error': ''})
+            print(f"Success: {pdf} (attempt {attempts})")
+            pace_requests()
+        except Exception as e:
+            error_msg = str(e)
+            append_to_db({'filename': pdf, 'status': 'error', 'attempts': attempts, 'error': error_msg})
+            logging.error(f"{pdf} attempt {attempts} failed: {error_msg}")
+            print(f"Error converting {pdf} on attempt {attempts}: {error_msg}")
+            if attempts < MAX_RETRIES:
+                print(f"Retrying in {backoff} seconds...")
+                time.sleep(backoff)
+                backoff *= 2
+
+    release_upload(pdf)
+    if not success:
+        print(f"Failed: {pdf} after {attempts} attempts.")
+    return success, attempts, '' if success else error_msg
+
+
+# --- Packing small PDFs ------------------------------------------------------
+#
+# With archives of mostly one or two page PDFs, the per-request overhead and the
+# request rate limit cap throughput, not the page volume. Small PDFs are merged
+# into one combined document up to the page and byte budgets and OCR'd with a
+# single request; the returned pages are split back into per-file markdown by
+# their offset in the combined document. If the request fails, or a file's
+# pages do not all come back, the files affected are converted on their own,
+# so one bad file cannot fail the rest of its pack.
+
+
+def plan_packs(pdf_filenames):
+    """Group small PDFs into packs; returns the packs and the files to convert on their own.
+
+    Each pack is a list of (PDF filename, page count). Files with a usable text
+    layer, a checkpoint from an earlier run, or that cannot be read go through
+    the per-file path, which handles them better.
+    """
+    packs, singles = [], []
+    pack, pack_pages, pack_bytes = [], 0, 0
+    for pdf in pdf_filenames:
+        full_path = os.path.join(DOC_DIR, pdf)
+        try:
+            size = os.path.getsize(full_path)
+            if TEXT_LAYER_FAST_PATH:
+                page_count, text_pages = detect_text_pages(full_path)
+            else:
+                page_count, text_pages = pdf_page_count(full_path), {}
+        except Exception:
+            page_count, text_pages = None, {}
+        if (
+            not page_count or text_pages
+            or page_count > PACK_FILE_MAX_PAGES or size > PACK_MAX_BYTES
+            or os.path.exists(checkpoint_path(pdf))
+        ):
+            singles.append(pdf)
+            continue
+        if pack and (pack_pages + page_count > PACK_MAX_PAGES or pack_bytes + size > PACK_MAX_BYTES):
+            packs.append(pack)
+            pack, pack_pages, pack_bytes = [], 0, 0
+        pack.append((pdf, page_count))
+        pack_pages += page_count
+        pack_bytes += size
+    if pack:
+        packs.append(pack)
+    # A pack of one file gains nothing over the per-file path
+    singles.extend(pdf for pack in packs if len(pack) == 1 for pdf, _ in pack)
+    return [pack for pack in packs if len(pack) > 1], singles
+
+
+def convert_pack(pack):
+    """OCR a pack of small PDFs with one request and save the markdown of each.
+
+    Returns the files that were not converted and should go through the
+    per-file path.
+    """
+    combined = pymupdf.open()
+    offsets = []  # (PDF filename, first page in the combined document, page count)
+    failed = []
+    for pdf, page_count in pack:
+        start = combined.page_count
+        try:
+            with pymupdf.open(os.path.join(DOC_DIR, pdf)) as source:
+                combined.insert_pdf(source)
+            if combined.page_count - start != page_count:
+                raise RuntimeError(f"expected {page_count} pages, got {combined.page_count - start}")
+        except Exception as e:
+            logging.warning(f"Cannot pack {pdf}: {e}")
+            if combined.page_count > start:
+                combined.delete_pages(from_page=start, to_page=combined.page_count - 1)
+            failed.append(pdf)
+            continue
+        offsets.append((pdf, start, page_count))
+    if len(offsets) < 2:
+        combined.close()
+        return failed + [pdf for pdf, _, _ in offsets]
+
+    b64 = base64.b64encode(combined.tobytes(garbage=1, deflate=True)).decode('utf-8')
+    total_pages = combined.page_count
+    combined.close()
+    started = time.monotonic()
+    try:
+        response = ocr_client.ocr.process(
+            model="mistral-ocr-latest",
+            document={
+                "type": "document_url",
+                "document_url": f"data:application/pdf;base64,{b64}"
+            },
+            include_image_base64=False
+        )
+    except Exception as e:
+        logging.error(f"Pack of {len(offsets)} files failed, converting them one by one: {e}")
+        return failed + [pdf for pdf, _, _ in offsets]
+    seconds = round((time.monotonic() - started) / max(total_pages, 1), 3)
+
+    pages_by_index = {page.index: page for page in response.pages}
+    markdown_by_index = {page.index: page.markdown for page in response.pages}
+    for pdf, start, page_count in offsets:
+        if any(start + index not in markdown_by_index for index in range(page_count)):
+            logging.warning(f"Pack response is missing pages of {pdf}")
+            failed.append(pdf)
+            continue
+        # Archived with the page numbers of the file itself, not of the pack
+        archive_pages(pdf, [pages_by_index[start + index] for index in range(page_count)], index_offset=start)
+        pages = {
+            index: {'index': index, 'source': 'ocr', 'markdown': markdown_by_index[start + index],
+                    'attempt': 1, 'seconds': seconds}
+            for index in range(page_count)
+        }
+        try:
+            output_path = save_markdown(pdf, pages)
+        except Exception as e:
+            logging.error(f"Failed to save {pdf} from its pack: {e}")
+            failed.append(pdf)
+            continue
+        append_to_db({'filename': pdf, 'status': 'success', 'attempts': 1, 'error': ''})
+        print(f"Saved markdown file: {output_path} ({page_count} OCR pages, packed)")
+    return failed
+
+
+def archived_pdfs():
+    """PDFs (relative paths) with a raw OCR archive."""
+    pdfs = []
+    for root, _, files in os.walk(RAW_DIR):
+        for name in files:
+            if name.endswith(ARCHIVE_SUFFIX):
+                relative = os.path.relpath(os.path.join(root, name[:-len(ARCHIVE_SUFFIX)]), RAW_DIR)
+                pdfs.append(relative + '.pdf')
+    return sorted(pdfs)
+
+
+def rerender(pdf_filenames, workers=None):
+    """Rebuild the output of PDFs from their raw OCR archives (all of them if none are given), without OCR calls.
+
+    Archives are decoded and rendered in parallel, one process per core;
+    this process writes the results.
+    """
+    pdf_filenames = pdf_filenames or archived_pdfs()
+    started = time.monotonic()
+    page_total = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        paths = [raw_archive_path(pdf) for pdf in pdf_filenames]
+        for pdf, path, rendered in zip(pdf_filenames, paths, pool.map(render_archive, paths, chunksize=8)):
+            if not rendered:
+                print(f"No raw archive for {pdf}")
+                continue
+            pages = {index: {'index': index, 'markdown': markdown} for index, markdown in rendered.items()}
+            output_path = save_markdown(pdf, pages)
+            page_total += len(pages)
+            print(f"Saved markdown file: {output_path} ({len(pages)} pages, re-rendered)")
+    close_corpus_writer()
+    seconds = time.monotonic() - started
+    print(f"Re-rendered {len(pdf_filenames)} files, {page_total} pages in {seconds:.1f}s "
+          f"({page_total / max(seconds, 1e-9):.0f} pages/s), no OCR requests")
+
+
+def print_key_usage():
+    if len(API_KEYS) > 1:
+        for usage in ocr_client.usage():
+            print(f"  {usage['name']}: {usage['requests']} requests, {usage['pages']} pages, "
+                  f"{usage['failures']} failures ({usage['throttled']} throttled)")
 
 
 def main():
@@ -133,43 +648,302 @@ def main():
     total = len(all_files)
     succeeded = sum(1 for r in processed.values() if r['status'] == 'success')
     to_do = [f for f in all_files if processed.get(f, {}).get('status') != 'success']
+    remaining = len(to_do)
 
     print(f"Found {total} PDF files in '{DOC_DIR}/'. {succeeded} already converted. {len(to_do)} remaining.")
     print(f"Output will be saved to '{EXPORT_DIR}/' directory.")
 
+    # One worker per API key by default: the pool routes each request to a
+    # free healthy key, and its per key buckets and quarantines pace them
+    workers = conversion_workers()
+    print(f"Converting with {workers} workers over {len(API_KEYS)} API keys.")
+
     converted_count = 0
-    for idx, pdf in enumerate(to_do, start=1):
-        print(f"[{idx}/{len(to_do)}] Processing: {pdf}")
-        attempts = 0
-        backoff = INITIAL_BACKOFF
-        success = False
-
-        while attempts < MAX_RETRIES and not success:
-            attempts += 1
-            try:
-                convert_pdf_to_markdown(pdf)
-                success = True
-                converted_count += 1
-                append_to_db({'filename': pdf, 'status': 'success', 'attempts': attempts, 'error': ''})
-                print(f"Success: {pdf} (attempt {attempts})")
-                print(f"Waiting for the next file...")
-                time.sleep(3)
-            except Exception as e:
-                error_msg = str(e)
-                append_to_db({'filename': pdf, 'status': 'error', 'attempts': attempts, 'error': error_msg})
-                logging.error(f"{pdf} attempt {attempts} failed: {error_msg}")
-                print(f"Error converting {pdf} on attempt {attempts}: {error_msg}")
-                if attempts < MAX_RETRIES:
-                    print(f"Retrying in {backoff} seconds...")
-                    time.sleep(backoff)
-                    backoff *= 2
-
-        if not success:
-            print(f"Failed: {pdf} after {attempts} attempts.")
-
-    print(f"\nConversion complete. Total successful conversions: {converted_count} out of {len(to_do)}.")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if PACK_SMALL_PDFS:
+            packs, to_do = plan_packs(to_do)
+
+            def process_pack(numbered):
+                idx, pack = numbered
+                print(f"[pack {idx}/{len(packs)}] Processing {len(pack)} small PDFs in one request")
+                unconverted = convert_pack(pack)
+                pace_requests()
+                return pack, unconverted
+
+            for pack, unconverted in executor.map(process_pack, enumerate(packs, start=1)):
+                converted_count += len(pack) - len(unconverted)
+                to_do.extend(unconverted)
+
+        def process_file(numbered):
+            idx, pdf = numbered
+            print(f"[{idx}/{len(to_do)}] Processing: {pdf}")
+            success, _, _ = convert_with_retries(pdf)
+            return success
+
+        converted_count += sum(executor.map(process_file, enumerate(to_do, start=1)))
+
+    close_corpus_writer()
+    print(f"\nConversion complete. Total successful conversions: {converted_count} out of {remaining}.")
     print(f"All converted files are saved in '{EXPORT_DIR}/' directory.")
+    print_key_usage()
+
+
+# --- Sharding across nodes ---------------------------------------------------
+#
+# Every node lists the same files and owns those whose path hash falls in its
+# shard, so no coordination is needed to split the work. Before converting a
+# file a node creates its claim file with O_EXCL, which is atomic on the shared
+# mount, and keeps the claim fresh while it works; a finished file's claim
+# becomes a .done marker. A node that runs out of files of its own claims
+# unclaimed files of other shards. A claim left stale by a dead node is taken
+# over under a lock named after that claim's inode and mtime, which only one
+# node can create, so a node that saw the old claim late cannot take the new
+# one; the claim renamed away is checked to be the stale one before it is
+# dropped, and put back otherwise.
+
+
+def shard_of(pdf_filename, shard_count):
+    """Deterministic shard of a file, the same on every node and platform."""
+    key = pdf_filename.replace(os.sep, '/').encode('utf-8')
+    return int(hashlib.sha1(key).hexdigest()[:16], 16) % shard_count
+
+
+def _claim_path(pdf_filename, suffix):
+    key = hashlib.sha1(pdf_filename.replace(os.sep, '/').encode('utf-8')).hexdigest()
+    return os.path.join(CLAIM_DIR, f"{key}.{suffix}")
+
+
+def is_done(pdf_filename):
+    return os.path.exists(_claim_path(pdf_filename, 'done'))
+
+
+def _take_over(path, node_id, stale):
+    """Move a dead node's stale claim out of the way; returns False if another node got there first."""
+    lock = f"{path}.takeover-{stale.st_ino}-{stale.st_mtime_ns}"
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        try:
+            if time.time() - os.path.getmtime(lock) >= CLAIM_TTL:
+                os.remove(lock)  # left by a node that died mid-takeover; the next run retries
+        except FileNotFoundError:
+            pass
+        return False
+    moved = f"{path}.stale-{node_id}-{os.getpid()}"
+    try:
+        os.rename(path, moved)
+    except FileNotFoundError:
+        os.remove(lock)
+        return False
+    current = os.stat(moved)
+    if current.st_ino != stale.st_ino or time.time() - current.st_mtime < CLAIM_TTL:
+        # Not the claim we saw go stale: give it back unless the file was claimed meanwhile
+        try:
+            os.link(moved, path)
+        except FileExistsError:
+            logging.error(f"Claim {path} was replaced during a takeover")
+        os.remove(moved)
+        return False
+    os.remove(moved)
+    return True
+
+
+def try_claim(pdf_filename, node_id):
+    """Atomically claim a file for this node; returns False if another node holds it."""
+    path = _claim_path(pdf_filename, 'claim')
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                stale = os.stat(path)
+            except FileNotFoundError:
+                continue  # released meanwhile, try again
+            age = time.time() - stale.st_mtime
+            if age < CLAIM_TTL or not _take_over(path, node_id, stale):
+                return False
+            logging.warning(f"Taking over {pdf_filename} from a dead node (claim {age:.0f}s old)")
+            continue
+        with os.fdopen(fd, 'w', encoding='utf-8') as claim:
+            json.dump({'filename': pdf_filename, 'node': node_id, 'claimed_at': time.time()}, claim)
+        if is_done(pdf_filename):  # finished by another node since we listed it
+            os.remove(path)
+            return False
+        return True
+    return False
+
+
+def release_claim(pdf_filename, done):
+    """Turn a claim into a done marker, or drop it so the file can be claimed again."""
+    path = _claim_path(pdf_filename, 'claim')
+    try:
+        if done:
+            os.replace(path, _claim_path(pdf_filename, 'done'))
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    for lock in glob.glob(f"{glob.escape(path)}.takeover-*"):
+        try:
+            os.remove(lock)
+        except FileNotFoundError:
+            pass
+
+
+class ClaimHeartbeat:
+    """Refresh the claims this node holds so other nodes do not take them over."""
+
+    def __init__(self):
+        self.held = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(CLAIM_HEARTBEAT):
+            for pdf_filename in list(self.held):
+                try:
+                    os.utime(_claim_path(pdf_filename, 'claim'))
+                except FileNotFoundError:
+                    logging.error(f"Claim on {pdf_filename} was lost")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+
+
+def append_to_manifest(manifest_path, record):
+    with output_lock, open(manifest_path, 'a', encoding='utf-8') as manifest:
+        manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def main_sharded(shard_index, shard_count, node_id, steal=True):
+    """Convert the files of one shard, then help with unclaimed files of other shards."""
+    ensure_export_directory()
+    os.makedirs(CLAIM_DIR, exist_ok=True)
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    manifest_path = os.path.join(MANIFEST_DIR, f"shard-{shard_index}-of-{shard_count}-{node_id}.jsonl")
+
+    all_files = sorted(get_pdf_files())
+    own = [f for f in all_files if shard_of(f, shard_count) == shard_index]
+    others = [f for f in all_files if shard_of(f, shard_count) != shard_index] if steal else []
+    print(f"Node {node_id}: shard {shard_index}/{shard_count} owns {len(own)} of {len(all_files)} PDF files.")
+
+    if OUTPUT_FORMAT != "md":
+        get_corpus_writer(prefix=node_id)  # nodes write their own shards
+
+    def process(candidate):
+        phase, pdf = candidate
+        # Claimed when a worker gets to the file, so other nodes can still take it until then
+        if is_done(pdf) or not try_claim(pdf, node_id):
+            return False
+        heartbeat.held.add(pdf)
+        print(f"[{phase}] Processing: {pdf}")
+        started = time.time()
+        try:
+            success, attempts, error = convert_with_retries(pdf)
+        finally:
+            heartbeat.held.discard(pdf)
+        release_claim(pdf, done=success)
+        append_to_manifest(manifest_path, {
+            'filename': pdf, 'status': 'success' if success else 'error',
+            'attempts': attempts, 'error': error, 'node': node_id,
+            'shard': shard_of(pdf, shard_count), 'stolen': phase == 'stolen',
+            'seconds': round(time.time() - started, 1), 'finished_at': time.time(),
+        })
+        return success
+
+    candidates = [('own', pdf) for pdf in own] + [('stolen', pdf) for pdf in others]
+    with ClaimHeartbeat() as heartbeat, ThreadPoolExecutor(max_workers=conversion_workers()) as executor:
+        converted_count = sum(executor.map(process, candidates))
+
+    close_corpus_writer()
+    print(f"\nNode {node_id} finished: {converted_count} files converted. Manifest: {manifest_path}")
+    print_key_usage()
+
+
+def merge_manifests():
+    """Combine all per-shard manifests into one report, the latest record of each file winning."""
+    latest = {}
+    processed_by = {}
+    manifests = sorted(os.listdir(MANIFEST_DIR)) if os.path.isdir(MANIFEST_DIR) else []
+    for name in manifests:
+        with open(os.path.join(MANIFEST_DIR, name), encoding='utf-8') as manifest:
+            for line in manifest:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                processed_by.setdefault(record['filename'], set()).add(record['node'])
+                if record['finished_at'] >= latest.get(record['filename'], {}).get('finished_at', 0):
+                    latest[record['filename']] = record
+
+    all_files = get_pdf_files()
+    fieldnames = FIELDNAMES + ['node', 'shard', 'stolen', 'seconds']
+    with open(SHARD_REPORT, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for pdf in sorted(all_files):
+            writer.writerow(latest.get(pdf, {'filename': pdf, 'status': 'pending'}))
+
+    succeeded = sum(1 for r in latest.values() if r['status'] == 'success')
+    failed = sum(1 for r in latest.values() if r['status'] != 'success')
+    duplicates = sum(1 for nodes in processed_by.values() if len(nodes) > 1)
+    per_node = {}
+    for record in latest.values():
+        per_node[record['node']] = per_node.get(record['node'], 0) + 1
+    print(f"Merged {len(manifests)} manifests into {SHARD_REPORT}")
+    print(f"{len(all_files)} files: {succeeded} converted, {failed} failed, "
+          f"{len(all_files) - len(latest)} not processed yet, {duplicates} processed by more than one node")
+    for node, count in sorted(per_node.items()):
+        print(f"  {node}: {count} files")
+
+
+def parse_shard(value):
+    """Parse an ``i/N`` shard spec (0 <= i < N)."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected i/N, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard index must be in 0..N-1")
+    return index, count
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Convert the PDFs under docs_import to markdown with Mistral OCR.")
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help="process shard i of N, coordinating with other nodes through claim files")
+    parser.add_argument('--no-steal', action='store_true',
+                        help="with --shard, do not take over files of other shards once done")
+    parser.add_argument('--node-id', default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="name of this node in claims and manifests")
+    parser.add_argument('--merge-manifests', action='store_true',
+                        help="combine the per-shard manifests into one report and exit")
+    parser.add_argument('--output-format', choices=['md', 'jsonl', 'parquet'], default=OUTPUT_FORMAT,
+                        help="one .md file per PDF, or page records in rolling shards under CORPUS_DIR")
+    parser.add_argument('--materialize', nargs='*', metavar='PDF',
+                        help="write .md files for PDFs (relative paths) stored in the page shards, all if none given")
+    parser.add_argument('--pack', action='store_true', default=PACK_SMALL_PDFS,
+                        help="OCR small PDFs together, one request per pack (not with --shard)")
+    parser.add_argument('--workers', type=int, default=CONVERT_WORKERS,
+                        help="files converted at the same time, one per API key if 0")
+    parser.add_argument('--rerender', nargs='*', metavar='PDF',
+                        help="rebuild the output of PDFs (relative paths) from their raw OCR archives, all if none given")
+    args = parser.parse_args()
+    OUTPUT_FORMAT = args.output_format
+    CONVERT_WORKERS = args.workers
+    PACK_SMALL_PDFS = args.pack
+
+    if args.materialize is not None:
+        materialize_markdown(args.materialize)
+    elif args.rerender is not None:
+        rerender(args.rerender)
+    elif args.merge_manifests:
+        merge_manifests()
+    elif args.shard:
+        main_sharded(*args.shard, node_id=args.node_id, steal=not args.no_steal)
+    else:
+        main()
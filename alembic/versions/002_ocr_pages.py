@@ -0,0 +1,38 @@
+"""Add per-page OCR results
+
+Revision ID: 002_ocr_pages
+Revises: 001_initial
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_ocr_pages'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ocr_pages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('page_index', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('markdown', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['processing_jobs.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_id', 'page_index', name='uq_ocr_pages_job_page')
+    )
+    op.create_index(op.f('ix_ocr_pages_id'), 'ocr_pages', ['id'], unique=False)
+    op.create_index(op.f('ix_ocr_pages_job_id'), 'ocr_pages', ['job_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ocr_pages_job_id'), table_name='ocr_pages')
+    op.drop_index(op.f('ix_ocr_pages_id'), table_name='ocr_pages')
+    op.drop_table('ocr_pages')
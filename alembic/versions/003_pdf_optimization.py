@@ -0,0 +1,25 @@
+"""Record PDF sizes before and after pre-upload optimization
+
+Revision ID: 003_pdf_optimization
+Revises: 002_ocr_pages
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_pdf_optimization'
+down_revision = '002_ocr_pages'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('processing_jobs', sa.Column('original_pdf_size', sa.Integer(), nullable=True))
+    op.add_column('processing_jobs', sa.Column('optimized_pdf_size', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('processing_jobs', 'optimized_pdf_size')
+    op.drop_column('processing_jobs', 'original_pdf_size')
@@ -0,0 +1,48 @@
+"""Add the full-text search index
+
+FTS5 virtual table on SQLite, tsvector column with a GIN index on PostgreSQL.
+
+Revision ID: 004_search_index
+Revises: 003_pdf_optimization
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_search_index'
+down_revision = '003_pdf_optimization'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_pages USING fts5("
+            "content, job_id UNINDEXED, document_id UNINDEXED, page_index UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    else:
+        op.create_table(
+            'search_pages',
+            sa.Column('document_id', sa.Integer(), nullable=False),
+            sa.Column('page_index', sa.Integer(), nullable=False),
+            sa.Column('job_id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.PrimaryKeyConstraint('document_id', 'page_index')
+        )
+        op.execute(
+            "ALTER TABLE search_pages ADD COLUMN tsv tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED"
+        )
+        op.execute("CREATE INDEX ix_search_pages_tsv ON search_pages USING GIN (tsv)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS search_pages")
+    else:
+        op.drop_index('ix_search_pages_tsv', table_name='search_pages')
+        op.drop_table('search_pages')
@@ -0,0 +1,29 @@
+"""Add job priority, client and document page count for scheduling
+
+Revision ID: 005_job_scheduling
+Revises: 004_search_index
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_job_scheduling'
+down_revision = '004_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('processing_jobs', sa.Column('priority', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('processing_jobs', sa.Column('client_id', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_processing_jobs_client_id'), 'processing_jobs', ['client_id'], unique=False)
+    op.add_column('documents', sa.Column('page_count', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'page_count')
+    op.drop_index(op.f('ix_processing_jobs_client_id'), table_name='processing_jobs')
+    op.drop_column('processing_jobs', 'client_id')
+    op.drop_column('processing_jobs', 'priority')
@@ -0,0 +1,25 @@
+"""Add per-page OCR attempts and timings
+
+Revision ID: 006_page_checkpoints
+Revises: 005_job_scheduling
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_page_checkpoints'
+down_revision = '005_job_scheduling'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('ocr_pages', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('ocr_pages', sa.Column('duration_ms', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ocr_pages', 'duration_ms')
+    op.drop_column('ocr_pages', 'attempts')
@@ -0,0 +1,27 @@
+"""Add the OCR provider file reference to documents
+
+Revision ID: 007_provider_files
+Revises: 006_page_checkpoints
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_provider_files'
+down_revision = '006_page_checkpoints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('provider_file_id', sa.String(length=64), nullable=True))
+    op.add_column('documents', sa.Column('signed_url', sa.Text(), nullable=True))
+    op.add_column('documents', sa.Column('signed_url_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'signed_url_expires_at')
+    op.drop_column('documents', 'signed_url')
+    op.drop_column('documents', 'provider_file_id')
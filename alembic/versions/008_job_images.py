@@ -0,0 +1,25 @@
+"""Add extracted image statistics to processing jobs
+
+Revision ID: 008_job_images
+Revises: 007_provider_files
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_job_images'
+down_revision = '007_provider_files'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('processing_jobs', sa.Column('image_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('processing_jobs', sa.Column('image_bytes_saved', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('processing_jobs', 'image_bytes_saved')
+    op.drop_column('processing_jobs', 'image_count')
@@ -0,0 +1,25 @@
+"""Add the source path of documents registered by bulk import
+
+Revision ID: 010_document_source_path
+Revises: 009_idempotency_keys
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_document_source_path'
+down_revision = '009_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('source_path', sa.String(length=1000), nullable=True))
+    op.create_index(op.f('ix_documents_source_path'), 'documents', ['source_path'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documents_source_path'), table_name='documents')
+    op.drop_column('documents', 'source_path')
@@ -0,0 +1,25 @@
+"""Add pruned page counts to processing jobs
+
+Revision ID: 011_page_pruning
+Revises: 010_document_source_path
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_page_pruning'
+down_revision = '010_document_source_path'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('processing_jobs', sa.Column('blank_pages', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('processing_jobs', sa.Column('duplicate_pages', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('processing_jobs', 'duplicate_pages')
+    op.drop_column('processing_jobs', 'blank_pages')
@@ -0,0 +1,61 @@
+"""Keep the original page text in the search index for snippets
+
+Backfilled from the stored pages. FTS5 tables cannot add columns, so the
+SQLite index is rebuilt.
+
+Revision ID: 012_search_original_text
+Revises: 011_page_pruning
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012_search_original_text'
+down_revision = '011_page_pruning'
+branch_labels = None
+depends_on = None
+
+SQLITE_COLUMNS = "content, {original}job_id UNINDEXED, document_id UNINDEXED, page_index UNINDEXED"
+
+
+def _rebuild_sqlite(original: bool) -> None:
+    op.execute("ALTER TABLE search_pages RENAME TO search_pages_old")
+    op.execute(
+        "CREATE VIRTUAL TABLE search_pages USING fts5("
+        + SQLITE_COLUMNS.format(original="original UNINDEXED, " if original else "")
+        + ", tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    if original:
+        op.execute(
+            "INSERT INTO search_pages (rowid, content, original, job_id, document_id, page_index) "
+            "SELECT old.rowid, old.content, "
+            "(SELECT markdown FROM ocr_pages WHERE ocr_pages.job_id = old.job_id "
+            "AND ocr_pages.page_index = old.page_index), "
+            "old.job_id, old.document_id, old.page_index FROM search_pages_old AS old"
+        )
+    else:
+        op.execute(
+            "INSERT INTO search_pages (rowid, content, job_id, document_id, page_index) "
+            "SELECT rowid, content, job_id, document_id, page_index FROM search_pages_old"
+        )
+    op.execute("DROP TABLE search_pages_old")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        _rebuild_sqlite(original=True)
+    else:
+        op.add_column('search_pages', sa.Column('original', sa.Text(), nullable=True))
+        op.execute(
+            "UPDATE search_pages SET original = ocr_pages.markdown FROM ocr_pages "
+            "WHERE ocr_pages.job_id = search_pages.job_id AND ocr_pages.page_index = search_pages.page_index"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        _rebuild_sqlite(original=False)
+    else:
+        op.drop_column('search_pages', 'original')
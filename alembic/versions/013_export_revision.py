@@ -0,0 +1,26 @@
+"""Add an export revision to processing jobs
+
+Cached exports were keyed by the completion time in seconds, which a job
+re-processed or re-rendered within the same second kept.
+
+Revision ID: 013_export_revision
+Revises: 012_search_original_text
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_export_revision'
+down_revision = '012_search_original_text'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('processing_jobs', sa.Column('export_revision', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('processing_jobs', 'export_revision')
@@ -0,0 +1,18 @@
+import secrets
+from typing import Optional
+from fastapi import Header, HTTPException, status
+from app.core.config import settings
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency that guards admin endpoints with the ADMIN_TOKEN setting."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them"
+        )
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token"
+        )
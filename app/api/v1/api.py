@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import documents, ocr, jobs
+from app.api.v1.endpoints import documents, ocr, jobs, search, images, admin
 
 api_router = APIRouter()
 api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
 api_router.include_router(ocr.router, prefix="/ocr", tags=["ocr"])
 api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
-
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(images.router, prefix="/images", tags=["images"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,206 @@
+import os
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.api.deps import require_admin
+from app.core.config import settings
+from app.core.profiling import request_profiler
+from app.db.session import SessionLocal
+from app.schemas.admin import (
+    BulkImportRequest, BulkImportStatus, OCRKeyUsage, ProfilingRequest, ProfilingStatus, RerenderRequest, RerenderStatus
+)
+from app.services.bulk_import import BulkImporter, allowed_root, import_registry
+from app.services.ocr_service import ocr_clients
+from app.services.rerender import completed_job_ids, rerender_registry
+from app.services.scheduler import job_scheduler
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+def profiling_status() -> ProfilingStatus:
+    return ProfilingStatus(
+        mode=request_profiler.mode,
+        remaining=request_profiler.remaining,
+        directory=request_profiler.directory,
+        profiles=request_profiler.saved_profiles()
+    )
+
+
+@router.get("/profiling", response_model=ProfilingStatus)
+def get_profiling():
+    """Show whether profiling is armed and list the most recent saved profiles."""
+    return profiling_status()
+
+
+@router.post("/profiling", response_model=ProfilingStatus)
+def arm_profiling(request: ProfilingRequest):
+    """
+    Profile the next N requests and save one profile per request to PROFILE_DIR.
+    
+    - **cprofile**: deterministic profile (.prof, open with pstats or snakeviz)
+    - **sampling**: low-overhead stack samples of all threads (.folded, open with speedscope)
+    
+    Requests to the admin endpoints are never profiled.
+    """
+    request_profiler.arm(request.requests, request.mode)
+    return profiling_status()
+
+
+def import_status(entry: dict) -> BulkImportStatus:
+    stats = entry["importer"].stats
+    return BulkImportStatus(
+        id=entry["id"],
+        directory=entry["directory"],
+        state=entry["state"],
+        error=entry["error"],
+        scanned=stats.scanned,
+        registered=stats.registered,
+        skipped=stats.skipped,
+        failed=stats.failed,
+        jobs=stats.jobs,
+        links=dict(stats.links),
+        bytes=stats.bytes,
+        seconds=round(stats.seconds, 3),
+        files_per_second=round(stats.files_per_second, 1)
+    )
+
+
+@router.post("/imports", response_model=BulkImportStatus, status_code=status.HTTP_202_ACCEPTED)
+def start_import(request: BulkImportRequest):
+    """
+    Register the PDFs under a server-side directory as documents, in the background.
+    
+    Files are hardlinked or reflinked into UPLOAD_DIR instead of copied where
+    the filesystem allows, and rows are inserted in batches. Files registered
+    before from the same path are skipped, so an import can be run again after
+    an interruption. The directory must be under BULK_IMPORT_ROOTS.
+    
+    - **enqueue**: also queue an OCR job for every new document
+    - **link**: auto (reflink, then hardlink, then copy), reflink, hardlink or copy
+    """
+    if not allowed_root(request.directory):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Directory is not under BULK_IMPORT_ROOTS"
+        )
+    if not os.path.isdir(request.directory):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{request.directory} is not a directory"
+        )
+    
+    importer = BulkImporter(
+        settings.UPLOAD_DIR,
+        batch_size=settings.BULK_IMPORT_BATCH_SIZE,
+        link=request.link,
+        count_pages=request.count_pages,
+        enqueue=request.enqueue,
+        priority=request.priority,
+        on_jobs=lambda jobs: [
+            job_scheduler.submit_ids(job_id, document_id, "bulk-import", request.priority, size)
+            for job_id, document_id, size in jobs
+        ]
+    )
+    try:
+        entry = import_registry.start(importer, os.path.realpath(request.directory), SessionLocal)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return import_status(entry)
+
+
+@router.get("/imports/{import_id}", response_model=BulkImportStatus)
+def get_import(import_id: int):
+    """Show the progress of a bulk import."""
+    entry = import_registry.get(import_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Import {import_id} not found"
+        )
+    return import_status(entry)
+
+
+@router.delete("/imports/{import_id}", response_model=BulkImportStatus)
+def cancel_import(import_id: int):
+    """Stop a bulk import after its current batch; registered documents are kept."""
+    entry = import_registry.cancel(import_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Import {import_id} not found"
+        )
+    return import_status(entry)
+
+
+@router.get("/ocr-keys", response_model=List[OCRKeyUsage])
+def get_ocr_key_usage():
+    """Show the requests, pages, failures and health of each OCR API key."""
+    return ocr_clients.usage()
+
+
+def rerender_status(entry: dict) -> RerenderStatus:
+    stats = entry["stats"]
+    return RerenderStatus(
+        id=entry["id"],
+        state=entry["state"],
+        error=entry["error"],
+        total=entry["total"],
+        jobs=stats.jobs,
+        pages=stats.pages,
+        skipped=stats.skipped,
+        failed=stats.failed,
+        seconds=round(stats.seconds, 3),
+        pages_per_second=round(stats.pages_per_second, 1),
+        next_after_job_id=rerender_registry.next_after_job_id(entry)
+    )
+
+
+@router.post("/rerender", response_model=RerenderStatus, status_code=status.HTTP_202_ACCEPTED)
+def start_rerender(request: RerenderRequest):
+    """
+    Rebuild job output from the archived raw OCR responses, without OCR API calls.
+    
+    Pages, markdown exports and search entries are rewritten and cached
+    exports dropped (or rendered again for ``formats``). Without ``job_ids``,
+    up to ``limit`` completed jobs after ``after_job_id`` are rebuilt. The run
+    goes on in the background: poll GET /admin/rerender/{id} for progress, and
+    once it finished start another from ``next_after_job_id`` to continue.
+    """
+    db = SessionLocal()
+    try:
+        if request.job_ids is not None:
+            job_ids = request.job_ids[:request.limit]
+            after_job_id, more = None, False
+        else:
+            job_ids = completed_job_ids(db, request.after_job_id, request.limit)
+            after_job_id, more = request.after_job_id, len(job_ids) == request.limit
+    finally:
+        db.close()
+    try:
+        entry = rerender_registry.start(job_ids, request.formats, after_job_id, more, SessionLocal)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return rerender_status(entry)
+
+
+@router.get("/rerender/{run_id}", response_model=RerenderStatus)
+def get_rerender(run_id: int):
+    """Show the progress of a re-render run."""
+    entry = rerender_registry.get(run_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Re-render {run_id} not found"
+        )
+    return rerender_status(entry)
+
+
+@router.delete("/rerender/{run_id}", response_model=RerenderStatus)
+def cancel_rerender(run_id: int):
+    """Stop a re-render run after its current batch; jobs already rebuilt stay rebuilt."""
+    entry = rerender_registry.cancel(run_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Re-render {run_id} not found"
+        )
+    return rerender_status(entry)
@@ -1,28 +1,39 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, UploadFile, File, status
 from sqlalchemy.orm import Session
 from app.db.deps import get_db
 from app.schemas.document import Document, DocumentCreate
 from app.models.document import Document as DocumentModel, DocumentStatus
 from app.core.config import settings
+from app.core.tracing import span
+from app.services.cpu_pool import cpu_pool
+from app.services.cpu_tasks import pdf_page_count
+from app.services.idempotency import IdempotentRequest, begin as begin_idempotent, fingerprint
+from app.services.storage_sweeper import purge_document
 import os
 import uuid
-import shutil
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
 
 @router.post("/upload", response_model=Document, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     db: Session = Depends(get_db)
 ):
     """
     Upload a PDF document for OCR processing.
     
     - **file**: PDF file to upload (max 50MB)
+    
+    Retries sent with the same Idempotency-Key header and file return the
+    document created by the first request instead of creating another.
     """
     # Validate file type
     if not file.filename.lower().endswith('.pdf'):
@@ -38,11 +49,20 @@ async def upload_document(
     file_extension = os.path.splitext(file.filename)[1]
     unique_filename = f"{uuid.uuid4()}{file_extension}"
     file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
+    idempotent = IdempotentRequest(db)
     
     try:
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Save file, hashing it when the request may have to be recognized again
+        digest = hashlib.sha256() if idempotency_key else None
+        with span("upload.save_file"):
+            with open(file_path, "wb") as buffer:
+                while True:
+                    chunk = file.file.read(UPLOAD_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    if digest:
+                        digest.update(chunk)
+                    buffer.write(chunk)
         
         # Get file size
         file_size = os.path.getsize(file_path)
@@ -55,24 +75,46 @@ async def upload_document(
                 detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE / (1024*1024):.1f}MB"
             )
         
+        idempotent = await begin_idempotent(
+            db, "documents.upload", idempotency_key,
+            fingerprint(file.filename, digest.hexdigest() if digest else "")
+        )
+        if idempotent.replay is not None:
+            os.remove(file_path)
+            return idempotent.replay
+        
+        # Page count sizes the job for scheduling; unreadable PDFs fail later in OCR
+        try:
+            with span("upload.page_count"):
+                page_count = await cpu_pool.run_async(pdf_page_count, file_path)
+        except Exception as e:
+            logger.warning(f"Could not read page count of {file.filename}: {e}")
+            page_count = None
+        
         # Create document record
         db_document = DocumentModel(
             filename=unique_filename,
             original_filename=file.filename,
             file_path=file_path,
             file_size=file_size,
+            page_count=page_count,
             status=DocumentStatus.UPLOADED
         )
-        db.add(db_document)
-        db.commit()
-        db.refresh(db_document)
+        with span("db.commit", stage="create_document", bytes=file_size):
+            db.add(db_document)
+            db.commit()
+            db.refresh(db_document)
         
+        idempotent.complete(status.HTTP_201_CREATED, Document.model_validate(db_document).model_dump(mode="json"))
         return db_document
         
     except HTTPException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
         raise
     except Exception as e:
         # Clean up file if database operation fails
+        idempotent.abandon()
         if os.path.exists(file_path):
             os.remove(file_path)
         raise HTTPException(
@@ -120,15 +162,8 @@ def delete_document(
             detail=f"Document {document_id} not found"
         )
     
-    # Delete file if exists
-    if os.path.exists(document.file_path):
-        try:
-            os.remove(document.file_path)
-        except Exception as e:
-            logger.warning(f"Failed to delete file {document.file_path}: {e}")
-    
-    # Delete document record
-    db.delete(document)
+    # Delete the upload, its jobs, exports and search index entries
+    purge_document(db, document)
     db.commit()
     
     return None
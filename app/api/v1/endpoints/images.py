@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse
+from app.services.image_store import IMAGE_NAME_RE, MEDIA_TYPES
+from app.services.ocr_service import image_store
+import os
+
+router = APIRouter()
+
+
+@router.get("/{name}")
+def get_image(name: str):
+    """
+    Download an image extracted from OCR results.
+    
+    Names are content hashes, so a name always refers to the same image and
+    responses may be cached indefinitely.
+    """
+    match = IMAGE_NAME_RE.match(name)
+    path = image_store.path(name) if match else None
+    if not path or not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Image {name} not found"
+        )
+    
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[match.group(1)],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
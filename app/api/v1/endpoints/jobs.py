@@ -1,12 +1,23 @@
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from app.db.deps import get_db
 from app.schemas.processing_job import ProcessingJob
 from app.schemas.ocr import OCRStatus
+from app.schemas.ocr_page import OCRPage
 from app.models.processing_job import ProcessingJob as ProcessingJobModel, JobStatus
 from app.models.document import Document as DocumentModel
+from app.models.ocr_page import OCRPage as OCRPageModel
+from app.services.admission import admission
+from app.services.export_cache import iter_export, open_job_export
+from app.services.export_renderer import ExportFormat, MEDIA_TYPES
+from app.services.ocr_service import write_markdown_export
+from app.services.scheduler import job_scheduler
+from app.services.status_cache import FULL, STATUS, status_cache
+from app.services.zip_export import job_export_entries, stream_zip
 import os
 import logging
 
@@ -14,19 +25,80 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+@router.get("/export.zip")
+def export_zip(
+    document_ids: Optional[str] = Query(None, description="Comma-separated document IDs, all documents if not given"),
+    completed_after: Optional[datetime] = Query(None, description="Only jobs completed at or after this time"),
+    completed_before: Optional[datetime] = Query(None, description="Only jobs completed before this time"),
+    format: Optional[ExportFormat] = Query(None, description="docx, html or txt; markdown if not given"),
+    db: Session = Depends(get_db)
+):
+    """
+    Download the results of many documents as one ZIP archive.
+    
+    The latest completed job of each matching document is included. The
+    archive is built while it is sent, so the download starts right away and
+    takes no temporary file or memory proportional to its size.
+    """
+    query = db.query(ProcessingJobModel.id, ProcessingJobModel.document_id).filter(
+        ProcessingJobModel.status == JobStatus.COMPLETED
+    )
+    if document_ids:
+        try:
+            ids = {int(value) for value in document_ids.split(",") if value.strip()}
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="document_ids must be a comma-separated list of integers"
+            )
+        query = query.filter(ProcessingJobModel.document_id.in_(ids))
+    if completed_after:
+        query = query.filter(ProcessingJobModel.completed_at >= completed_after)
+    if completed_before:
+        query = query.filter(ProcessingJobModel.completed_at < completed_before)
+    
+    job_ids = []
+    last_document_id = None
+    for job_id, document_id in query.order_by(ProcessingJobModel.document_id, ProcessingJobModel.id.desc()):
+        if document_id != last_document_id:
+            job_ids.append(job_id)
+            last_document_id = document_id
+    if not job_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No completed jobs match the filter"
+        )
+    
+    return StreamingResponse(
+        stream_zip(job_export_entries(job_ids, format)),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="ocr_export.zip"'}
+    )
+
+
 @router.get("/{job_id}", response_model=ProcessingJob)
 def get_job(
     job_id: int,
     db: Session = Depends(get_db)
 ):
     """Get processing job status by job ID."""
+    cached = status_cache.get(job_id, FULL)
+    if cached is not None:
+        return cached
+    
     job = db.query(ProcessingJobModel).filter(ProcessingJobModel.id == job_id).first()
     if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Job {job_id} not found"
         )
-    return job
+    
+    view = ProcessingJob.model_validate(job).model_dump(mode="json")
+    # Only views without the markdown are cached: those are what pollers of a
+    # running job fetch, and a whole document per entry would fill the cache
+    if not job.markdown_content:
+        status_cache.put(job.id, FULL, job.status, view)
+    return view
 
 
 @router.get("/{job_id}/status", response_model=OCRStatus)
@@ -35,6 +107,10 @@ def get_job_status(
     db: Session = Depends(get_db)
 ):
     """Get processing job status."""
+    cached = status_cache.get(job_id, STATUS)
+    if cached is not None:
+        return cached
+    
     job = db.query(ProcessingJobModel).filter(ProcessingJobModel.id == job_id).first()
     if not job:
         raise HTTPException(
@@ -42,14 +118,78 @@ def get_job_status(
             detail=f"Job {job_id} not found"
         )
     
-    return OCRStatus(
+    # Pages are checkpointed as they come back, so partial progress is visible
+    progress = None
+    if job.status == JobStatus.COMPLETED:
+        progress = 1.0
+    elif job.document.page_count:
+        done = db.query(OCRPageModel).filter(OCRPageModel.job_id == job_id).count()
+        progress = min(done / job.document.page_count, 1.0)
+    
+    view = OCRStatus(
         job_id=job.id,
         document_id=job.document_id,
         status=job.status,
+        progress=progress,
         error_message=job.error_message
+    ).model_dump(mode="json")
+    status_cache.put(job.id, STATUS, job.status, view)
+    return view
+
+
+@router.post("/{job_id}/resume", response_model=OCRStatus, status_code=status.HTTP_202_ACCEPTED)
+def resume_job(
+    job_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a failed job again.
+    
+    Pages the job already has are kept, so only the missing pages are sent to OCR.
+    """
+    job = db.query(ProcessingJobModel).filter(ProcessingJobModel.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+    if job.status != JobStatus.FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Only failed jobs can be resumed, job {job_id} is {job.status.value}"
+        )
+    admission.check_job_capacity()
+    
+    job.status = JobStatus.PENDING
+    db.commit()
+    status_cache.invalidate(job.id)
+    db.refresh(job)
+    job_scheduler.submit(job, job.document)
+    
+    return OCRStatus(
+        job_id=job.id,
+        document_id=job.document_id,
+        status=job.status
     )
 
 
+@router.get("/{job_id}/pages", response_model=List[OCRPage])
+def get_job_pages(
+    job_id: int,
+    db: Session = Depends(get_db)
+):
+    """Get the per-page results of a job, including where each page came from."""
+    job = db.query(ProcessingJobModel).filter(ProcessingJobModel.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+    
+    return db.query(OCRPageModel).filter(
+        OCRPageModel.job_id == job_id
+    ).order_by(OCRPageModel.page_index).all()
+
 @router.get("/{job_id}/download")
 def download_result(
     job_id: int,
@@ -70,10 +210,15 @@ def download_result(
         )
     
     if not job.output_path or not os.path.exists(job.output_path):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Output file not found"
-        )
+        if not job.markdown_content:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Output file not found"
+            )
+        # The export was evicted by the storage sweeper, rewrite it from the database
+        job.output_path = write_markdown_export(job.document, job, job.markdown_content)
+        db.commit()
+        status_cache.invalidate(job.id)
     
     return FileResponse(
         job.output_path,
@@ -82,6 +227,46 @@ def download_result(
     )
 
 
+
+@router.get("/{job_id}/export")
+def export_result(
+    job_id: int,
+    format: ExportFormat = Query(ExportFormat.DOCX, description="docx, html or txt"),
+    db: Session = Depends(get_db)
+):
+    """
+    Download the OCR result rendered as Word, HTML or plain text.
+    
+    Right-to-left paragraphs are marked as such in every format. Rendered files
+    are cached, so repeat downloads are served without re-rendering.
+    """
+    job = db.query(ProcessingJobModel).filter(ProcessingJobModel.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+    
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Job {job_id} is not completed yet. Status: {job.status}"
+        )
+    
+    # Sent from the open file, which eviction of the cached copy cannot take away
+    export = open_job_export(job, format)
+    
+    original_name = job.document.original_filename.rsplit('.', 1)[0]
+    filename = quote(f"{original_name}_ocr.{format.value}")
+    return StreamingResponse(
+        iter_export(export),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f"attachment; filename*=utf-8''{filename}",
+            "Content-Length": str(os.fstat(export.fileno()).st_size)
+        }
+    )
+
 @router.get("/document/{document_id}", response_model=List[ProcessingJob])
 def get_document_jobs(
     document_id: int,
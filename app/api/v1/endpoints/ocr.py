@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from app.db.deps import get_db
-from app.db.session import SessionLocal
 from app.schemas.ocr import OCRRequest, OCRResponse, OCRStatus
+from app.services.admission import admission
+from app.services.idempotency import begin as begin_idempotent, fingerprint
 from app.services.ocr_service import process_ocr
+from app.services.scheduler import job_scheduler
 from app.models.document import Document as DocumentModel
 from app.models.processing_job import ProcessingJob as ProcessingJobModel
 from app.models.processing_job import JobStatus
@@ -16,7 +19,7 @@ router = APIRouter()
 
 
 @router.post("/process", response_class=FileResponse)
-async def process_document_ocr(
+def process_document_ocr(
     request: OCRRequest,
     db: Session = Depends(get_db)
 ):
@@ -25,6 +28,9 @@ async def process_document_ocr(
     
     This endpoint processes the document synchronously and returns the .md file directly.
     For asynchronous processing, use /process-async endpoint.
+    
+    At most MAX_SYNC_OCR_REQUESTS calls run at once; further calls are refused
+    with 503 and a Retry-After of when a call is expected to finish.
     """
     # Verify document exists
     document = db.query(DocumentModel).filter(DocumentModel.id == request.document_id).first()
@@ -34,57 +40,70 @@ async def process_document_ocr(
             detail=f"Document {request.document_id} not found"
         )
     
-    # Process OCR
-    try:
-        job = process_ocr(db, request.document_id)
-        
-        # Check if processing was successful
-        if job.status != JobStatus.COMPLETED:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"OCR processing failed: {job.error_message or 'Unknown error'}"
+    # Holds one of MAX_SYNC_OCR_REQUESTS slots; a 503 with Retry-After when none is free
+    with admission.sync_ocr_slot():
+        try:
+            job = process_ocr(db, request.document_id)
+            
+            # Check if processing was successful
+            if job.status != JobStatus.COMPLETED:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"OCR processing failed: {job.error_message or 'Unknown error'}"
+                )
+            
+            # Verify file exists
+            if not job.output_path or not os.path.exists(job.output_path):
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Output file not found"
+                )
+            
+            # Generate filename for download
+            original_name = document.original_filename.rsplit('.', 1)[0] if '.' in document.original_filename else document.original_filename
+            download_filename = f"{original_name}_ocr.md"
+            
+            # Return the markdown file
+            return FileResponse(
+                job.output_path,
+                media_type="text/markdown",
+                filename=download_filename,
+                headers={"Content-Disposition": f'attachment; filename="{download_filename}"'}
             )
-        
-        # Verify file exists
-        if not job.output_path or not os.path.exists(job.output_path):
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to process OCR: {e}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Output file not found"
+                detail=f"Failed to process OCR: {str(e)}"
             )
-        
-        # Generate filename for download
-        original_name = document.original_filename.rsplit('.', 1)[0] if '.' in document.original_filename else document.original_filename
-        download_filename = f"{original_name}_ocr.md"
-        
-        # Return the markdown file
-        return FileResponse(
-            job.output_path,
-            media_type="text/markdown",
-            filename=download_filename,
-            headers={"Content-Disposition": f'attachment; filename="{download_filename}"'}
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Failed to process OCR: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to process OCR: {str(e)}"
-        )
 
 
 @router.post("/process-async", response_model=OCRStatus, status_code=status.HTTP_202_ACCEPTED)
 async def process_document_ocr_async(
     request: OCRRequest,
-    background_tasks: BackgroundTasks,
+    http_request: Request,
+    client_id: Optional[str] = Header(None, alias="X-Client-Id", max_length=64),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     db: Session = Depends(get_db)
 ):
     """
     Start OCR processing for a document asynchronously.
     
-    This endpoint accepts a document ID and starts the OCR process in the background.
+    This endpoint accepts a document ID and queues the OCR process in the background.
     Returns immediately with a job ID that can be used to check the status.
+    
+    Queued jobs run by priority, and clients (the X-Client-Id header, or the
+    caller's address) share the workers fairly, so one client's bulk submission
+    does not hold up everyone else.
+    
+    Retries sent with the same Idempotency-Key header and body return the job
+    created by the first request instead of queueing the document again.
+    
+    Once MAX_PENDING_JOBS jobs are queued, submissions are refused with 503
+    and a Retry-After of when the workers are expected to have room.
     """
     # Verify document exists
     document = db.query(DocumentModel).filter(DocumentModel.id == request.document_id).first()
@@ -94,33 +113,37 @@ async def process_document_ocr_async(
             detail=f"Document {request.document_id} not found"
         )
     
-    # Create a new job
-    from app.models.processing_job import JobStatus
-    job = ProcessingJobModel(
-        document_id=request.document_id,
-        status=JobStatus.PENDING
+    idempotent = await begin_idempotent(
+        db, "ocr.process_async", idempotency_key,
+        fingerprint(request.model_dump_json(), client_id or "")
     )
-    db.add(job)
-    db.commit()
-    db.refresh(job)
+    if idempotent.replay is not None:
+        return idempotent.replay
     
-    # Add background task
-    background_tasks.add_task(process_ocr_task, request.document_id, job.id)
+    # Create a new job, unless the queue is full (503 with Retry-After)
+    try:
+        admission.check_job_capacity()
+        job = ProcessingJobModel(
+            document_id=request.document_id,
+            status=JobStatus.PENDING,
+            priority=request.priority,
+            client_id=client_id or (http_request.client.host if http_request.client else None)
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+    except Exception:
+        idempotent.abandon()
+        raise
     
-    return OCRStatus(
+    # Queue for the background workers
+    job_scheduler.submit(job, document)
+    
+    response = OCRStatus(
         job_id=job.id,
         document_id=job.document_id,
         status=job.status
     )
-
-
-def process_ocr_task(document_id: int, job_id: int):
-    """Background task to process OCR."""
-    db = SessionLocal()
-    try:
-        process_ocr(db, document_id, job_id)
-    except Exception as e:
-        logger.error(f"Background OCR task failed: {e}")
-    finally:
-        db.close()
+    idempotent.complete(status.HTTP_202_ACCEPTED, response.model_dump(mode="json"))
+    return response
 
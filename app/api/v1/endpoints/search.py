@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.db.deps import get_db
+from app.schemas.search import SearchHit, SearchResults
+from app.services.search_index import search_pages
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/", response_model=SearchResults)
+def search(
+    q: str = Query(..., min_length=1, description="Search terms, all of which must match"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search over the OCR results of all documents.
+    
+    Arabic text is matched regardless of tashkeel, tatweel and alef, hamza or
+    ta marbuta spelling. Hits are ranked by relevance and carry the page number
+    and a highlighted snippet.
+    """
+    try:
+        hits = search_pages(db, q, limit=limit, offset=offset)
+    except NotImplementedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=str(e)
+        )
+    
+    return SearchResults(
+        query=q,
+        hits=[
+            SearchHit(
+                document_id=hit.document_id,
+                job_id=hit.job_id,
+                page_number=hit.page_index + 1,
+                snippet=hit.snippet,
+                score=hit.score
+            )
+            for hit in hits
+        ]
+    )
@@ -0,0 +1,110 @@
+"""
+Administrative commands that run against the database and storage directly.
+
+    python -m app.cli import-tree /srv/archive --enqueue
+    python -m app.cli rerender --all --format docx
+"""
+import argparse
+import logging
+import os
+
+from app.core.config import settings
+from app.db.base_class import Base
+from app.db.session import SessionLocal, engine
+from app.services.bulk_import import LINK_MODES, BulkImporter
+from app.services.cpu_pool import cpu_pool
+from app.services.export_renderer import ExportFormat
+
+
+def import_tree(args) -> None:
+    """Register the PDFs under a directory as documents, optionally queueing OCR jobs."""
+    Base.metadata.create_all(bind=engine)
+    # Page counting is spread over worker processes
+    cpu_pool.workers = args.workers
+    cpu_pool.start()
+    importer = BulkImporter(
+        settings.UPLOAD_DIR,
+        batch_size=args.batch_size,
+        link=args.link,
+        count_pages=not args.no_page_counts,
+        enqueue=args.enqueue,
+        priority=args.priority,
+        client_id=args.client_id
+    )
+    db = SessionLocal()
+    try:
+        stats = importer.run(db, args.directory)
+    finally:
+        db.close()
+        cpu_pool.stop()
+
+    print(
+        f"Scanned {stats.scanned} files in {stats.seconds:.1f}s ({stats.files_per_second:.0f} files/s): "
+        f"{stats.registered} registered, {stats.skipped} already registered, {stats.failed} failed, "
+        f"{stats.jobs} OCR jobs queued"
+    )
+    print(
+        f"Linked {stats.bytes / (1024 * 1024):.1f}MB: {stats.links['reflink']} reflinks, "
+        f"{stats.links['hardlink']} hardlinks, {stats.links['copy']} copies"
+    )
+    if stats.jobs:
+        print(f"A running server picks up the queued jobs within {settings.SCHEDULER_POLL_SECONDS}s")
+
+
+def rerender(args) -> None:
+    """Rebuild job output from the archived raw OCR responses, without OCR API calls."""
+    from app.services.rerender import completed_job_ids, rerender_jobs
+
+    Base.metadata.create_all(bind=engine)
+    cpu_pool.workers = args.workers
+    cpu_pool.start()
+    db = SessionLocal()
+    try:
+        job_ids = args.job_ids or completed_job_ids(db, args.after_job_id)
+        print(f"Re-rendering {len(job_ids)} jobs with {args.workers} processes")
+        stats = rerender_jobs(
+            db, job_ids, [ExportFormat(value) for value in args.format], batch_size=args.batch_size
+        )
+    finally:
+        db.close()
+        cpu_pool.stop()
+
+    print(
+        f"Re-rendered {stats.jobs} jobs, {stats.pages} pages in {stats.seconds:.1f}s "
+        f"({stats.pages_per_second:.0f} pages/s): {stats.skipped} without an archive, {stats.failed} failed"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import-tree", help=import_tree.__doc__)
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--enqueue", action="store_true", help="queue an OCR job for every new document")
+    import_parser.add_argument("--priority", type=int, default=0)
+    import_parser.add_argument("--client-id", default="bulk-import", help="client the jobs are scheduled as")
+    import_parser.add_argument("--link", choices=LINK_MODES, default="auto")
+    import_parser.add_argument("--batch-size", type=int, default=settings.BULK_IMPORT_BATCH_SIZE)
+    import_parser.add_argument("--no-page-counts", action="store_true", help="skip reading page counts")
+    import_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="page counting processes")
+    import_parser.set_defaults(handler=import_tree)
+
+    rerender_parser = commands.add_parser("rerender", help=rerender.__doc__)
+    targets = rerender_parser.add_mutually_exclusive_group(required=True)
+    targets.add_argument("--job-id", dest="job_ids", type=int, action="append", help="job to rebuild (repeatable)")
+    targets.add_argument("--all", action="store_true", help="rebuild every completed job")
+    rerender_parser.add_argument("--after-job-id", type=int, default=0, help="with --all, start after this job")
+    rerender_parser.add_argument("--format", action="append", default=[], choices=[value.value for value in ExportFormat],
+                                 help="export to render again right away (repeatable)")
+    rerender_parser.add_argument("--batch-size", type=int, default=settings.RERENDER_BATCH_SIZE)
+    rerender_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="rendering processes")
+    rerender_parser.set_defaults(handler=rerender)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
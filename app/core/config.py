@@ -11,6 +11,22 @@ class Settings(BaseSettings):
     # Mistral API
     MISTRAL_API_KEY: str
     
+    # OCR requests are spread over MISTRAL_API_KEY and these comma-separated
+    # keys, each with its own rate budget; throttled or failing keys are
+    # quarantined for a while
+    MISTRAL_EXTRA_API_KEYS: str = ""
+    OCR_KEY_REQUESTS_PER_SECOND: float = 0.0  # per key, 0 for no client-side limit
+    OCR_KEY_BURST: int = 1
+    OCR_KEY_QUARANTINE_SECONDS: float = 30.0
+    OCR_KEY_MAX_FAILURES: int = 3  # failures in a row before a key is quarantined
+    OCR_KEY_ACQUIRE_TIMEOUT: float = 60.0
+    
+    # "mistral", or "fake" for the local fake OCR backend (load tests without API
+    # calls, with OCR_FILE_STORE=local or none)
+    OCR_BACKEND: str = "mistral"
+    FAKE_OCR_LATENCY_SECONDS: float = 0.5
+    FAKE_OCR_REQUESTS_PER_SECOND: float = 0.0  # per key, 429 above it
+    
     # Database
     POSTGRES_SERVER: str = "localhost"
     POSTGRES_USER: str = "postgres"
@@ -42,10 +58,120 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     EXPORT_DIR: str = "exports"
     
+    # Rendered DOCX/HTML/TXT exports, evicted least recently used first
+    EXPORT_CACHE_DIR: str = "exports/.cache"
+    EXPORT_CACHE_MAX_BYTES: int = 500 * 1024 * 1024  # 500MB
+    
+    # Raw OCR responses, one gzip archive per job, so output can be re-rendered
+    # ("python -m app.cli rerender") without calling the OCR API again
+    RAW_ARCHIVE_ENABLED: bool = True
+    RAW_ARCHIVE_DIR: str = "exports/.raw"
+    RERENDER_BATCH_SIZE: int = 64  # jobs per batch sent to the CPU pool
+    
+    # Bulk registration of PDFs already on the server (admin API and
+    # "python -m app.cli import-tree"); the API only imports under these
+    # comma-separated roots
+    BULK_IMPORT_ROOTS: str = ""
+    BULK_IMPORT_BATCH_SIZE: int = 1000
+    
+    # Storage lifecycle sweeper (retention of 0 days keeps rows forever)
+    STORAGE_SWEEPER_ENABLED: bool = True
+    SWEEPER_INTERVAL_SECONDS: int = 60
+    SWEEPER_BATCH_SIZE: int = 500
+    SWEEPER_ORPHAN_GRACE_SECONDS: int = 3600
+    RETENTION_FAILED_DAYS: int = 0
+    RETENTION_COMPLETED_DAYS: int = 0
+    EXPORT_QUOTA_BYTES: int = 0  # 0 disables the export quota
+    
+    # Cache of job status views for pollers: "memory" (per process), "file"
+    # (shared stand-in), "redis" or "none". Running jobs expire after the TTL,
+    # finished ones stay until they change
+    STATUS_CACHE_BACKEND: str = "memory"
+    STATUS_CACHE_TTL_SECONDS: float = 2.0
+    STATUS_CACHE_MAX_ENTRIES: int = 10000
+    STATUS_CACHE_DIR: str = "exports/.status_cache"
+    STATUS_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    
+    # Tracing ("none", "jsonl" or "otlp" for OTLP/JSON lines) and on-demand profiling
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "traces/spans.jsonl"
+    PROFILE_DIR: str = "profiles"
+    
+    # Per-request SQL query counts, logged (as a warning above QUERY_STATS_WARN_QUERIES)
+    # and with QUERY_STATS_HEADER returned in an X-DB-Stats header for debugging
+    QUERY_STATS_ENABLED: bool = True
+    QUERY_STATS_HEADER: bool = False
+    QUERY_STATS_WARN_QUERIES: int = 100
+    
+    ADMIN_TOKEN: Optional[str] = None  # admin endpoints are disabled without it
+    
     # OCR Settings
     OCR_MODEL: str = "mistral-ocr-latest"
     MAX_RETRIES: int = 5
     RETRY_BACKOFF: int = 1
+    OCR_CHUNK_PAGES: int = 16  # pages per OCR request, each checkpointed (0 = whole document)
+    
+    # Where PDFs are uploaded once for OCR: "mistral" file storage, "local"
+    # stand-in directory, or "none" to send base64 data URLs with every request
+    OCR_FILE_STORE: str = "mistral"
+    OCR_FILE_STORE_DIR: str = "uploads/.file_store"
+    OCR_SIGNED_URL_HOURS: int = 24
+    
+    # Images in OCR results, stored once per distinct content and linked from the markdown
+    OCR_EXTRACT_IMAGES: bool = False
+    IMAGE_STORE_DIR: str = "exports/images"
+    IMAGE_URL_PREFIX: str = "/api/v1/images/"
+    
+    # Hedged OCR calls: duplicate a call slower than the given percentile of
+    # recent calls (per page), with hedges capped at a fraction of all calls
+    OCR_HEDGING_ENABLED: bool = False
+    OCR_HEDGE_PERCENTILE: float = 95
+    OCR_HEDGE_BUDGET: float = 0.1
+    OCR_HEDGE_MIN_SAMPLES: int = 20
+    OCR_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    
+    # Admission control: synchronous OCR calls running at once and queued jobs
+    # beyond which requests get 503 with Retry-After (0 = unlimited)
+    MAX_SYNC_OCR_REQUESTS: int = 4
+    MAX_PENDING_JOBS: int = 1000
+    RETRY_AFTER_MAX_SECONDS: int = 300
+    
+    # Idempotency-Key support on upload and async OCR submission: responses are
+    # replayed for the TTL, duplicates wait up to IDEMPOTENCY_WAIT_SECONDS for
+    # the first request, and a claim older than IDEMPOTENCY_LOCK_SECONDS that
+    # never completed is taken over
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0
+    IDEMPOTENCY_LOCK_SECONDS: int = 300
+    
+    # Worker processes for CPU-bound steps (text layer pre-pass, PDF slimming,
+    # base64 encoding); 0 runs them in the calling thread
+    CPU_POOL_WORKERS: int = 2
+    
+    # Background job scheduling (priority, per-client fair share, aging)
+    OCR_WORKERS: int = 2
+    SCHEDULER_AGING_PER_MINUTE: float = 0.1
+    SCHEDULER_FAIR_SHARE_WEIGHT: float = 1.0
+    SCHEDULER_SHORTEST_JOB_FIRST: bool = False
+    SCHEDULER_USAGE_HALF_LIFE_SECONDS: int = 600
+    SCHEDULER_POLL_SECONDS: int = 30  # pick up jobs queued by other processes, 0 disables
+    JOB_LEASE_SECONDS: int = 300  # a processing job not renewed for this long is taken over
+    
+    # Embedded text layer fast path (born-digital pages skip OCR)
+    TEXT_LAYER_FAST_PATH: bool = True
+    TEXT_LAYER_MIN_CHARS: int = 50
+    
+    # Pre-OCR page pruning: blank pages (ink below the ratio at PAGE_PRUNING_DPI)
+    # and exact repeats of another page are not sent to OCR
+    PAGE_PRUNING_ENABLED: bool = False
+    PAGE_BLANK_INK_RATIO: float = 0.00005
+    PAGE_PRUNING_DPI: int = 72
+    
+    # Pre-upload PDF slimming (downsample and recompress scanned images)
+    PDF_OPTIMIZE_ENABLED: bool = False
+    PDF_OPTIMIZE_MIN_SIZE: int = 1024 * 1024  # 1MB
+    PDF_OPTIMIZE_MAX_DPI: int = 200
+    PDF_OPTIMIZE_JPEG_QUALITY: int = 75
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,133 @@
+import cProfile
+import enum
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerMode(str, enum.Enum):
+    CPROFILE = "cprofile"
+    SAMPLING = "sampling"
+
+
+class SamplingProfiler:
+    """
+    Periodically sample the stacks of every other thread.
+
+    Unlike cProfile this also sees the worker threads sync endpoints run in and
+    adds no per-call overhead. Stacks are saved in the folded format read by
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as folded_file:
+            for stack, count in self.samples.most_common():
+                folded_file.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """
+    Profile the next N requests on demand and save one profile file per request.
+
+    cProfile only sees the thread the request handler runs on and, for async
+    endpoints, whatever else the event loop runs meanwhile, so profiled
+    requests are best sent one at a time. Sampling profiles cover all threads.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.mode = ProfilerMode.CPROFILE
+        self.remaining = 0
+        self._lock = threading.Lock()
+
+    def arm(self, requests: int, mode: ProfilerMode) -> None:
+        """Profile the next ``requests`` requests (0 disarms)."""
+        with self._lock:
+            self.remaining = requests
+            self.mode = mode
+        logger.info(f"Profiling the next {requests} requests with {mode.value}")
+
+    def claim(self) -> Optional[ProfilerMode]:
+        """Take one profiling slot for a request, or return None if disarmed."""
+        if not self.remaining:
+            return None
+        with self._lock:
+            if not self.remaining:
+                return None
+            self.remaining -= 1
+            return self.mode
+
+    def start(self, mode: ProfilerMode):
+        if mode == ProfilerMode.SAMPLING:
+            profiler = SamplingProfiler()
+            profiler.start()
+            return profiler
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def finish(self, profiler, label: str) -> str:
+        """Stop a profiler returned by ``start`` and save it; returns the file path."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')}"
+        if isinstance(profiler, SamplingProfiler):
+            profiler.stop()
+            path = os.path.join(self.directory, f"{name}.folded")
+            profiler.dump(path)
+        else:
+            profiler.disable()
+            path = os.path.join(self.directory, f"{name}.prof")
+            profiler.dump_stats(path)
+        logger.info(f"Saved profile {path}")
+        return path
+
+    def saved_profiles(self, limit: int = 50) -> List[str]:
+        """Most recent profile files first."""
+        try:
+            names = [
+                name for name in os.listdir(self.directory)
+                if name.endswith((".prof", ".folded"))
+            ]
+        except FileNotFoundError:
+            return []
+        return sorted(names, reverse=True)[:limit]
+
+
+request_profiler = RequestProfiler(settings.PROFILE_DIR)
@@ -0,0 +1,108 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """Database work done on behalf of one request."""
+    queries: int = 0
+    commits: int = 0
+    rows: int = 0  # rows returned (where the driver reports them) or changed
+    seconds: float = 0.0
+    statements: Optional[List[str]] = field(default=None, repr=False)  # kept when record_statements is set
+
+    def header_value(self) -> str:
+        return f"queries={self.queries}; commits={self.commits}; rows={self.rows}; time_ms={self.seconds * 1000:.1f}"
+
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+# Called with (endpoint, stats) after each request, e.g. by the query budget pytest plugin
+_observers: List[Callable[[str, QueryStats], None]] = []
+
+# Keep the SQL of each statement in the stats, for failure messages in tests
+record_statements = False
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def collect() -> Iterator[QueryStats]:
+    """
+    Count the queries run inside the block, including in threads started from it.
+
+    Sync endpoints run in a thread pool with a copy of the request's context,
+    which still refers to the same stats object.
+    """
+    stats = QueryStats(statements=[] if record_statements else None)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    stats.queries += 1
+    if started:
+        stats.seconds += time.perf_counter() - started.pop()
+    # SQLite reports no row count for SELECTs (-1); PostgreSQL does
+    if cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    if stats.statements is not None:
+        stats.statements.append(statement)
+
+
+def _commit(conn):
+    stats = _current.get()
+    if stats is not None:
+        stats.commits += 1
+
+
+def instrument(engine: Engine) -> None:
+    """Count the queries, commits, rows and time of an engine into the current stats."""
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "commit", _commit)
+
+
+def add_observer(observer: Callable[[str, QueryStats], None]) -> None:
+    _observers.append(observer)
+
+
+def remove_observer(observer: Callable[[str, QueryStats], None]) -> None:
+    _observers.remove(observer)
+
+
+def finish(endpoint: str, stats: QueryStats) -> None:
+    """Log the stats of a finished request and pass them to the observers."""
+    if settings.QUERY_STATS_WARN_QUERIES and stats.queries > settings.QUERY_STATS_WARN_QUERIES:
+        logger.warning(f"{endpoint} ran {stats.queries} queries ({stats.header_value()})")
+    else:
+        logger.debug(f"{endpoint}: {stats.header_value()}")
+    for observer in list(_observers):
+        observer(endpoint, stats)
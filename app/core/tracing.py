@@ -0,0 +1,197 @@
+import contextvars
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# (trace id, span id) of a span, enough to continue its trace elsewhere
+TraceContext = Tuple[str, str]
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+class JsonLinesExporter:
+    """Append one JSON object per finished span to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _record(self, span: Span) -> Dict[str, Any]:
+        return {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": span.start_ns / 1e9,
+            "duration_ms": round(span.duration_ms, 3),
+            "attributes": span.attributes,
+            "error": span.error,
+        }
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(self._record(span), ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as spans_file:
+                spans_file.write(line + "\n")
+
+
+class OTLPJsonExporter(JsonLinesExporter):
+    """
+    Write spans in the OTLP/JSON encoding, one ExportTraceServiceRequest per line.
+
+    Stands in for an OpenTelemetry collector: the file can be replayed to any
+    OTLP/HTTP endpoint or loaded by tools that read the OTLP file format.
+    """
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _record(self, span: Span) -> Dict[str, Any]:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": key, "value": self._value(value)} for key, value in span.attributes.items()
+            ],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": settings.PROJECT_NAME}}
+                ]},
+                "scopeSpans": [{"scope": {"name": "app"}, "spans": [otlp_span]}],
+            }]
+        }
+
+
+def _create_exporter() -> Optional[JsonLinesExporter]:
+    exporters = {"jsonl": JsonLinesExporter, "otlp": OTLPJsonExporter}
+    name = settings.TRACING_EXPORTER.lower()
+    if name in ("", "none"):
+        return None
+    if name not in exporters:
+        logger.warning(f"Unknown tracing exporter {settings.TRACING_EXPORTER!r}, tracing disabled")
+        return None
+    return exporters[name](settings.TRACING_FILE)
+
+
+exporter = _create_exporter()
+
+_current: contextvars.ContextVar[Optional[TraceContext]] = contextvars.ContextVar("trace_context", default=None)
+
+
+def current_context() -> Optional[TraceContext]:
+    """Return the context of the active span, to hand over to background work."""
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    context = _current.get()
+    return context[0] if context else None
+
+
+@contextmanager
+def use_context(context: Optional[TraceContext]) -> Iterator[None]:
+    """Make spans opened inside the block children of a span from another thread or request."""
+    token = _current.set(context)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a span of the current trace, starting a new trace if there is none.
+
+    Yields None when tracing is disabled, so callers that add attributes must
+    check for it. Exceptions are recorded on the span and re-raised.
+    """
+    if exporter is None:
+        yield None
+        return
+
+    parent = _current.get()
+    current = Span(
+        name=name,
+        trace_id=parent[0] if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent[1] if parent else None,
+        start_ns=time.time_ns(),
+        attributes=attributes
+    )
+    token = _current.set((current.trace_id, current.span_id))
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        try:
+            exporter.export(current)
+        except Exception as e:
+            logger.warning(f"Failed to export span {name}: {e}")
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[TraceContext]:
+    """Parse a W3C ``traceparent`` header into a trace context."""
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return match.group(1), match.group(2)
+
+
+def format_traceparent(context: TraceContext) -> str:
+    return f"00-{context[0]}-{context[1]}-01"
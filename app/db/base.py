@@ -2,3 +2,5 @@ from app.db.base_class import Base
 from app.models.document import Document  # noqa
 from app.models.processing_job import ProcessingJob  # noqa
 
+from app.models.ocr_page import OCRPage  # noqa
+from app.models.idempotency_key import IdempotencyKey  # noqa
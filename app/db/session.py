@@ -1,5 +1,6 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from app.core import query_stats
 from app.core.config import settings
 
 # Use different engine configuration for SQLite vs PostgreSQL
@@ -18,3 +19,5 @@ else:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if settings.QUERY_STATS_ENABLED:
+    query_stats.instrument(engine)
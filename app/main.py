@@ -1,18 +1,47 @@
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import query_stats, tracing
 from app.core.config import settings
+from app.core.profiling import request_profiler
 from app.api.v1.api import api_router
 from app.db.base_class import Base
 from app.db.session import engine
+from app.services.admission import admission
+from app.services.cpu_pool import cpu_pool
+from app.services.search_index import ensure_search_index
+from app.services.scheduler import job_scheduler
+from app.services.storage_sweeper import storage_sweeper
+
+logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+ensure_search_index(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services with the application."""
+    cpu_pool.start()
+    job_scheduler.start()
+    if settings.STORAGE_SWEEPER_ENABLED:
+        storage_sweeper.start()
+    yield
+    storage_sweeper.stop()
+    job_scheduler.stop()
+    cpu_pool.stop()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description="Mistral OCR API - أداة تحرير الوثائق العربية بالذكاء الاصطناعي",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -25,6 +54,53 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Open the root span of each request and profile it if profiling is armed."""
+    mode = None
+    if not request.url.path.startswith(f"{settings.API_V1_STR}/admin"):
+        mode = request_profiler.claim()
+    profiler = None
+    if mode:
+        try:
+            profiler = request_profiler.start(mode)
+        except ValueError as e:  # another cProfile is already active
+            logger.warning(f"Could not profile {request.url.path}: {e}")
+    
+    parent = tracing.parse_traceparent(request.headers.get("traceparent"))
+    try:
+        with tracing.use_context(parent):
+            with tracing.span(
+                f"{request.method} {request.url.path}",
+                http_method=request.method,
+                http_path=request.url.path
+            ) as span:
+                response = await call_next(request)
+                if span:
+                    span.set(http_status=response.status_code)
+                    response.headers["X-Trace-Id"] = span.trace_id
+    finally:
+        if profiler:
+            request_profiler.finish(profiler, f"{request.method} {request.url.path}")
+    return response
+
+
+@app.middleware("http")
+async def count_queries(request: Request, call_next):
+    """Count the SQL queries of each request, reported in logs and the X-DB-Stats header."""
+    if not settings.QUERY_STATS_ENABLED:
+        return await call_next(request)
+    with query_stats.collect() as stats:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    query_stats.finish(f"{request.method} {getattr(route, 'path', request.url.path)}", stats)
+    if settings.QUERY_STATS_HEADER:
+        response.headers["X-DB-Stats"] = stats.header_value()
+    return response
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
@@ -40,3 +116,27 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness for load balancers: 503 while the database is unreachable or
+    the instance is at its OCR limits, so traffic goes to other instances.
+    
+    /health only reports that the process is up.
+    """
+    report = admission.readiness()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        report["database"] = "ok"
+    except Exception as e:
+        logger.warning(f"Readiness database check failed: {e}")
+        report["database"] = "unavailable"
+        report["ready"] = False
+    
+    if report["ready"]:
+        return report
+    headers = {"Retry-After": str(report["retry_after"])} if report["retry_after"] else None
+    return JSONResponse(status_code=503, content=report, headers=headers)
@@ -19,6 +19,12 @@ class Document(Base):
     original_filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)
+    page_count = Column(Integer, nullable=True)
+    source_path = Column(String(1000), nullable=True, index=True)  # registered in place by bulk import
+    # Copy in the OCR provider's file storage, reused across retries and re-OCR
+    provider_file_id = Column(String(64), nullable=True)
+    signed_url = Column(Text, nullable=True)
+    signed_url_expires_at = Column(DateTime, nullable=True)  # UTC
     status = Column(SQLEnum(DocumentStatus), default=DocumentStatus.UPLOADED, nullable=False)
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from app.db.base_class import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(64), nullable=False)  # endpoint the key was used on
+    key = Column(String(255), nullable=False)
+    fingerprint = Column(String(64), nullable=False)  # SHA-256 of the request
+    status_code = Column(Integer, nullable=True)  # None while the first request runs
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)  # UTC
+    expires_at = Column(DateTime, nullable=False, index=True)  # UTC
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(scope='{self.scope}', key='{self.key}', status_code={self.status_code})>"
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, DateTime, Text, ForeignKey, UniqueConstraint, Enum as SQLEnum
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship, backref
+from app.db.base_class import Base
+import enum
+
+
+class PageSource(str, enum.Enum):
+    TEXT_LAYER = "text_layer"
+    OCR = "ocr"
+    BLANK = "blank"  # pruned before OCR, stored empty
+    DUPLICATE = "duplicate"  # pruned before OCR, markdown of the page it repeats
+
+
+class OCRPage(Base):
+    __tablename__ = "ocr_pages"
+    __table_args__ = (
+        UniqueConstraint("job_id", "page_index", name="uq_ocr_pages_job_page"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("processing_jobs.id"), nullable=False, index=True)
+    page_index = Column(Integer, nullable=False)
+    source = Column(SQLEnum(PageSource), nullable=False)
+    markdown = Column(Text, nullable=False, default="")
+    attempts = Column(Integer, nullable=False, default=0)  # OCR attempts, 0 for text layer pages
+    duration_ms = Column(Integer, nullable=True)  # OCR request time per page
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    # Relationship
+    job = relationship(
+        "ProcessingJob",
+        backref=backref("pages", order_by="OCRPage.page_index")
+    )
+    
+    def __repr__(self):
+        return f"<OCRPage(job_id={self.job_id}, page_index={self.page_index}, source='{self.source}')>"
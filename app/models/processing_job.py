@@ -22,6 +22,15 @@ class ProcessingJob(Base):
     markdown_content = Column(Text, nullable=True)
     error_message = Column(Text, nullable=True)
     attempts = Column(Integer, default=0, nullable=False)
+    priority = Column(Integer, default=0, nullable=False)
+    client_id = Column(String(64), nullable=True, index=True)
+    image_count = Column(Integer, default=0, nullable=False)
+    image_bytes_saved = Column(Integer, default=0, nullable=False)  # deduplicated image bytes
+    blank_pages = Column(Integer, default=0, nullable=False)  # pages pruned as blank
+    duplicate_pages = Column(Integer, default=0, nullable=False)  # pages pruned as repeats
+    export_revision = Column(Integer, default=0, nullable=False)  # bumped whenever the pages change; keys cached exports
+    original_pdf_size = Column(Integer, nullable=True)
+    optimized_pdf_size = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     completed_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,6 +1,10 @@
 from app.schemas.document import Document, DocumentCreate, DocumentUpdate, DocumentInDB
 from app.schemas.processing_job import ProcessingJob, ProcessingJobCreate, ProcessingJobUpdate, ProcessingJobInDB
 from app.schemas.ocr import OCRRequest, OCRResponse, OCRStatus
+from app.schemas.ocr_page import OCRPage
+from app.schemas.search import SearchHit, SearchResults
+from app.schemas.admin import ProfilingRequest, ProfilingStatus, BulkImportRequest, BulkImportStatus, OCRKeyUsage
+from app.schemas.admin import RerenderRequest, RerenderStatus
 
 __all__ = [
     "Document",
@@ -14,5 +18,15 @@ __all__ = [
     "OCRRequest",
     "OCRResponse",
     "OCRStatus",
+    "OCRPage",
+    "SearchHit",
+    "SearchResults",
+    "ProfilingRequest",
+    "ProfilingStatus",
+    "BulkImportRequest",
+    "BulkImportStatus",
+    "OCRKeyUsage",
+    "RerenderRequest",
+    "RerenderStatus",
 ]
 
@@ -0,0 +1,74 @@
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+from app.core.profiling import ProfilerMode
+from app.services.export_renderer import ExportFormat
+
+
+class ProfilingRequest(BaseModel):
+    requests: int = Field(..., ge=0, le=1000, description="Number of upcoming requests to profile, 0 to stop")
+    mode: ProfilerMode = ProfilerMode.CPROFILE
+
+
+class ProfilingStatus(BaseModel):
+    mode: ProfilerMode
+    remaining: int
+    directory: str
+    profiles: List[str]
+
+
+class BulkImportRequest(BaseModel):
+    directory: str = Field(..., description="Server-side directory to register the PDFs of, recursively")
+    enqueue: bool = Field(False, description="Queue an OCR job for every new document")
+    priority: int = Field(0, ge=-100, le=100)
+    link: Literal["auto", "reflink", "hardlink", "copy"] = "auto"
+    count_pages: bool = True
+
+
+class OCRKeyUsage(BaseModel):
+    name: str
+    healthy: bool
+    quarantined_for: float  # seconds
+    in_flight: int
+    requests: int
+    pages: int
+    failures: int
+    throttled: int
+    busy_seconds: float
+    last_error: Optional[str] = None
+
+
+class BulkImportStatus(BaseModel):
+    id: int
+    directory: str
+    state: Literal["running", "completed", "cancelled", "failed"]
+    error: Optional[str] = None
+    scanned: int
+    registered: int
+    skipped: int
+    failed: int
+    jobs: int
+    links: Dict[str, int]
+    bytes: int
+    seconds: float
+    files_per_second: float
+
+
+class RerenderRequest(BaseModel):
+    job_ids: Optional[List[int]] = Field(None, description="Jobs to rebuild, otherwise completed jobs after after_job_id")
+    after_job_id: int = Field(0, ge=0)
+    limit: int = Field(500, ge=1, le=10000, description="Most jobs rebuilt by one run")
+    formats: List[ExportFormat] = Field(default_factory=list, description="Exports to render again right away")
+
+
+class RerenderStatus(BaseModel):
+    id: int
+    state: Literal["running", "completed", "cancelled", "failed"]
+    error: Optional[str] = None
+    total: int  # jobs selected for the run
+    jobs: int
+    pages: int
+    skipped: int
+    failed: int
+    seconds: float
+    pages_per_second: float
+    next_after_job_id: Optional[int] = None  # pass as after_job_id to continue, None when done
@@ -22,6 +22,7 @@ class DocumentUpdate(BaseModel):
 class DocumentInDB(DocumentBase):
     id: int
     file_path: str
+    page_count: Optional[int] = None
     status: DocumentStatus
     error_message: Optional[str] = None
     created_at: datetime
@@ -1,10 +1,11 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.models.processing_job import JobStatus
 
 
 class OCRRequest(BaseModel):
     document_id: int
+    priority: int = Field(0, ge=-100, le=100, description="Higher runs sooner")
 
 
 class OCRStatus(BaseModel):
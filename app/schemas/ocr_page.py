@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+from app.models.ocr_page import PageSource
+
+
+class OCRPage(BaseModel):
+    job_id: int
+    page_index: int
+    source: PageSource
+    markdown: str
+    attempts: int = 0
+    duration_ms: Optional[int] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -28,6 +28,14 @@ class ProcessingJobInDB(ProcessingJobBase):
     markdown_content: Optional[str] = None
     error_message: Optional[str] = None
     attempts: int
+    priority: int = 0
+    client_id: Optional[str] = None
+    image_count: int = 0
+    image_bytes_saved: int = 0
+    blank_pages: int = 0
+    duplicate_pages: int = 0
+    original_pdf_size: Optional[int] = None
+    optimized_pdf_size: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     completed_at: Optional[datetime] = None
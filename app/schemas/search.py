@@ -0,0 +1,18 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    document_id: int
+    job_id: int
+    page_number: int
+    snippet: str
+    score: float
+    
+    class Config:
+        from_attributes = True
+
+
+class SearchResults(BaseModel):
+    query: str
+    hits: List[SearchHit]
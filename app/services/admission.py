@@ -0,0 +1,135 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.services.scheduler import job_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest call in the moving average of synchronous OCR times
+DURATION_SMOOTHING = 0.2
+
+# Assumed OCR time before any call has completed
+DEFAULT_OCR_SECONDS = 30.0
+
+
+def _overloaded(detail: str, retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+class AdmissionController:
+    """
+    Sheds OCR work the instance cannot absorb instead of queueing it without bound.
+
+    Synchronous OCR calls hold a connection (and their PDF and results in
+    memory) for the whole OCR run, so at most ``max_sync`` run at once.
+    Asynchronous submissions are refused once ``max_pending`` jobs are queued.
+    Rejections are 503s whose Retry-After is when capacity is expected back:
+    the next synchronous call to finish, or the time for the workers to drain
+    the queue below the limit. A limit of 0 disables it.
+    """
+
+    def __init__(self, max_sync: int, max_pending: int, max_retry_after: int = 300):
+        self.max_sync = max_sync
+        self.max_pending = max_pending
+        self.max_retry_after = max_retry_after
+        self._lock = threading.Lock()
+        self._sync_started: Dict[int, float] = {}  # slot token -> start time
+        self._next_token = 0
+        self.mean_sync_seconds: Optional[float] = None
+        self.rejected_sync = 0
+        self.rejected_jobs = 0
+
+    def _clamp(self, seconds: float) -> int:
+        return max(1, min(self.max_retry_after, math.ceil(seconds)))
+
+    def _sync_retry_after(self, now: float) -> int:
+        expected = self.mean_sync_seconds or DEFAULT_OCR_SECONDS
+        remaining = min((started + expected - now for started in self._sync_started.values()), default=0)
+        return self._clamp(remaining)
+
+    def _pending_retry_after(self, pending: int) -> int:
+        per_job = job_scheduler.mean_service_seconds or DEFAULT_OCR_SECONDS
+        excess = pending - self.max_pending + 1
+        return self._clamp(excess * per_job / max(job_scheduler.workers, 1))
+
+    @contextmanager
+    def sync_ocr_slot(self) -> Iterator[None]:
+        """Hold one of the synchronous OCR slots, or raise a 503 if none is free."""
+        now = time.monotonic()
+        with self._lock:
+            if self.max_sync and len(self._sync_started) >= self.max_sync:
+                self.rejected_sync += 1
+                retry_after = self._sync_retry_after(now)
+                raise _overloaded(
+                    f"Too many OCR requests in progress ({self.max_sync}), retry later or use /ocr/process-async",
+                    retry_after
+                )
+            token = self._next_token
+            self._next_token += 1
+            self._sync_started[token] = now
+        try:
+            yield
+        finally:
+            with self._lock:
+                seconds = time.monotonic() - self._sync_started.pop(token)
+                if self.mean_sync_seconds is None:
+                    self.mean_sync_seconds = seconds
+                else:
+                    self.mean_sync_seconds += DURATION_SMOOTHING * (seconds - self.mean_sync_seconds)
+
+    def check_job_capacity(self) -> None:
+        """Raise a 503 if the job queue is full."""
+        pending = job_scheduler.queue_depth
+        if self.max_pending and pending >= self.max_pending:
+            with self._lock:
+                self.rejected_jobs += 1
+            raise _overloaded(
+                f"OCR queue is full ({pending} jobs pending), retry later",
+                self._pending_retry_after(pending)
+            )
+
+    def readiness(self) -> dict:
+        """Report how close the instance is to its limits; it is not ready at either limit."""
+        now = time.monotonic()
+        pending = job_scheduler.queue_depth
+        with self._lock:
+            in_flight = len(self._sync_started)
+            sync_full = bool(self.max_sync) and in_flight >= self.max_sync
+            retry_after = self._sync_retry_after(now) if sync_full else 0
+        queue_full = bool(self.max_pending) and pending >= self.max_pending
+        if queue_full:
+            retry_after = max(retry_after, self._pending_retry_after(pending))
+
+        saturation = max(
+            in_flight / self.max_sync if self.max_sync else 0.0,
+            pending / self.max_pending if self.max_pending else 0.0
+        )
+        return {
+            "ready": not (sync_full or queue_full),
+            "saturation": round(saturation, 3),
+            "sync_ocr_in_flight": in_flight,
+            "sync_ocr_limit": self.max_sync,
+            "pending_jobs": pending,
+            "pending_jobs_limit": self.max_pending,
+            "retry_after": retry_after,
+            "rejected_sync": self.rejected_sync,
+            "rejected_jobs": self.rejected_jobs,
+        }
+
+
+admission = AdmissionController(
+    max_sync=settings.MAX_SYNC_OCR_REQUESTS,
+    max_pending=settings.MAX_PENDING_JOBS,
+    max_retry_after=settings.RETRY_AFTER_MAX_SECONDS
+)
@@ -0,0 +1,48 @@
+import re
+import unicodedata
+from typing import List
+
+# Harakat, Quranic annotation marks and the superscript alef
+_TASHKEEL = (
+    [chr(c) for c in range(0x0610, 0x061B)]
+    + [chr(c) for c in range(0x064B, 0x0660)]
+    + ["\u0670"]
+    + [chr(c) for c in range(0x06D6, 0x06EE)]
+)
+_TATWEEL = "\u0640"
+
+_NORMALIZATION_TABLE = str.maketrans({
+    **{c: None for c in _TASHKEEL},
+    _TATWEEL: None,
+    # Alef with madda / hamza above / hamza below / wasla -> bare alef
+    "\u0622": "\u0627",
+    "\u0623": "\u0627",
+    "\u0625": "\u0627",
+    "\u0671": "\u0627",
+    # Hamza on waw / yeh -> the carrier letter
+    "\u0624": "\u0648",
+    "\u0626": "\u064a",
+    # Alef maksura and Farsi yeh -> yeh, keheh -> kaf
+    "\u0649": "\u064a",
+    "\u06cc": "\u064a",
+    "\u06a9": "\u0643",
+    # Ta marbuta -> heh
+    "\u0629": "\u0647",
+})
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    Normalize Arabic text for indexing and matching.
+
+    Folds presentation forms (NFKC), unifies alef and hamza forms, strips
+    tashkeel and tatweel, folds ta marbuta into heh and casefolds Latin text.
+    """
+    return unicodedata.normalize("NFKC", text).translate(_NORMALIZATION_TABLE).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split normalized text into search terms."""
+    return _WORD_RE.findall(normalize_arabic(text))
@@ -0,0 +1,305 @@
+import errno
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document import Document, DocumentStatus
+from app.models.processing_job import ProcessingJob, JobStatus
+from app.services.cpu_pool import cpu_pool
+from app.services.cpu_tasks import page_counts
+from app.services.scheduler import job_size
+
+logger = logging.getLogger(__name__)
+
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+
+# ioctl that clones a file's extents (btrfs, XFS, bcachefs), from linux/fs.h
+FICLONE = 0x40049409
+
+# PDFs per page counting task sent to the CPU pool
+PAGE_COUNT_CHUNK = 64
+
+
+def _reflink(src: str, dst: str) -> None:
+    import fcntl
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        except OSError:
+            dst_file.close()
+            os.remove(dst)
+            raise
+
+
+def link_file(src: str, dst: str, mode: str = "auto") -> str:
+    """
+    Make ``dst`` a copy of ``src`` without copying bytes where possible.
+
+    ``auto`` tries a reflink (a copy-on-write clone, independent of the source
+    from then on), then a hardlink (the same file under a second name; removing
+    either name leaves the other), then falls back to a copy. Reflinks and
+    hardlinks need both paths on the same filesystem.
+
+    Returns:
+        The method used: "reflink", "hardlink" or "copy"
+    """
+    if mode in ("auto", "reflink"):
+        try:
+            _reflink(src, dst)
+            return "reflink"
+        except (OSError, ImportError) as e:
+            if mode == "reflink":
+                raise
+            logger.debug(f"Reflink of {src} failed: {e}")
+    if mode in ("auto", "hardlink"):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError as e:
+            if mode == "hardlink" or e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+def iter_pdfs(root: str) -> Iterator[str]:
+    """Yield the absolute paths of the PDFs under a directory tree, skipping hidden entries."""
+    stack = [os.path.abspath(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Cannot list {directory}: {e}")
+            continue
+        subdirectories = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif entry.is_file() and entry.name.lower().endswith(".pdf"):
+                yield entry.path
+        stack.extend(reversed(subdirectories))
+
+
+@dataclass
+class ImportStats:
+    scanned: int = 0
+    registered: int = 0
+    skipped: int = 0  # already registered from the same path
+    failed: int = 0
+    jobs: int = 0
+    links: Dict[str, int] = field(default_factory=lambda: {"reflink": 0, "hardlink": 0, "copy": 0})
+    bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.scanned / self.seconds if self.seconds else 0.0
+
+
+class BulkImporter:
+    """
+    Register a directory tree of PDFs already on the server as documents.
+
+    Files are linked into UPLOAD_DIR rather than copied, and rows are written
+    with one multi-row INSERT per table and a commit per ``batch_size`` files,
+    so the cost is a few filesystem calls per file. Files registered before
+    (matched by source path) are skipped, so an interrupted import can simply
+    be run again.
+
+    With ``enqueue``, a pending OCR job is created for each new document in
+    the same transaction. ``on_jobs`` is called after each commit with the new
+    jobs as (job ID, document ID, size) tuples; without it, a running server
+    picks them up within SCHEDULER_POLL_SECONDS.
+    """
+
+    def __init__(
+        self,
+        upload_dir: str,
+        batch_size: int = 1000,
+        link: str = "auto",
+        count_pages: bool = True,
+        enqueue: bool = False,
+        priority: int = 0,
+        client_id: str = "bulk-import",
+        on_jobs=None
+    ):
+        if link not in LINK_MODES:
+            raise ValueError(f"Unknown link mode {link}, expected one of {', '.join(LINK_MODES)}")
+        self.upload_dir = upload_dir
+        self.batch_size = batch_size
+        self.link = link
+        self.count_pages = count_pages
+        self.enqueue = enqueue
+        self.priority = priority
+        self.client_id = client_id
+        self.on_jobs = on_jobs
+        self.stats = ImportStats()
+        self.cancelled = threading.Event()
+
+    def run(self, db: Session, root: str) -> ImportStats:
+        if not os.path.isdir(root):
+            raise NotADirectoryError(f"{root} is not a directory")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        started = time.monotonic()
+        batch: List[str] = []
+        for path in iter_pdfs(root):
+            batch.append(path)
+            if len(batch) >= self.batch_size:
+                self._register_batch(db, batch)
+                batch = []
+                self.stats.seconds = time.monotonic() - started
+                if self.cancelled.is_set():
+                    break
+        if batch and not self.cancelled.is_set():
+            self._register_batch(db, batch)
+        self.stats.seconds = time.monotonic() - started
+        return self.stats
+
+    def _register_batch(self, db: Session, paths: List[str]) -> None:
+        self.stats.scanned += len(paths)
+        known = {
+            source_path for (source_path,) in db.query(Document.source_path).filter(
+                Document.source_path.in_(paths)
+            )
+        }
+        self.stats.skipped += len(known)
+        paths = [path for path in paths if path not in known]
+        if not paths:
+            return
+
+        counts: List[Optional[int]] = [None] * len(paths)
+        if self.count_pages:
+            chunks = [paths[i:i + PAGE_COUNT_CHUNK] for i in range(0, len(paths), PAGE_COUNT_CHUNK)]
+            counts = [count for chunk in cpu_pool.map(page_counts, chunks) for count in chunk]
+
+        rows = []
+        linked = []
+        for path, page_count in zip(paths, counts):
+            filename = f"{uuid.uuid4()}.pdf"
+            file_path = os.path.join(self.upload_dir, filename)
+            try:
+                method = link_file(path, file_path, self.link)
+                file_size = os.path.getsize(file_path)
+            except OSError as e:
+                logger.warning(f"Skipping {path}: {e}")
+                self.stats.failed += 1
+                continue
+            linked.append(file_path)
+            self.stats.links[method] += 1
+            self.stats.bytes += file_size
+            rows.append({
+                "filename": filename,
+                "original_filename": os.path.basename(path)[:255],
+                "file_path": file_path,
+                "file_size": file_size,
+                "page_count": page_count,
+                "source_path": path,
+                "status": DocumentStatus.UPLOADED,
+            })
+        if not rows:
+            return
+
+        try:
+            document_ids = list(db.scalars(
+                insert(Document).returning(Document.id, sort_by_parameter_order=True),
+                rows
+            ))
+            jobs = []
+            if self.enqueue:
+                job_ids = list(db.scalars(
+                    insert(ProcessingJob).returning(ProcessingJob.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "document_id": document_id,
+                            "status": JobStatus.PENDING,
+                            "priority": self.priority,
+                            "client_id": self.client_id,
+                        }
+                        for document_id in document_ids
+                    ]
+                ))
+                jobs = [
+                    (job_id, document_id, job_size(Document(page_count=row["page_count"], file_size=row["file_size"])))
+                    for job_id, document_id, row in zip(job_ids, document_ids, rows)
+                ]
+            db.commit()
+        except Exception:
+            db.rollback()
+            for file_path in linked:
+                os.remove(file_path)
+            raise
+
+        self.stats.registered += len(rows)
+        self.stats.jobs += len(jobs)
+        if jobs and self.on_jobs:
+            self.on_jobs(jobs)
+        logger.info(f"Registered {self.stats.registered} documents ({self.stats.scanned} files scanned)")
+
+
+class ImportRegistry:
+    """Bulk imports started through the admin API, run one at a time in background threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._imports: Dict[int, dict] = {}
+        self._next_id = 1
+
+    def start(self, importer: BulkImporter, root: str, session_factory) -> dict:
+        with self._lock:
+            if any(entry["state"] == "running" for entry in self._imports.values()):
+                raise RuntimeError("Another import is already running")
+            entry = {"id": self._next_id, "directory": root, "state": "running", "error": None, "importer": importer}
+            self._imports[entry["id"]] = entry
+            self._next_id += 1
+
+        def run():
+            db = session_factory()
+            try:
+                importer.run(db, root)
+                entry["state"] = "cancelled" if importer.cancelled.is_set() else "completed"
+            except Exception as e:
+                logger.error(f"Bulk import of {root} failed: {e}")
+                entry["state"] = "failed"
+                entry["error"] = str(e)
+            finally:
+                db.close()
+
+        threading.Thread(target=run, name=f"bulk-import-{entry['id']}", daemon=True).start()
+        return entry
+
+    def get(self, import_id: int) -> Optional[dict]:
+        with self._lock:
+            return self._imports.get(import_id)
+
+    def cancel(self, import_id: int) -> Optional[dict]:
+        entry = self.get(import_id)
+        if entry is not None:
+            entry["importer"].cancelled.set()
+        return entry
+
+
+def allowed_root(directory: str) -> bool:
+    """Whether the admin API may import from a directory (it must be under BULK_IMPORT_ROOTS)."""
+    path = os.path.realpath(directory)
+    for root in settings.BULK_IMPORT_ROOTS.split(","):
+        if not root.strip():
+            continue
+        root = os.path.realpath(root.strip())
+        if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+
+import_registry = ImportRegistry()
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CPUPool:
+    """
+    Process pool for CPU-bound steps (PDF analysis, slimming, base64 encoding).
+
+    Running them in worker processes keeps them from holding the GIL while
+    requests and OCR workers are served. Tasks should take and return file
+    paths rather than large buffers, since arguments and results are pickled.
+
+    Until ``start`` is called (scripts, the batch converter) or with 0 workers,
+    tasks run inline in the calling thread.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is not None or self.workers <= 0:
+                return
+            # Spawned workers do not inherit the threads and connections of the app
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        logger.info(f"Started CPU pool with {self.workers} processes")
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a pool whose worker died (e.g. crashed on a malformed PDF)."""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning("A CPU pool worker died, restarting the pool")
+        self.start()
+
+    # A dead worker breaks the whole pool, failing every task in flight and not
+    # only the one it was running, which cannot be told apart: interrupted tasks
+    # are submitted once more on the restarted pool. The task that killed the
+    # worker kills it again and then fails, along with what ran beside it twice.
+    ATTEMPTS = 2
+
+    def _retry_executor(self, fn: Callable, attempt: int) -> ProcessPoolExecutor:
+        executor = self._executor
+        if attempt >= self.ATTEMPTS or executor is None:
+            raise RuntimeError(f"CPU pool worker died while running {fn.__name__}")
+        logger.warning(f"Running {fn.__name__} again on the restarted CPU pool")
+        return executor
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` in a worker process and return its result."""
+        executor = self._executor
+        if executor is None:
+            return fn(*args, **kwargs)
+        attempt = 1
+        while True:
+            try:
+                return executor.submit(fn, *args, **kwargs).result()
+            except BrokenProcessPool:
+                self._restart(executor)
+                executor = self._retry_executor(fn, attempt)
+                attempt += 1
+
+    def map(self, fn: Callable, items: Iterable) -> List[Any]:
+        """Run ``fn`` on every item across the workers and return the results in order."""
+        executor = self._executor
+        if executor is None:
+            return [fn(item) for item in items]
+        items = list(items)
+        results: List[Any] = [None] * len(items)
+        pending = list(range(len(items)))
+        attempt = 1
+        while True:
+            futures = {}
+            interrupted = []
+            try:
+                for index in pending:
+                    try:
+                        futures[index] = executor.submit(fn, items[index])
+                    except BrokenProcessPool:
+                        interrupted.append(index)
+                for index, future in futures.items():
+                    try:
+                        results[index] = future.result()
+                    except BrokenProcessPool:
+                        interrupted.append(index)
+            finally:
+                for future in futures.values():
+                    future.cancel()
+            if not interrupted:
+                return results
+            self._restart(executor)
+            executor = self._retry_executor(fn, attempt)
+            attempt += 1
+            pending = sorted(interrupted)
+
+    async def run_async(self, fn: Callable, *args, **kwargs) -> Any:
+        """Like ``run``, awaiting the result instead of blocking the event loop."""
+        executor = self._executor
+        if executor is None:
+            return fn(*args, **kwargs)
+        attempt = 1
+        while True:
+            try:
+                return await asyncio.wrap_future(executor.submit(fn, *args, **kwargs))
+            except BrokenProcessPool:
+                self._restart(executor)
+                executor = self._retry_executor(fn, attempt)
+                attempt += 1
+
+
+cpu_pool = CPUPool(settings.CPU_POOL_WORKERS)
@@ -0,0 +1,124 @@
+"""
+CPU-bound steps of OCR processing that run in the worker processes of
+``cpu_pool``.
+
+Everything here is picklable by reference and imports no settings or clients,
+so worker processes start quickly. Large inputs and outputs are passed as file
+paths; only small results come back through the pool.
+"""
+import base64
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import pymupdf
+
+from app.services.export_renderer import ExportFormat, assemble_markdown, render_export
+from app.services.raw_archive import render_archive
+from app.services.text_layer import analyze_text_layer
+
+# Read in slices of a multiple of 3 bytes, so the base64 pieces concatenate
+ENCODE_CHUNK_BYTES = 3 * 1024 * 1024
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    with pymupdf.open(pdf_path) as pdf:
+        return pdf.page_count
+
+
+def page_counts(pdf_paths: List[str]) -> List[Optional[int]]:
+    """Page counts of a batch of PDFs, None for files that cannot be read."""
+    counts = []
+    for pdf_path in pdf_paths:
+        try:
+            counts.append(pdf_page_count(pdf_path))
+        except Exception:
+            counts.append(None)
+    return counts
+
+
+def text_layer_pages(pdf_path: str, min_chars: int) -> Tuple[int, Dict[int, str]]:
+    """Return the page count and the markdown of pages with a usable text layer."""
+    pages = analyze_text_layer(pdf_path, min_chars)
+    return len(pages), {page.index: page.markdown for page in pages if page.usable}
+
+
+def write_data_url(pdf_path: str, output_path: str, media_type: str = "application/pdf") -> int:
+    """
+    Write the base64 data URL of a file to ``output_path``, slice by slice.
+
+    Returns:
+        Size of the written data URL in bytes
+    """
+    size = 0
+    with open(pdf_path, "rb") as src, open(output_path, "wb") as dst:
+        prefix = f"data:{media_type};base64,".encode("ascii")
+        dst.write(prefix)
+        size += len(prefix)
+        while True:
+            chunk = src.read(ENCODE_CHUNK_BYTES)
+            if not chunk:
+                break
+            encoded = base64.b64encode(chunk)
+            dst.write(encoded)
+            size += len(encoded)
+    return size
+
+
+@dataclass
+class RerenderTask:
+    job_id: int
+    archive_path: str
+    title: str
+    stored_pages: Dict[int, str]  # current markdown by page index, replaced by archived pages
+    formats: List[str] = field(default_factory=list)  # exports to render
+    export_dir: str = ""  # directory the rendered exports are written to (the export cache's)
+    image_dir: Optional[str] = None  # move images to this store, as OCR_EXTRACT_IMAGES does
+    url_prefix: str = ""
+
+
+@dataclass
+class RerenderResult:
+    job_id: int
+    archived_pages: int = 0  # pages rebuilt from the archive
+    changed: Dict[int, str] = field(default_factory=dict)  # markdown of the pages that differ from stored_pages
+    markdown: str = ""  # the whole document, assembled as ocr_service does
+    exports: Dict[str, str] = field(default_factory=dict)  # format -> staged file in export_dir
+    error: Optional[str] = None
+
+
+def _write_staged(directory: str, data: bytes) -> str:
+    """Write data to a new hidden file in ``directory`` and return its path."""
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as staged:
+        staged.write(data)
+    return path
+
+
+def rerender_job(task: RerenderTask) -> RerenderResult:
+    """
+    Rebuild a job's pages and exports from its raw OCR archive; errors are returned, not raised.
+
+    Only the rendered artifacts go back to the parent process: the pages that
+    changed, the assembled markdown, and the paths of the exports, which are
+    written to hidden files in ``task.export_dir`` for the parent to move into
+    place.
+    """
+    exports: Dict[str, str] = {}
+    try:
+        archived = render_archive(task.archive_path, task.image_dir, task.url_prefix)
+        changed = {
+            index: markdown for index, markdown in archived.items()
+            if task.stored_pages.get(index) != markdown
+        }
+        ordered = sorted({**task.stored_pages, **changed}.items())
+        for export_format in task.formats:
+            data = render_export(ExportFormat(export_format), ordered, task.title)
+            exports[export_format] = _write_staged(task.export_dir, data)
+        return RerenderResult(task.job_id, len(archived), changed, assemble_markdown(ordered), exports)
+    except Exception as e:
+        for path in exports.values():
+            os.remove(path)
+        return RerenderResult(task.job_id, error=f"{type(e).__name__}: {e}")
@@ -0,0 +1,184 @@
+import glob
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.processing_job import ProcessingJob
+from app.services.export_renderer import ExportFormat, render_export
+
+logger = logging.getLogger(__name__)
+
+_PAGE_HEADING_RE = re.compile(r"^## Page (\d+)\n\n", re.MULTILINE)
+
+# Bytes read from an open export per chunk of a streamed response
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class ExportCache:
+    """
+    On-disk cache of rendered exports keyed by job, export revision and format.
+
+    Files are touched on every hit, so evicting by modification time once the
+    cache grows past ``max_bytes`` drops the least recently used exports.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, job_id: int, version: int, export_format: ExportFormat) -> str:
+        return os.path.join(self.directory, f"job-{job_id}-{version}.{export_format.value}")
+
+    def get(self, job_id: int, version: int, export_format: ExportFormat) -> Optional[BinaryIO]:
+        """
+        Open a cached export for reading, or return None on a miss.
+
+        The file is opened under the eviction lock, and the open file stays
+        readable while it is sent even if it is evicted or replaced meanwhile.
+        """
+        path = self._path(job_id, version, export_format)
+        with self._lock:
+            try:
+                cached = open(path, "rb")
+            except FileNotFoundError:
+                return None
+            os.utime(cached.fileno())  # mark as recently used
+        return cached
+
+    def put(self, job_id: int, version: int, export_format: ExportFormat, data: bytes) -> BinaryIO:
+        """Store a rendered export and return it opened for reading."""
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Write atomically so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            stored = open(tmp_path, "rb")  # follows the file into the cache, and out if evicted
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        try:
+            self.put_file(job_id, version, export_format, tmp_path)
+        except BaseException:
+            stored.close()
+            raise
+        return stored
+
+    def put_file(self, job_id: int, version: int, export_format: ExportFormat, staged_path: str) -> str:
+        """
+        Move an export rendered elsewhere into the cache and return its path.
+
+        ``staged_path`` must be a hidden (dot-prefixed) file in the cache
+        directory, e.g. one written by a CPU pool worker, so the move is atomic
+        and eviction never sees it half-written.
+        """
+        path = self._path(job_id, version, export_format)
+        try:
+            os.replace(staged_path, path)
+        except BaseException:
+            self._remove(staged_path)
+            raise
+
+        # Earlier renders of the same job are stale once it was re-processed
+        pattern = os.path.join(self.directory, f"job-{job_id}-*.{export_format.value}")
+        for stale in glob.glob(pattern):
+            if stale != path:
+                self._remove(stale)
+
+        self.evict(keep=path)
+        return path
+
+    def invalidate(self, job_id: int) -> None:
+        """Drop every cached export of a job."""
+        for path in glob.glob(os.path.join(self.directory, f"job-{job_id}-*")):
+            self._remove(path)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Remove least recently used exports until the cache fits its size bound."""
+        removed = 0
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                with os.scandir(self.directory) as it:
+                    for entry in it:
+                        if entry.name.startswith(".") or not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+            except FileNotFoundError:
+                return 0
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                self._remove(path)
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cached exports from {self.directory}")
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+export_cache = ExportCache(settings.EXPORT_CACHE_DIR, settings.EXPORT_CACHE_MAX_BYTES)
+
+
+def job_pages(job: ProcessingJob) -> List[Tuple[int, str]]:
+    """Return the (page index, markdown) pairs of a completed job."""
+    if job.pages:
+        return [(page.page_index, page.markdown) for page in job.pages]
+
+    # Jobs processed before per-page storage only have the combined markdown
+    parts = _PAGE_HEADING_RE.split(job.markdown_content or "")
+    return [
+        (int(number) - 1, markdown.rstrip("\n"))
+        for number, markdown in zip(parts[1::2], parts[2::2])
+    ]
+
+
+def open_job_export(job: ProcessingJob, export_format: ExportFormat) -> BinaryIO:
+    """
+    Open a rendered export of a job, rendering it on a cache miss.
+
+    Args:
+        job: Completed processing job
+        export_format: Format to render
+
+    Returns:
+        The cached export file, opened for reading; the caller closes it
+    """
+    version = job.export_revision or 0
+    cached = export_cache.get(job.id, version, export_format)
+    if cached:
+        return cached
+
+    title = job.document.original_filename.rsplit('.', 1)[0]
+    data = render_export(export_format, job_pages(job), title)
+    logger.info(f"Rendered {export_format.value} export of job {job.id} ({len(data)} bytes)")
+    return export_cache.put(job.id, version, export_format, data)
+
+
+def iter_export(export: BinaryIO) -> Iterator[bytes]:
+    """Read an open export in READ_CHUNK_BYTES pieces, closing it at the end, for a streaming response."""
+    with export:
+        while True:
+            chunk = export.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
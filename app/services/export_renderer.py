@@ -0,0 +1,372 @@
+import enum
+import html
+import io
+import re
+import unicodedata
+import zipfile
+from typing import Iterable, List, Sequence, Tuple
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape as xml_escape
+
+
+class ExportFormat(str, enum.Enum):
+    DOCX = "docx"
+    HTML = "html"
+    TXT = "txt"
+
+
+MEDIA_TYPES = {
+    ExportFormat.DOCX: "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ExportFormat.HTML: "text/html",
+    ExportFormat.TXT: "text/plain",
+}
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_LIST_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.*)$")
+_TABLE_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\(([^)]*)\)")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)]*)\)")
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+_INVALID_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_URL_IGNORED_RE = re.compile(r"[\x00-\x20\x7f]")  # browsers drop these, e.g. "java\tscript:"
+_SAFE_URL_SCHEMES = ("", "http", "https")
+
+RLM = "\u200f"
+LRM = "\u200e"
+
+
+def text_direction(text: str, default: str = "rtl") -> str:
+    """Return 'rtl' or 'ltr' from the first strongly directional character."""
+    for char in text:
+        bidi = unicodedata.bidirectional(char)
+        if bidi in ("R", "AL"):
+            return "rtl"
+        if bidi == "L":
+            return "ltr"
+    return default
+
+
+def parse_blocks(markdown: str) -> List[Tuple[str, object]]:
+    """
+    Split page markdown into blocks.
+
+    Returns (kind, value) pairs where kind is 'heading' (value is (level, text)),
+    'item', 'paragraph' (value is text) or 'table' (value is a list of rows).
+    """
+    blocks = []
+    paragraph: List[str] = []
+    table: List[List[str]] = []
+
+    def flush():
+        if paragraph:
+            blocks.append(("paragraph", " ".join(paragraph)))
+            paragraph.clear()
+        if table:
+            blocks.append(("table", list(table)))
+            table.clear()
+
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            if paragraph:
+                flush()
+            if not _TABLE_SEPARATOR_RE.match(stripped):
+                table.append([cell.strip() for cell in stripped.strip("|").split("|")])
+            continue
+        if table:
+            flush()
+        if not stripped:
+            flush()
+            continue
+        heading = _HEADING_RE.match(stripped)
+        item = _LIST_RE.match(line)
+        if heading:
+            flush()
+            blocks.append(("heading", (len(heading.group(1)), heading.group(2).strip())))
+        elif item:
+            flush()
+            blocks.append(("item", item.group(1).strip()))
+        else:
+            paragraph.append(stripped)
+    flush()
+    return blocks
+
+
+def _plain_inline(text: str) -> str:
+    """Strip inline markdown markup, keeping link and image text."""
+    text = _IMAGE_RE.sub(lambda m: m.group(1), text)
+    text = _LINK_RE.sub(lambda m: m.group(1), text)
+    return _BOLD_RE.sub(lambda m: m.group(1) or m.group(2), text)
+
+
+def _document_direction(pages: Sequence[Tuple[int, str]]) -> str:
+    sample = " ".join(markdown[:2000] for _, markdown in pages[:3])
+    return text_direction(sample)
+
+
+# --- HTML -------------------------------------------------------------------
+
+def _html_attribute(escaped: str) -> str:
+    """Re-escape text already escaped for element content as an attribute value."""
+    return html.escape(html.unescape(escaped))
+
+
+def _safe_url(escaped: str) -> bool:
+    """Only http(s) and relative URLs become links; javascript:, data: and the like stay text."""
+    url = _URL_IGNORED_RE.sub("", html.unescape(escaped))
+    try:
+        return urlsplit(url).scheme.lower() in _SAFE_URL_SCHEMES
+    except ValueError:
+        return False
+
+
+def _html_image(m: re.Match) -> str:
+    if not _safe_url(m.group(2)):
+        return m.group(1)
+    return f'<img alt="{_html_attribute(m.group(1))}" src="{_html_attribute(m.group(2))}">'
+
+
+def _html_link(m: re.Match) -> str:
+    if not _safe_url(m.group(2)):
+        return m.group(1)
+    return f'<a href="{_html_attribute(m.group(2))}">{m.group(1)}</a>'
+
+
+def _html_inline(text: str) -> str:
+    text = html.escape(text, quote=False)
+    text = _IMAGE_RE.sub(_html_image, text)
+    text = _LINK_RE.sub(_html_link, text)
+    return _BOLD_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+
+
+def render_html(pages: Sequence[Tuple[int, str]], title: str) -> bytes:
+    """Render pages as a standalone HTML document with per-block direction."""
+    direction = _document_direction(pages)
+    out = [
+        "<!DOCTYPE html>",
+        f'<html lang="{"ar" if direction == "rtl" else "en"}" dir="{direction}">',
+        "<head>",
+        '<meta charset="utf-8">',
+        f"<title>{html.escape(title)}</title>",
+        "<style>body{font-family:'Noto Naskh Arabic','Amiri',serif;line-height:1.7;max-width:50em;margin:auto}"
+        "section.page{page-break-after:always}table{border-collapse:collapse}"
+        "td{border:1px solid #999;padding:.2em .5em}</style>",
+        "</head>",
+        "<body>",
+    ]
+    for index, markdown in pages:
+        out.append(f'<section class="page" id="page-{index + 1}">')
+        in_list = False
+        for kind, value in parse_blocks(markdown):
+            if kind != "item" and in_list:
+                out.append("</ul>")
+                in_list = False
+            if kind == "heading":
+                level, text = value
+                out.append(f'<h{level} dir="{text_direction(text, direction)}">{_html_inline(text)}</h{level}>')
+            elif kind == "item":
+                if not in_list:
+                    out.append("<ul>")
+                    in_list = True
+                out.append(f'<li dir="{text_direction(value, direction)}">{_html_inline(value)}</li>')
+            elif kind == "table":
+                table_dir = text_direction(" ".join(value[0]), direction)
+                out.append(f'<table dir="{table_dir}">')
+                for row in value:
+                    cells = "".join(f"<td>{_html_inline(cell)}</td>" for cell in row)
+                    out.append(f"<tr>{cells}</tr>")
+                out.append("</table>")
+            else:
+                out.append(f'<p dir="{text_direction(value, direction)}">{_html_inline(value)}</p>')
+        if in_list:
+            out.append("</ul>")
+        out.append("</section>")
+    out.extend(["</body>", "</html>", ""])
+    return "\n".join(out).encode("utf-8")
+
+
+# --- Plain text -------------------------------------------------------------
+
+def render_text(pages: Sequence[Tuple[int, str]]) -> bytes:
+    """
+    Render pages as plain text.
+
+    Each paragraph starts with a right-to-left or left-to-right mark so that
+    editors without bidi paragraph detection lay it out correctly. Pages are
+    separated by form feeds.
+    """
+    direction = _document_direction(pages)
+    rendered_pages = []
+    for _, markdown in pages:
+        lines = []
+        for kind, value in parse_blocks(markdown):
+            if kind == "heading":
+                text = _plain_inline(value[1])
+            elif kind == "item":
+                text = "- " + _plain_inline(value)
+            elif kind == "table":
+                text = "\n".join(" | ".join(_plain_inline(cell) for cell in row) for row in value)
+            else:
+                text = _plain_inline(value)
+            mark = RLM if text_direction(text, direction) == "rtl" else LRM
+            lines.append(mark + text.replace("\n", "\n" + mark))
+        rendered_pages.append("\n\n".join(lines))
+    return ("\n\f\n".join(rendered_pages) + "\n").encode("utf-8")
+
+
+# --- DOCX -------------------------------------------------------------------
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" '
+    'Target="docProps/core.xml"/>'
+    '</Relationships>'
+)
+
+# Font sizes in half-points for heading levels 1-6 and body text
+_HEADING_SIZES = {1: 36, 2: 32, 3: 28, 4: 26, 5: 24, 6: 24}
+_BODY_SIZE = 24
+
+
+def _xml_text(text: str) -> str:
+    return xml_escape(_INVALID_XML_RE.sub("", text))
+
+
+def _docx_runs(text: str, rtl: bool, size: int, bold: bool = False) -> str:
+    """Build runs for a line of markdown, honouring **bold** spans."""
+    text = _IMAGE_RE.sub(lambda m: m.group(1), text)
+    text = _LINK_RE.sub(lambda m: m.group(1), text)
+    runs = []
+    position = 0
+    spans = [(m.start(), m.end(), m.group(1) or m.group(2)) for m in _BOLD_RE.finditer(text)]
+    segments = []
+    for start, end, inner in spans:
+        segments.append((text[position:start], bold))
+        segments.append((inner, True))
+        position = end
+    segments.append((text[position:], bold))
+
+    for segment, is_bold in segments:
+        if not segment:
+            continue
+        props = ""
+        if is_bold:
+            props += "<w:b/><w:bCs/>"
+        if rtl:
+            props += "<w:rtl/>"
+        props += f'<w:sz w:val="{size}"/><w:szCs w:val="{size}"/>'
+        runs.append(f'<w:r><w:rPr>{props}</w:rPr><w:t xml:space="preserve">{_xml_text(segment)}</w:t></w:r>')
+    return "".join(runs)
+
+
+def _docx_paragraph(text: str, direction: str, size: int = _BODY_SIZE,
+                    bold: bool = False, prefix: str = "") -> str:
+    rtl = text_direction(text, direction) == "rtl"
+    props = "<w:bidi/>" if rtl else ""
+    props += '<w:spacing w:after="120"/>'
+    return f"<w:p><w:pPr>{props}</w:pPr>{_docx_runs(prefix + text, rtl, size, bold)}</w:p>"
+
+
+def _docx_table(rows: List[List[str]], direction: str) -> str:
+    columns = max(len(row) for row in rows)
+    rtl = text_direction(" ".join(rows[0]), direction) == "rtl"
+    border = '<w:{side} w:val="single" w:sz="4" w:space="0" w:color="999999"/>'
+    borders = "".join(border.format(side=side) for side in ("top", "left", "bottom", "right", "insideH", "insideV"))
+    out = [
+        "<w:tbl><w:tblPr>",
+        "<w:bidiVisual/>" if rtl else "",
+        f'<w:tblW w:w="0" w:type="auto"/><w:tblBorders>{borders}</w:tblBorders></w:tblPr>',
+        "<w:tblGrid>" + f'<w:gridCol w:w="{9000 // columns}"/>' * columns + "</w:tblGrid>",
+    ]
+    for row in rows:
+        cells = row + [""] * (columns - len(row))
+        out.append("<w:tr>" + "".join(
+            f"<w:tc>{_docx_paragraph(cell, direction)}</w:tc>" for cell in cells
+        ) + "</w:tr>")
+    out.append("</w:tbl>")
+    return "".join(out)
+
+
+def render_docx(pages: Sequence[Tuple[int, str]], title: str) -> bytes:
+    """
+    Render pages as a Word document.
+
+    Right-to-left paragraphs get ``w:bidi`` and their runs ``w:rtl`` so Word
+    lays out Arabic text and punctuation correctly; each source page starts on
+    a new page.
+    """
+    direction = _document_direction(pages)
+    body = []
+    for position, (_, markdown) in enumerate(pages):
+        if position:
+            body.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+        for kind, value in parse_blocks(markdown):
+            if kind == "heading":
+                level, text = value
+                body.append(_docx_paragraph(text, direction, size=_HEADING_SIZES[level], bold=True))
+            elif kind == "item":
+                body.append(_docx_paragraph(value, direction, prefix="\u2022 "))
+            elif kind == "table":
+                body.append(_docx_table(value, direction))
+            else:
+                body.append(_docx_paragraph(value, direction))
+
+    section = "<w:sectPr>" + ("<w:bidi/>" if direction == "rtl" else "") + "</w:sectPr>"
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{_W_NS}"><w:body>{"".join(body)}{section}</w:body></w:document>'
+    )
+    core = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<cp:coreProperties '
+        'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        f"<dc:title>{_xml_text(title)}</dc:title>"
+        "</cp:coreProperties>"
+    )
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        docx.writestr("_rels/.rels", _ROOT_RELS)
+        docx.writestr("docProps/core.xml", core)
+        docx.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+
+# --- Markdown ---------------------------------------------------------------
+
+def assemble_markdown(pages: Iterable[Tuple[int, str]]) -> str:
+    """Combine (page index, markdown) pairs into a single markdown document, one heading per page."""
+    return "".join(
+        f"## Page {index + 1}\n\n{markdown}\n\n"
+        for index, markdown in sorted(pages)
+    )
+
+
+def render_export(export_format: ExportFormat, pages: Sequence[Tuple[int, str]], title: str) -> bytes:
+    """Render (page index, markdown) pairs in the requested format."""
+    if export_format == ExportFormat.DOCX:
+        return render_docx(pages, title)
+    if export_format == ExportFormat.HTML:
+        return render_html(pages, title)
+    return render_text(pages)
@@ -0,0 +1,148 @@
+import logging
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.tracing import span
+from app.models.document import Document
+
+logger = logging.getLogger(__name__)
+
+# Signed URLs are renewed this long before they expire, so a request never
+# starts with a URL that runs out while the provider is still fetching it
+EXPIRY_MARGIN = timedelta(minutes=10)
+
+
+@dataclass
+class SignedURL:
+    url: str
+    expires_at: datetime
+
+
+class MistralFileStore:
+    """Mistral file storage: upload a PDF once, then refer to it by signed URL."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def upload(self, file_path: str, filename: str) -> str:
+        with open(file_path, "rb") as pdf_file:
+            uploaded = self.client.files.upload(
+                file={"file_name": filename, "content": pdf_file},
+                purpose="ocr"
+            )
+        return uploaded.id
+
+    def signed_url(self, file_id: str, hours: int) -> SignedURL:
+        signed = self.client.files.get_signed_url(file_id=file_id, expiry=hours)
+        return SignedURL(signed.url, datetime.utcnow() + timedelta(hours=hours))
+
+    def delete(self, file_id: str) -> None:
+        self.client.files.delete(file_id=file_id)
+
+
+class LocalFileStore:
+    """
+    Stand-in for provider file storage that keeps files in a local directory.
+
+    Signed URLs are ``file://`` URLs, so it is meant for development and tests
+    together with an OCR backend that can read local files.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, file_id: str) -> str:
+        return os.path.join(self.directory, f"{file_id}.pdf")
+
+    def upload(self, file_path: str, filename: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        file_id = uuid.uuid4().hex
+        shutil.copyfile(file_path, self._path(file_id))
+        return file_id
+
+    def signed_url(self, file_id: str, hours: int) -> SignedURL:
+        path = self._path(file_id)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File {file_id} not found")
+        return SignedURL(f"file://{os.path.abspath(path)}", datetime.utcnow() + timedelta(hours=hours))
+
+    def delete(self, file_id: str) -> None:
+        try:
+            os.remove(self._path(file_id))
+        except FileNotFoundError:
+            pass
+
+
+def create_file_store(client):
+    """Build the store selected by OCR_FILE_STORE, or None to send PDFs inline."""
+    name = settings.OCR_FILE_STORE.lower()
+    if name == "mistral":
+        return MistralFileStore(client)
+    if name == "local":
+        return LocalFileStore(settings.OCR_FILE_STORE_DIR)
+    return None
+
+
+def cached_document_url(document: Document) -> Optional[str]:
+    """Return the document's signed URL if it is still valid for a while."""
+    if not document.provider_file_id or not document.signed_url or not document.signed_url_expires_at:
+        return None
+    if document.signed_url_expires_at - EXPIRY_MARGIN <= datetime.utcnow():
+        return None
+    return document.signed_url
+
+
+def document_url(db: Session, store, document: Document, file_path: str) -> str:
+    """
+    Return a URL the OCR API can fetch the document from, uploading it only once.
+
+    The file ID and signed URL are kept on the document. An expired URL is
+    renewed from the stored file ID, and the file is only uploaded again when
+    the provider no longer has it.
+
+    Args:
+        db: Database session, committed after the reference changes
+        store: File store from create_file_store
+        document: Document to reference
+        file_path: PDF to upload if needed, either the upload or its optimized copy
+    """
+    url = cached_document_url(document)
+    if url:
+        return url
+
+    signed = None
+    if document.provider_file_id:
+        try:
+            signed = store.signed_url(document.provider_file_id, settings.OCR_SIGNED_URL_HOURS)
+        except Exception as e:
+            logger.info(f"Stored file of document {document.id} is gone, uploading again: {e}")
+
+    if signed is None:
+        with span("ocr.upload_file", bytes=os.path.getsize(file_path)):
+            document.provider_file_id = store.upload(file_path, document.original_filename)
+            signed = store.signed_url(document.provider_file_id, settings.OCR_SIGNED_URL_HOURS)
+        logger.info(f"Uploaded document {document.id} as file {document.provider_file_id}")
+
+    document.signed_url = signed.url
+    document.signed_url_expires_at = signed.expires_at
+    db.commit()
+    return signed.url
+
+
+def forget_document_file(store, document: Document) -> None:
+    """Delete the provider copy of a document, if any. The caller commits."""
+    if store and document.provider_file_id:
+        try:
+            store.delete(document.provider_file_id)
+        except Exception as e:
+            logger.warning(f"Failed to delete file {document.provider_file_id}: {e}")
+    document.provider_file_id = None
+    document.signed_url = None
+    document.signed_url_expires_at = None
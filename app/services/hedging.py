@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies, normalized per page."""
+
+    def __init__(self, window: int = 500, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, pages: int = 1) -> None:
+        with self._lock:
+            self._samples.append(seconds / max(pages, 1))
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Seconds per page at the given percentile, or None until enough calls were seen."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(percentile / 100 * len(ordered)))]
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting hedges to a fraction of calls.
+
+    Every call earns ``ratio`` tokens (up to ``burst``) and every hedge spends
+    one, so extra load stays below ``ratio`` even when the service slows down
+    across the board and every call would qualify for a hedge.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class HedgedCaller:
+    """
+    Run a call and, if it is slower than usual, race it against a duplicate.
+
+    The hedge starts once the call has taken longer than ``percentile`` of
+    recent calls (scaled by page count, never earlier than ``min_delay``) and
+    the budget allows it. The first successful response wins; if one attempt
+    fails the other is still awaited. The losing attempt is cancelled if it
+    has not started yet; a request already in flight cannot be interrupted, so
+    its result is discarded when it returns.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        budget: Optional[HedgeBudget] = None,
+        tracker: Optional[LatencyTracker] = None,
+        min_delay: float = 1.0,
+        max_workers: int = 32
+    ):
+        self.percentile = percentile
+        self.budget = budget or HedgeBudget()
+        self.tracker = tracker or LatencyTracker()
+        self.min_delay = min_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr-hedge")
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self, pages: int = 1) -> Optional[float]:
+        per_page = self.tracker.percentile(self.percentile)
+        if per_page is None:
+            return None
+        return max(self.min_delay, per_page * max(pages, 1))
+
+    def _submit(self, call: Callable[[], T], pages: int) -> Future:
+        def timed():
+            started = time.monotonic()
+            result = call()
+            self.tracker.record(time.monotonic() - started, pages)
+            return result
+        return self._executor.submit(timed)
+
+    def call(self, call: Callable[[], T], pages: int = 1) -> T:
+        """
+        Run ``call`` with hedging and return the first successful result.
+
+        Args:
+            call: Zero-argument function performing one request; it must be
+                safe to run twice concurrently
+            pages: Pages in the request, to scale the hedge delay
+
+        Raises:
+            The last error if every attempt failed
+        """
+        self.calls += 1
+        self.budget.earn()
+        delay = self.hedge_delay(pages)
+        primary = self._submit(call, pages)
+        if delay is None:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.budget.spend():
+            return primary.result()
+
+        self.hedges += 1
+        logger.info(f"OCR call exceeded {delay:.1f}s, sending a hedged request")
+        hedge = self._submit(call, pages)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is hedge:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
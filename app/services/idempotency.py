@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# How often a duplicate request checks whether the first one has finished
+POLL_SECONDS = 0.1
+
+
+def fingerprint(*parts: Union[str, bytes]) -> str:
+    """Hash the parts of a request that must match for a key to be replayed."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else part
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class IdempotentRequest:
+    """
+    A request made under an ``Idempotency-Key``.
+
+    ``replay`` holds the stored response when the key was already used;
+    otherwise the caller runs the request and records its response with
+    ``complete``, or calls ``abandon`` if it failed so that a retry runs again.
+    """
+
+    def __init__(self, db: Session, record: Optional[IdempotencyKey] = None, replay: Optional[JSONResponse] = None):
+        self.db = db
+        self.record = record
+        self.replay = replay
+
+    def complete(self, status_code: int, body: dict) -> None:
+        if self.record is None:
+            return
+        # The request itself already succeeded, so a failure here must not fail it;
+        # the claim is then taken over after IDEMPOTENCY_LOCK_SECONDS
+        try:
+            self.record.status_code = status_code
+            self.record.response_body = json.dumps(body)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"Failed to store response for idempotency key {self.record.key}: {e}")
+
+    def abandon(self) -> None:
+        if self.record is None:
+            return
+        try:
+            self.db.rollback()
+            self.db.delete(self.record)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"Failed to release idempotency key {self.record.key}: {e}")
+
+
+def _try_begin(db: Session, scope: str, key: str, request_fingerprint: str) -> Optional[IdempotentRequest]:
+    """One attempt of ``begin``; returns None while the first request is still running."""
+    while True:
+        now = datetime.utcnow()
+        record = IdempotencyKey(
+            scope=scope,
+            key=key,
+            fingerprint=request_fingerprint,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        )
+        db.add(record)
+        try:
+            db.commit()
+            return IdempotentRequest(db, record)
+        except IntegrityError:
+            db.rollback()
+
+        existing = db.query(IdempotencyKey).filter(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key
+        ).first()
+        if existing is None:
+            continue  # released in the meantime
+
+        abandoned = (
+            existing.status_code is None
+            and existing.created_at + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS) <= now
+        )
+        if existing.expires_at <= now or abandoned:
+            db.delete(existing)
+            db.commit()
+            continue
+
+        if existing.fingerprint != request_fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request"
+            )
+
+        if existing.status_code is not None:
+            logger.info(f"Replaying response for idempotency key {key} on {scope}")
+            return IdempotentRequest(db, replay=JSONResponse(
+                status_code=existing.status_code,
+                content=json.loads(existing.response_body),
+                headers={REPLAY_HEADER: "true"}
+            ))
+
+        db.rollback()  # end the transaction so the next check sees new commits
+        return None
+
+
+async def begin(db: Session, scope: str, key: Optional[str], request_fingerprint: str) -> IdempotentRequest:
+    """
+    Claim an idempotency key for a request, or find the response to replay.
+
+    The first request with a key inserts its row; the unique constraint makes
+    concurrent duplicates (in any process) find that row and wait until the
+    first request completes, then replay its response. Keys expire after
+    IDEMPOTENCY_TTL_SECONDS, and a claim left behind by a request that never
+    finished is taken over after IDEMPOTENCY_LOCK_SECONDS. The database work
+    runs in the threadpool, so a waiting duplicate does not block the event loop.
+
+    Args:
+        db: Database session
+        scope: Endpoint the key belongs to; keys are not shared between endpoints
+        key: Value of the Idempotency-Key header, None if it was not sent
+        request_fingerprint: fingerprint() of the request body
+
+    Raises:
+        HTTPException: 422 if the key was used for a different request, 409 if
+            the first request is still running after IDEMPOTENCY_WAIT_SECONDS
+    """
+    if not key:
+        return IdempotentRequest(db)
+
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        idempotent = await run_in_threadpool(_try_begin, db, scope, key, request_fingerprint)
+        if idempotent is not None:
+            return idempotent
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress"
+            )
+        await asyncio.sleep(POLL_SECONDS)
+
+
+def purge_expired(db: Session, limit: int) -> int:
+    """Delete up to ``limit`` expired keys. The caller commits."""
+    ids = [
+        key_id for (key_id,) in db.query(IdempotencyKey.id).filter(
+            IdempotencyKey.expires_at <= datetime.utcnow()
+        ).limit(limit)
+    ]
+    if not ids:
+        return 0
+    db.query(IdempotencyKey).filter(IdempotencyKey.id.in_(ids)).delete(synchronize_session=False)
+    return len(ids)
@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Decoded in slices of this many base64 characters (a multiple of 4)
+CHUNK_CHARS = 64 * 1024
+
+IMAGE_NAME_RE = re.compile(r"^[0-9a-f]{64}\.(jpeg|png|gif|webp|bmp|tiff|bin)$")
+
+MEDIA_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "bmp": "image/bmp",
+    "tiff": "image/tiff",
+    "bin": "application/octet-stream",
+}
+
+_MAGIC = [
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG", "png"),
+    (b"GIF8", "gif"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+]
+
+
+@dataclass
+class ImageStats:
+    images: int = 0
+    stored_bytes: int = 0  # bytes of images new to the store
+    bytes_saved: int = 0  # bytes of images that were already stored
+
+    def add(self, other: "ImageStats") -> None:
+        self.images += other.images
+        self.stored_bytes += other.stored_bytes
+        self.bytes_saved += other.bytes_saved
+
+
+def _extension(head: bytes, mime: Optional[str]) -> str:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for magic, extension in _MAGIC:
+        if head.startswith(magic):
+            return extension
+    if mime and mime.startswith("image/"):
+        subtype = mime[len("image/"):]
+        if subtype in MEDIA_TYPES:
+            return subtype
+    return "bin"
+
+
+class ImageStore:
+    """
+    Content-addressed store of images extracted from OCR responses.
+
+    Images are stored once under the SHA-256 of their bytes, so a logo or stamp
+    repeated on thousands of pages takes the space of one file.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name[:2], name)
+
+    def put_base64(self, data: str) -> Tuple[str, int, bool]:
+        """
+        Decode a base64 image (optionally a data URL) into the store.
+
+        The payload is decoded slice by slice into a temporary file while it is
+        hashed, so the decoded image is never held in memory as a whole.
+
+        Returns:
+            Tuple of (file name, decoded size, whether it was new to the store)
+        """
+        mime = None
+        start = 0
+        if data.startswith("data:"):
+            comma = data.index(",")
+            mime = data[5:comma].split(";", 1)[0]
+            start = comma + 1
+
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                for offset in range(start, len(data), CHUNK_CHARS):
+                    chunk = base64.b64decode(data[offset:offset + CHUNK_CHARS])
+                    if not head:
+                        head = chunk[:16]
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+
+            name = f"{digest.hexdigest()}.{_extension(head, mime)}"
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                return name, size, False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            return name, size, True
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def extract_page_images(self, page, url_prefix: str) -> Tuple[str, ImageStats]:
+        """
+        Store the images of an OCR response page and point its markdown at them.
+
+        The base64 payloads are dropped from the page once stored.
+
+        Args:
+            page: OCR response page with ``markdown`` and ``images``
+            url_prefix: Prefix of the URL stored images are served under
+
+        Returns:
+            Tuple of (rewritten markdown, image statistics)
+        """
+        markdown = page.markdown
+        stats = ImageStats()
+        for image in page.images or []:
+            if not image.image_base64:
+                continue
+            name, size, new = self.put_base64(image.image_base64)
+            image.image_base64 = None
+            stats.images += 1
+            if new:
+                stats.stored_bytes += size
+            else:
+                stats.bytes_saved += size
+            markdown = markdown.replace(f"]({image.id})", f"]({url_prefix}{name})")
+        return markdown, stats
@@ -0,0 +1,95 @@
+"""
+Ownership of running OCR jobs across processes and instances.
+
+Every app process runs a scheduler that picks up pending jobs from the shared
+database, so a job is claimed before it runs: a compare-and-set on its status
+and attempt count, which only one process can win. A running job's
+``updated_at`` is its lease, renewed while the job runs; a PROCESSING job
+whose lease expired belongs to a process that died and may be claimed again.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.processing_job import ProcessingJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+def lease_expired(updated_at: Optional[datetime], now: Optional[datetime] = None) -> bool:
+    """Whether a PROCESSING job last renewed at ``updated_at`` was abandoned."""
+    if updated_at is None:
+        return True
+    if updated_at.tzinfo is not None:
+        updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+    now = now or datetime.utcnow()
+    return updated_at < now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+
+def claimable(job: ProcessingJob) -> bool:
+    """Pending jobs, and processing jobs whose lease expired, may be claimed."""
+    if job.status == JobStatus.PENDING:
+        return True
+    return job.status == JobStatus.PROCESSING and lease_expired(job.updated_at)
+
+
+def claim_job(db: Session, job: ProcessingJob) -> bool:
+    """
+    Take a job for this process, marking it PROCESSING and counting the attempt.
+
+    The update only applies if the job still has the status and attempt count
+    read here, so of the processes racing for a job exactly one wins.
+
+    Returns:
+        True if this process now owns the job
+    """
+    if not claimable(job):
+        return False
+    claimed = db.query(ProcessingJob).filter(
+        ProcessingJob.id == job.id,
+        ProcessingJob.status == job.status,
+        ProcessingJob.attempts == job.attempts
+    ).update({
+        ProcessingJob.status: JobStatus.PROCESSING,
+        ProcessingJob.attempts: ProcessingJob.attempts + 1,
+        ProcessingJob.updated_at: func.now()
+    }, synchronize_session=False)
+    db.commit()
+    db.refresh(job)
+    return claimed == 1
+
+
+class LeaseRenewer:
+    """Renews the lease of a running job every third of JOB_LEASE_SECONDS until the job ends."""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-lease-{job_id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.JOB_LEASE_SECONDS / 3):
+            db = SessionLocal()
+            try:
+                db.query(ProcessingJob).filter(
+                    ProcessingJob.id == self.job_id,
+                    ProcessingJob.status == JobStatus.PROCESSING
+                ).update({ProcessingJob.updated_at: func.now()}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                logger.warning(f"Failed to renew the lease of job {self.job_id}: {e}")
+            finally:
+                db.close()
+
+    def __enter__(self) -> "LeaseRenewer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
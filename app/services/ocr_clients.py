@@ -0,0 +1,302 @@
+"""
+OCR API clients pooled over several API keys.
+
+Throughput of a single key is capped by its rate limit, so OCR requests are
+spread over every configured key. Imports no settings, so the batch converter
+uses it as well.
+"""
+import base64
+import logging
+import random
+import threading
+import time
+import types
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Longest a key is quarantined for, however often it is throttled in a row
+MAX_QUARANTINE_FACTOR = 10
+
+
+class OCRKeysUnavailable(RuntimeError):
+    """No key could take a request before the acquire timeout."""
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average, and bursts of up to ``burst``; a rate of 0 is unlimited."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self, now: float) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self, now: float) -> None:
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens -= 1
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class PooledKey:
+    """One API key of the pool: its client, rate budget, health and usage."""
+
+    def __init__(self, name: str, client: Any, bucket: TokenBucket):
+        self.name = name
+        self.client = client
+        self.bucket = bucket
+        self.in_flight = 0
+        self.quarantined_until = 0.0
+        self.consecutive_failures = 0
+        self.consecutive_throttles = 0
+        self.requests = 0
+        self.pages = 0
+        self.failures = 0
+        self.throttled = 0
+        self.busy_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.quarantined_until
+
+    def usage(self, now: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy(now),
+            "quarantined_for": round(max(0.0, self.quarantined_until - now), 1),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "pages": self.pages,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "last_error": self.last_error,
+        }
+
+
+class OCRClientPool:
+    """
+    Routes OCR requests over the clients of several API keys.
+
+    Each request goes to the healthy key with the fewest requests in flight
+    that has a token in its bucket, waiting up to ``acquire_timeout`` if none
+    has. A throttled key (HTTP 429) is quarantined for its Retry-After, or for
+    ``quarantine_seconds`` doubling with each throttle in a row; a key that
+    fails ``max_failures`` times in a row (server errors, network errors) or
+    is refused (401, 403) is quarantined for ``quarantine_seconds``. Errors
+    are raised to the caller, whose retry then lands on another key.
+
+    ``pool.ocr.process(...)`` takes the arguments of ``Mistral.ocr.process``.
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[Tuple[str, Any]],
+        requests_per_second: float = 0.0,
+        burst: int = 1,
+        quarantine_seconds: float = 30.0,
+        max_failures: int = 3,
+        acquire_timeout: float = 60.0
+    ):
+        if not clients:
+            raise ValueError("The OCR client pool needs at least one client")
+        self.keys = [PooledKey(name, client, TokenBucket(requests_per_second, burst)) for name, client in clients]
+        self.quarantine_seconds = quarantine_seconds
+        self.max_failures = max_failures
+        self.acquire_timeout = acquire_timeout
+        self._cond = threading.Condition()
+
+    @property
+    def ocr(self) -> "OCRClientPool":
+        return self
+
+    def _pick(self, now: float) -> Optional[PooledKey]:
+        candidates = [key for key in self.keys if key.healthy(now) and key.bucket.available(now)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda key: (key.in_flight, key.requests))
+
+    def _next_change(self, now: float) -> float:
+        """Seconds until a key may become available."""
+        waits = []
+        for key in self.keys:
+            wait = max(key.quarantined_until - now, 0.0)
+            waits.append(max(wait, key.bucket.wait_time(now + wait)))
+        return min(waits)
+
+    def acquire(self) -> PooledKey:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                key = self._pick(now)
+                if key is not None:
+                    key.bucket.take(now)
+                    key.in_flight += 1
+                    key.requests += 1
+                    return key
+                if now >= deadline:
+                    raise OCRKeysUnavailable(
+                        f"No OCR API key available within {self.acquire_timeout}s "
+                        f"({sum(not key.healthy(now) for key in self.keys)} of {len(self.keys)} quarantined)"
+                    )
+                self._cond.wait(min(max(self._next_change(now), 0.01), deadline - now))
+
+    def release(self, key: PooledKey, seconds: float, pages: int = 0, error: Optional[Exception] = None) -> None:
+        with self._cond:
+            key.in_flight -= 1
+            key.busy_seconds += seconds
+            key.pages += pages
+            if error is None:
+                key.consecutive_failures = 0
+                key.consecutive_throttles = 0
+            else:
+                self._record_error(key, error)
+            self._cond.notify_all()
+
+    def _record_error(self, key: PooledKey, error: Exception) -> None:
+        key.failures += 1
+        key.last_error = str(error)[:200]
+        status_code = _status_code(error)
+        now = time.monotonic()
+        if status_code == 429:
+            key.throttled += 1
+            key.consecutive_throttles += 1
+            backoff = self.quarantine_seconds * 2 ** (key.consecutive_throttles - 1)
+            seconds = _retry_after(error) or min(backoff, self.quarantine_seconds * MAX_QUARANTINE_FACTOR)
+        elif status_code in (401, 403):
+            seconds = self.quarantine_seconds * MAX_QUARANTINE_FACTOR
+        elif status_code is not None and status_code < 500:
+            return  # a bad request, not a problem of the key
+        else:
+            key.consecutive_failures += 1
+            if key.consecutive_failures < self.max_failures:
+                return
+            key.consecutive_failures = 0
+            seconds = self.quarantine_seconds
+        key.quarantined_until = max(key.quarantined_until, now + seconds)
+        logger.warning(f"Quarantined OCR key {key.name} for {seconds:.0f}s: {key.last_error}")
+
+    def process(self, **kwargs) -> Any:
+        key = self.acquire()
+        started = time.monotonic()
+        try:
+            response = key.client.ocr.process(**kwargs)
+        except Exception as e:
+            self.release(key, time.monotonic() - started, error=e)
+            raise
+        self.release(key, time.monotonic() - started, pages=len(response.pages))
+        return response
+
+    def usage(self) -> List[Dict[str, Any]]:
+        """Per key usage and health."""
+        with self._cond:
+            now = time.monotonic()
+            return [key.usage(now) for key in self.keys]
+
+
+def key_name(index: int, api_key: str) -> str:
+    """Name of a key in logs and usage reports, without revealing it."""
+    return f"key{index + 1}-{api_key[-4:]}" if len(api_key) > 8 else f"key{index + 1}"
+
+
+def parse_api_keys(primary: Optional[str], extra: str = "") -> List[str]:
+    """The primary key followed by the comma-separated extra keys, without duplicates."""
+    keys = []
+    for api_key in [primary or ""] + extra.split(","):
+        api_key = api_key.strip()
+        if api_key and api_key not in keys:
+            keys.append(api_key)
+    return keys
+
+
+class FakeOCRError(Exception):
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = {"retry-after": str(retry_after)} if retry_after else {}
+
+
+class FakeOCRClient:
+    """
+    Local stand-in for a Mistral client's OCR API, for load tests and benchmarks.
+
+    Every call takes ``latency`` seconds plus ``page_latency`` per page and
+    returns placeholder markdown for each page. Like a real key, it answers
+    429 when called more than ``requests_per_second`` times a second (0 for
+    no limit), and fails with a 500 at ``error_rate``.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        page_latency: float = 0.0,
+        requests_per_second: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.page_latency = page_latency
+        self.error_rate = error_rate
+        self.ocr = self
+        self.calls = 0
+        self._bucket = TokenBucket(requests_per_second, burst=1)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _page_indices(document: Dict[str, Any], pages: Optional[List[int]]) -> List[int]:
+        if pages is not None:
+            return list(pages)
+        url = document.get("document_url", "")
+        if url.startswith("data:"):
+            import pymupdf
+            with pymupdf.open(stream=base64.b64decode(url.split(",", 1)[1]), filetype="pdf") as pdf:
+                return list(range(pdf.page_count))
+        return [0]  # a URL the fake cannot fetch
+
+    def process(self, model: str, document: Dict[str, Any], pages: Optional[List[int]] = None, **kwargs) -> Any:
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            if not self._bucket.available(now):
+                raise FakeOCRError(429, "Rate limit exceeded", retry_after=round(self._bucket.wait_time(now), 3))
+            self._bucket.take(now)
+            failed = self._random.random() < self.error_rate
+        indices = self._page_indices(document, pages)
+        time.sleep(self.latency + self.page_latency * len(indices))
+        if failed:
+            raise FakeOCRError(500, "Internal server error")
+        return types.SimpleNamespace(pages=[
+            types.SimpleNamespace(index=index, markdown=f"Page {index + 1} ({model})", images=[], dimensions=None)
+            for index in indices
+        ])
@@ -1,14 +1,29 @@
-import base64
 import os
 import logging
+import tempfile
 import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from mistralai import Mistral
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core.tracing import span
 from app.models.document import Document, DocumentStatus
 from app.models.processing_job import ProcessingJob, JobStatus
+from app.models.ocr_page import OCRPage, PageSource
+from app.services.cpu_pool import cpu_pool
+from app.services.cpu_tasks import text_layer_pages, write_data_url
+from app.services.export_renderer import assemble_markdown
+from app.services.file_store import cached_document_url, create_file_store, document_url
+from app.services.image_store import ImageStats, ImageStore
+from app.services.job_lease import LeaseRenewer, claim_job
+from app.services.hedging import HedgeBudget, HedgedCaller, LatencyTracker
+from app.services.ocr_clients import FakeOCRClient, OCRClientPool, key_name, parse_api_keys
+from app.services.page_pruning import find_prunable_pages
+from app.services.pdf_optimizer import optimize_pdf
+from app.services.raw_archive import ARCHIVE_SUFFIX, append_pages
+from app.services.search_index import index_document_pages
+from app.services.status_cache import status_cache
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
@@ -17,20 +32,326 @@ logger = logging.getLogger(__name__)
 mistral_client = Mistral(api_key=settings.MISTRAL_API_KEY)
 
 
+def create_ocr_clients() -> OCRClientPool:
+    """Build the pool OCR requests go through, one client per API key."""
+    api_keys = parse_api_keys(settings.MISTRAL_API_KEY, settings.MISTRAL_EXTRA_API_KEYS)
+    if settings.OCR_BACKEND.lower() == "fake":
+        clients = [
+            (key_name(index, api_key), FakeOCRClient(
+                latency=settings.FAKE_OCR_LATENCY_SECONDS,
+                requests_per_second=settings.FAKE_OCR_REQUESTS_PER_SECOND
+            ))
+            for index, api_key in enumerate(api_keys)
+        ]
+    else:
+        clients = [
+            (key_name(index, api_key), mistral_client if index == 0 else Mistral(api_key=api_key))
+            for index, api_key in enumerate(api_keys)
+        ]
+    return OCRClientPool(
+        clients,
+        requests_per_second=settings.OCR_KEY_REQUESTS_PER_SECOND,
+        burst=settings.OCR_KEY_BURST,
+        quarantine_seconds=settings.OCR_KEY_QUARANTINE_SECONDS,
+        max_failures=settings.OCR_KEY_MAX_FAILURES,
+        acquire_timeout=settings.OCR_KEY_ACQUIRE_TIMEOUT
+    )
+
+
+# OCR requests are spread over the API keys; file storage uses the first key,
+# whose signed URLs any key can fetch
+ocr_clients = create_ocr_clients()
+
+# Images extracted from OCR responses, stored once per distinct content
+image_store = ImageStore(settings.IMAGE_STORE_DIR)
+
+# Provider file storage PDFs are uploaded to once, None to send them inline
+file_store = create_file_store(mistral_client)
+
+# Duplicates unusually slow OCR calls when OCR_HEDGING_ENABLED is set
+ocr_hedger = HedgedCaller(
+    percentile=settings.OCR_HEDGE_PERCENTILE,
+    budget=HedgeBudget(ratio=settings.OCR_HEDGE_BUDGET),
+    tracker=LatencyTracker(min_samples=settings.OCR_HEDGE_MIN_SAMPLES),
+    min_delay=settings.OCR_HEDGE_MIN_DELAY_SECONDS
+)
+
+
 def ensure_directories():
     """Ensure upload and export directories exist."""
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     os.makedirs(settings.EXPORT_DIR, exist_ok=True)
 
 
-def encode_pdf_to_base64(file_path: str) -> Optional[str]:
-    """Encode PDF file to base64 string."""
+def write_markdown_export(document: Document, job: ProcessingJob, markdown_content: str) -> str:
+    """Write a job's markdown to the export directory and return its path."""
+    output_filename = f"{document.filename.rsplit('.', 1)[0]}_{job.id}.md"
+    output_path = os.path.join(settings.EXPORT_DIR, output_filename)
+    
+    with open(output_path, 'w', encoding='utf-8') as md_file:
+        md_file.write(markdown_content)
+    return output_path
+
+
+def raw_archive_path(job_id: int) -> str:
+    """Path of the archive of a job's raw OCR responses."""
+    return os.path.join(settings.RAW_ARCHIVE_DIR, f"job-{job_id}{ARCHIVE_SUFFIX}")
+
+
+def detect_text_pages(file_path: str) -> Tuple[Optional[int], Dict[int, str]]:
+    """
+    Run the local text layer pre-pass on a PDF.
+    
+    Returns:
+        Tuple of (page count, markdown by page index for pages with a usable
+        text layer). The page count is None if the PDF could not be analyzed,
+        in which case the whole document should go to OCR.
+    """
     try:
-        with open(file_path, "rb") as pdf_file:
-            return base64.b64encode(pdf_file.read()).decode('utf-8')
+        return cpu_pool.run(text_layer_pages, file_path, settings.TEXT_LAYER_MIN_CHARS)
     except Exception as e:
-        logger.error(f"Failed to encode PDF {file_path}: {e}")
+        logger.warning(f"Text layer pre-pass failed for {file_path}: {e}")
+        return None, {}
+
+
+def slim_pdf_for_upload(job: ProcessingJob, file_path: str) -> Optional[str]:
+    """
+    Write an optimized copy of a PDF for upload if slimming is enabled.
+    
+    The before and after sizes are recorded on the job.
+    
+    Returns:
+        Path of the optimized copy (to be removed by the caller), or None if
+        the original file should be sent as is
+    """
+    if not settings.PDF_OPTIMIZE_ENABLED:
         return None
+    if os.path.getsize(file_path) < settings.PDF_OPTIMIZE_MIN_SIZE:
+        return None
+    
+    fd, optimized_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        original_size, optimized_size = cpu_pool.run(
+            optimize_pdf,
+            file_path,
+            optimized_path,
+            max_dpi=settings.PDF_OPTIMIZE_MAX_DPI,
+            jpeg_quality=settings.PDF_OPTIMIZE_JPEG_QUALITY
+        )
+    except Exception as e:
+        logger.warning(f"PDF optimization failed for {file_path}, sending original: {e}")
+        os.remove(optimized_path)
+        return None
+    
+    job.original_pdf_size = original_size
+    if optimized_size >= original_size:
+        os.remove(optimized_path)
+        job.optimized_pdf_size = original_size
+        return None
+    job.optimized_pdf_size = optimized_size
+    return optimized_path
+
+
+@dataclass
+class OCRResult:
+    pages: Dict[int, str]  # markdown by page index
+    attempts: int
+    seconds: float  # duration of the successful attempt
+    images: ImageStats
+
+
+def pdf_data_url(file_path: str) -> str:
+    """
+    Encode a PDF as a base64 data URL for the OCR API.
+    
+    The encoding runs in the CPU pool and comes back through a temporary file,
+    so neither the PDF nor its encoding is pickled between processes.
+    """
+    fd, encoded_path = tempfile.mkstemp(suffix=".b64")
+    os.close(fd)
+    try:
+        with span("ocr.encode_pdf", file_path=file_path):
+            cpu_pool.run(write_data_url, file_path, encoded_path)
+            with open(encoded_path, "r", encoding="ascii") as encoded_file:
+                return encoded_file.read()
+    except Exception as e:
+        logger.error(f"Failed to encode PDF {file_path}: {e}")
+        raise RuntimeError("Failed to encode PDF file")
+    finally:
+        os.remove(encoded_path)
+
+
+def chunk_pages(page_indices: List[int], size: int) -> List[List[int]]:
+    """Split page indices into requests of at most ``size`` pages (0 = one request)."""
+    if size <= 0:
+        return [page_indices]
+    return [page_indices[i:i + size] for i in range(0, len(page_indices), size)]
+
+
+def prune_pages(
+    db: Session,
+    job: ProcessingJob,
+    stored: Dict[int, OCRPage],
+    file_path: str,
+    page_indices: List[int]
+) -> Dict[int, int]:
+    """
+    Keep blank and repeated pages out of OCR.
+    
+    Blank pages are stored right away with empty markdown, so page numbering
+    is unchanged. Duplicates are stored once the page they repeat has been
+    OCR'd.
+    
+    Returns:
+        Page index of the original by index of each duplicate page
+    """
+    try:
+        pruned = cpu_pool.run(
+            find_prunable_pages,
+            file_path,
+            page_indices,
+            blank_ink_ratio=settings.PAGE_BLANK_INK_RATIO,
+            dpi=settings.PAGE_PRUNING_DPI
+        )
+    except Exception as e:
+        logger.warning(f"Page pruning failed for {file_path}, sending all pages: {e}")
+        return {}
+    
+    duplicates = {}
+    blanks = []
+    for index, page in pruned.items():
+        if page.reason == "blank":
+            store_page(db, job, stored, index, PageSource.BLANK, "")
+            blanks.append({"index": index, "markdown": ""})
+        else:
+            duplicates[index] = page.duplicate_of
+    db.commit()
+    archive_pages(job, blanks, PageSource.BLANK)
+    return duplicates
+
+
+def archive_pages(job: ProcessingJob, pages: List[dict], source: PageSource) -> None:
+    """
+    Append pages that skipped OCR to the raw archive of a job, so a re-render rebuilds them too.
+    
+    Pages are ``{"index", "markdown"}`` records, or ``{"index", "duplicate_of"}``
+    for duplicates. A failure only loses the archive.
+    """
+    if not settings.RAW_ARCHIVE_ENABLED or not pages:
+        return
+    try:
+        append_pages(raw_archive_path(job.id), pages, source=source.value)
+    except Exception as e:
+        logger.warning(f"Failed to archive the {source.value} pages of job {job.id}: {e}")
+
+
+def run_ocr(
+    document: Document,
+    document_url: str,
+    page_indices: Optional[List[int]] = None,
+    archive_path: Optional[str] = None
+) -> OCRResult:
+    """
+    Send a document to Mistral OCR with retry logic.
+    
+    Args:
+        document: Document to process
+        document_url: Signed URL of the uploaded PDF, or its data URL (see pdf_data_url)
+        page_indices: Zero-based pages to OCR, or None for the whole document
+        archive_path: Archive to append the raw response pages to, if any
+    
+    With OCR_EXTRACT_IMAGES, images are requested along with the text and
+    moved to the image store, and the markdown links to the stored files.
+    
+    Returns:
+        OCRResult with the markdown by page index
+    """
+    options = {}
+    if page_indices is not None:
+        options["pages"] = page_indices
+    
+    def ocr_request():
+        return ocr_clients.ocr.process(
+            model=settings.OCR_MODEL,
+            document={
+                "type": "document_url",
+                "document_url": document_url
+            },
+            include_image_base64=settings.OCR_EXTRACT_IMAGES,
+            **options
+        )
+    
+    if page_indices is not None:
+        page_total = len(page_indices)
+    else:
+        page_total = document.page_count or 1
+    
+    backoff = settings.RETRY_BACKOFF
+    for attempt in range(1, settings.MAX_RETRIES + 1):
+        try:
+            logger.info(f"Processing document {document.id}, attempt {attempt}")
+            
+            started = time.monotonic()
+            with span("ocr.api_call", attempt=attempt, document_id=document.id):
+                if settings.OCR_HEDGING_ENABLED:
+                    response = ocr_hedger.call(ocr_request, pages=page_total)
+                else:
+                    response = ocr_request()
+            seconds = time.monotonic() - started
+            break
+            
+        except Exception as e:
+            logger.error(f"Attempt {attempt} failed for document {document.id}: {e}")
+            
+            if attempt < settings.MAX_RETRIES:
+                logger.info(f"Retrying in {backoff} seconds...")
+                with span("ocr.retry_backoff", attempt=attempt, seconds=backoff):
+                    time.sleep(backoff)
+                backoff *= 2
+            else:
+                raise
+    
+    # Archived before images are moved out of the response
+    if archive_path:
+        try:
+            with span("ocr.archive_raw", pages=len(response.pages)):
+                append_pages(archive_path, response.pages, model=settings.OCR_MODEL)
+        except Exception as e:
+            logger.warning(f"Failed to archive the raw OCR response of document {document.id}: {e}")
+    
+    pages = {}
+    images = ImageStats()
+    for page in response.pages:
+        markdown = page.markdown
+        if settings.OCR_EXTRACT_IMAGES and page.images:
+            with span("ocr.extract_images", page=page.index, images=len(page.images)):
+                markdown, page_images = image_store.extract_page_images(page, settings.IMAGE_URL_PREFIX)
+            images.add(page_images)
+        pages[page.index] = markdown
+    return OCRResult(pages=pages, attempts=attempt, seconds=seconds, images=images)
+
+
+def store_page(
+    db: Session,
+    job: ProcessingJob,
+    stored: Dict[int, OCRPage],
+    index: int,
+    source: PageSource,
+    markdown: str,
+    attempts: int = 0,
+    duration_ms: Optional[int] = None
+) -> None:
+    """Add or replace a page result of a job in ``stored``. The caller commits."""
+    page = stored.get(index)
+    if page is None:
+        page = OCRPage(job_id=job.id, page_index=index)
+        db.add(page)
+        stored[index] = page
+    page.source = source
+    page.markdown = markdown
+    page.attempts = attempts
+    page.duration_ms = duration_ms
 
 
 def process_ocr(
@@ -46,6 +367,12 @@ def process_ocr(
         document_id: ID of the document to process
         job_id: Optional job ID if resuming an existing job
     
+    Page results are committed as each OCR request returns, so when a job is
+    resumed (retried after a failure, or re-queued after a restart) only the
+    pages it does not have yet are sent to OCR. An existing job is only run if
+    this process claims it: it must be pending, or processing with an expired
+    lease; otherwise it is returned as it is.
+    
     Returns:
         ProcessingJob instance
     """
@@ -56,97 +383,195 @@ def process_ocr(
     if not document:
         raise ValueError(f"Document {document_id} not found")
     
-    # Get or create job
+    # Get or create job; an existing one is claimed first, since the scheduler
+    # of every process (and instance) may have picked it up
     if job_id:
         job = db.query(ProcessingJob).filter(ProcessingJob.id == job_id).first()
         if not job:
             raise ValueError(f"Job {job_id} not found")
+        with span("db.commit", stage="claim_job", job_id=job.id):
+            claimed = claim_job(db, job)
+        if not claimed:
+            logger.info(f"Job {job.id} is {job.status.value} and not claimable, leaving it")
+            return job
     else:
-        job = ProcessingJob(document_id=document_id, status=JobStatus.PENDING)
+        # Created as processing, so no other process can claim it
+        job = ProcessingJob(document_id=document_id, status=JobStatus.PROCESSING, attempts=1)
         db.add(job)
         db.commit()
         db.refresh(job)
     
-    # Update document status
-    document.status = DocumentStatus.PROCESSING
-    db.commit()
-    
-    # Update job status
-    job.status = JobStatus.PROCESSING
-    job.attempts += 1
-    db.commit()
+    with span("db.commit", stage="start_job", job_id=job.id):
+        document.status = DocumentStatus.PROCESSING
+        db.commit()
+    # Pollers see each committed transition; the cache is dropped after every one
+    status_cache.invalidate(job.id)
     
+    with LeaseRenewer(job.id):
+        return _run_job(db, document, job)
+
+
+def _run_job(db: Session, document: Document, job: ProcessingJob) -> ProcessingJob:
+    """Process a claimed job; see ``process_ocr``."""
+    document_id = document.id
     try:
-        # Encode PDF
-        b64_content = encode_pdf_to_base64(document.file_path)
-        if not b64_content:
-            raise RuntimeError("Failed to encode PDF file")
+        # Pages with a usable embedded text layer skip OCR entirely
+        page_count, text_pages = None, {}
+        if settings.TEXT_LAYER_FAST_PATH:
+            with span("ocr.text_layer") as text_span:
+                page_count, text_pages = detect_text_pages(document.file_path)
+                if text_span:
+                    text_span.set(page_count=page_count or 0, text_pages=len(text_pages))
+            if page_count is not None:
+                document.page_count = page_count
+        if page_count is None:
+            page_count = document.page_count  # counted on upload
         
-        # Call Mistral OCR API with retry logic
-        backoff = settings.RETRY_BACKOFF
-        last_error = None
+        # Pages stored by an earlier run of this job are kept
+        stored = {page.page_index: page for page in job.pages}
+        resumed = len(stored)
+        new_text_pages = [
+            {"index": index, "markdown": markdown}
+            for index, markdown in text_pages.items() if index not in stored
+        ]
+        for page in new_text_pages:
+            store_page(db, job, stored, page["index"], PageSource.TEXT_LAYER, page["markdown"])
+        db.commit()
+        archive_pages(job, new_text_pages, PageSource.TEXT_LAYER)
+        status_cache.invalidate(job.id)
+        
+        duplicates = {}
+        if page_count is None:
+            ocr_chunks = [None]  # Unknown layout, send the whole document
+        else:
+            missing = [index for index in range(page_count) if index not in stored]
+            if settings.PAGE_PRUNING_ENABLED and missing:
+                with span("ocr.prune_pages", pages=len(missing)):
+                    duplicates = prune_pages(db, job, stored, document.file_path, missing)
+                missing = [index for index in missing if index not in stored and index not in duplicates]
+            ocr_chunks = chunk_pages(missing, settings.OCR_CHUNK_PAGES) if missing else []
+        if resumed:
+            logger.info(f"Resuming job {job.id} with {resumed} stored pages")
         
-        for attempt in range(1, settings.MAX_RETRIES + 1):
+        if ocr_chunks:
+            upload_path = None
             try:
-                logger.info(f"Processing document {document_id}, attempt {attempt}")
+                # Retries and re-OCR reuse the copy uploaded to the file store
+                pdf_url = None
+                if file_store:
+                    pdf_url = cached_document_url(document)
+                if pdf_url is None:
+                    with span("ocr.slim_pdf"):
+                        upload_path = slim_pdf_for_upload(job, document.file_path)
+                    if file_store:
+                        pdf_url = document_url(db, file_store, document, upload_path or document.file_path)
+                    else:
+                        pdf_url = pdf_data_url(upload_path or document.file_path)
                 
-                response = mistral_client.ocr.process(
-                    model=settings.OCR_MODEL,
-                    document={
-                        "type": "document_url",
-                        "document_url": f"data:application/pdf;base64,{b64_content}"
-                    },
-                    include_image_base64=False
+                archive_path = raw_archive_path(job.id) if settings.RAW_ARCHIVE_ENABLED else None
+                pending = list(ocr_chunks)
+                while pending:
+                    chunk = pending.pop(0)
+                    with span("ocr.run", pages=len(chunk) if chunk is not None else -1):
+                        result = run_ocr(document, pdf_url, chunk, archive_path)
+                    
+                    # Checkpoint right away so a failure later on keeps these pages
+                    duration_ms = int(result.seconds * 1000 / max(len(result.pages), 1))
+                    with span("db.commit", stage="checkpoint", pages=len(result.pages)):
+                        for index, markdown in result.pages.items():
+                            store_page(
+                                db, job, stored, index, PageSource.OCR, markdown,
+                                attempts=result.attempts, duration_ms=duration_ms
+                            )
+                        job.image_count = (job.image_count or 0) + result.images.images
+                        job.image_bytes_saved = (job.image_bytes_saved or 0) + result.images.bytes_saved
+                        db.commit()
+                    status_cache.invalidate(job.id)
+                    
+                    if not pending:
+                        # A repeat whose original the response left out is OCR'd itself
+                        orphans = sorted(index for index, original in duplicates.items() if original not in stored)
+                        if orphans:
+                            logger.warning(f"Job {job.id}: originals of pages {orphans} missing from OCR, sending them")
+                            for index in orphans:
+                                del duplicates[index]
+                            pending.append(orphans)
+            finally:
+                if upload_path:
+                    os.remove(upload_path)
+        else:
+            logger.info(f"Document {document_id} has no pages left to OCR")
+        
+        # Repeated pages take the markdown of the page they repeat
+        if duplicates:
+            for index, original in duplicates.items():
+                store_page(db, job, stored, index, PageSource.DUPLICATE, stored[original].markdown)
+            db.commit()
+            archive_pages(
+                job,
+                [{"index": index, "duplicate_of": original} for index, original in duplicates.items()],
+                PageSource.DUPLICATE
+            )
+        
+        # Checkpoint commits expired the stored pages; reload them in one query, not one each
+        db.query(OCRPage).filter(OCRPage.job_id == job.id).all()
+        pages = {index: (page.source, page.markdown) for index, page in stored.items()}
+        
+        # Combine all pages into markdown
+        markdown_content = assemble_markdown(
+            (index, markdown) for index, (_, markdown) in pages.items()
+        )
+        
+        # Save markdown to file
+        with span("ocr.write_markdown", bytes=len(markdown_content)):
+            output_path = write_markdown_export(document, job, markdown_content)
+        
+        with span("db.commit", stage="complete_job"):
+            # Update job with success
+            job.status = JobStatus.COMPLETED
+            job.output_path = output_path
+            job.markdown_content = markdown_content
+            job.completed_at = datetime.now()
+            job.export_revision = (job.export_revision or 0) + 1
+            job.error_message = None
+            job.blank_pages = sum(1 for source, _ in pages.values() if source == PageSource.BLANK)
+            job.duplicate_pages = sum(1 for source, _ in pages.values() if source == PageSource.DUPLICATE)
+            
+            # Update document status
+            document.status = DocumentStatus.COMPLETED
+            document.error_message = None
+            
+            db.commit()
+            db.refresh(job)
+        status_cache.invalidate(job.id)
+        
+        # Make the new pages searchable; a stale index must not fail the job
+        try:
+            with span("search.index"):
+                index_document_pages(
+                    db, document_id, job.id,
+                    ((index, markdown) for index, (_, markdown) in pages.items())
                 )
-                
-                # Combine all pages into markdown
-                markdown_content = ""
-                for page in response.pages:
-                    markdown_content += f"## Page {page.index + 1}\n\n"
-                    markdown_content += page.markdown + "\n\n"
-                
-                # Save markdown to file
-                output_filename = f"{document.filename.rsplit('.', 1)[0]}_{job.id}.md"
-                output_path = os.path.join(settings.EXPORT_DIR, output_filename)
-                
-                with open(output_path, 'w', encoding='utf-8') as md_file:
-                    md_file.write(markdown_content)
-                
-                # Update job with success
-                job.status = JobStatus.COMPLETED
-                job.output_path = output_path
-                job.markdown_content = markdown_content
-                job.completed_at = datetime.now()
-                job.error_message = None
-                
-                # Update document status
-                document.status = DocumentStatus.COMPLETED
-                document.error_message = None
-                
-                db.commit()
-                db.refresh(job)
-                
-                logger.info(f"Successfully processed document {document_id}")
-                return job
-                
-            except Exception as e:
-                last_error = str(e)
-                logger.error(f"Attempt {attempt} failed for document {document_id}: {last_error}")
-                
-                if attempt < settings.MAX_RETRIES:
-                    logger.info(f"Retrying in {backoff} seconds...")
-                    time.sleep(backoff)
-                    backoff *= 2
-                else:
-                    raise
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to index job {job.id} for search: {e}")
         
-        # If all retries failed
-        raise Exception(f"All {settings.MAX_RETRIES} attempts failed. Last error: {last_error}")
+        text_layer_count = sum(1 for source, _ in pages.values() if source == PageSource.TEXT_LAYER)
+        ocr_count = len(pages) - text_layer_count - job.blank_pages - job.duplicate_pages
+        logger.info(
+            f"Successfully processed document {document_id} "
+            f"({text_layer_count} text layer pages, {ocr_count} OCR pages, "
+            f"{job.blank_pages} blank, {job.duplicate_pages} duplicate, {resumed} resumed)"
+        )
+        return job
         
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Failed to process document {document_id}: {error_msg}")
         
+        # Pages checkpointed so far are already committed
+        db.rollback()
+        
         # Update job with failure
         job.status = JobStatus.FAILED
         job.error_message = error_msg
@@ -157,6 +582,7 @@ def process_ocr(
         
         db.commit()
         db.refresh(job)
+        status_cache.invalidate(job.id)
         
         raise
 
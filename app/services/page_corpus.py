@@ -0,0 +1,301 @@
+import glob
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.export_renderer import assemble_markdown
+
+# Rolling shards: pages-<prefix>-<n>.jsonl|.parquet plus an append-only
+# index-<prefix>.jsonl with one line per stored document
+_SHARD_RE = re.compile(r"^pages-(?P<prefix>.+)-(?P<number>\d{5})\.(?:jsonl|parquet)$")
+
+PARQUET_ROW_GROUP_PAGES = 2048
+
+
+@dataclass
+class PageRecord:
+    source: str
+    page_index: int
+    content_hash: str
+    markdown: str
+
+
+def content_hash(markdown: str) -> str:
+    return hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow, install it with: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+class CorpusWriter:
+    """
+    Append the pages of converted documents to rolling JSONL or Parquet shards.
+
+    A document's pages are stored contiguously: a byte range of a JSONL shard,
+    or a row range of one Parquet row group. The range is recorded in the
+    index, so reading a document back never scans a shard.
+
+    A Parquet shard is only readable once closed, so until then each document
+    is also appended to the shard's pending JSONL file and indexed there as
+    soon as it is added; closing the shard re-indexes those documents to it
+    and removes the pending file. A writer reopened after a crash carries the
+    pending documents into the shard it builds.
+
+    Writers running at the same time (one per node) must use distinct
+    ``prefix`` values; readers combine all of them.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        output_format: str = "jsonl",
+        prefix: str = "0",
+        max_shard_bytes: int = 256 * 1024 * 1024
+    ):
+        if output_format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown corpus format {output_format}")
+        if output_format == "parquet":
+            self._pa, self._pq = _require_pyarrow()
+        self.directory = directory
+        self.output_format = output_format
+        self.prefix = prefix
+        self.max_shard_bytes = max_shard_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, f"index-{prefix}.jsonl")
+
+        numbers = [
+            int(match.group("number"))
+            for match in map(_SHARD_RE.match, os.listdir(directory))
+            if match and match.group("prefix") == prefix
+        ]
+        self._number = max(numbers, default=-1)
+        self._jsonl_file = None
+        # Parquet shards only become readable once closed, so their index
+        # entries wait until then; the pending file keeps their documents readable
+        self._parquet_writer = None
+        self._parquet_rows: List[PageRecord] = []
+        self._parquet_row_groups = 0
+        self._parquet_bytes = 0
+        self._pending_index: List[dict] = []
+        self._pending_file = None
+
+        if output_format == "jsonl" and self._number >= 0:
+            last = self._shard_path(self._number)
+            if os.path.getsize(last) < max_shard_bytes:
+                self._jsonl_file = open(last, "ab")
+        if self._jsonl_file is None and output_format == "jsonl":
+            self._roll()
+        if output_format == "parquet":
+            self._recover_pending()
+
+    def _shard_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"pages-{self.prefix}-{number:05d}.{self.output_format}")
+
+    def _pending_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"pages-{self.prefix}-{number:05d}.pending.jsonl")
+
+    def _roll(self) -> None:
+        self._number += 1
+        if self.output_format == "jsonl":
+            if self._jsonl_file:
+                self._jsonl_file.close()
+            self._jsonl_file = open(self._shard_path(self._number), "ab")
+
+    def _write_index(self, entries: List[dict]) -> None:
+        with open(self._index_path, "a", encoding="utf-8") as index_file:
+            for entry in entries:
+                index_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def add_document(self, source: str, pages: Iterable[Tuple[int, str]]) -> None:
+        """Store the pages of a document; a later call for the same source supersedes it."""
+        records = [
+            PageRecord(source, index, content_hash(markdown), markdown)
+            for index, markdown in sorted(pages)
+        ]
+        if self.output_format == "jsonl":
+            self._add_jsonl(source, records)
+        else:
+            self._add_parquet(source, records)
+
+    def _add_jsonl(self, source: str, records: List[PageRecord]) -> None:
+        data = self._jsonl_lines(records)
+        if self._jsonl_file.tell() and self._jsonl_file.tell() + len(data) > self.max_shard_bytes:
+            self._roll()
+        self._append_jsonl(self._jsonl_file, source, data, len(records))
+
+    @staticmethod
+    def _jsonl_lines(records: List[PageRecord]) -> bytes:
+        return b"".join(
+            json.dumps({
+                "source": record.source,
+                "page_index": record.page_index,
+                "content_hash": record.content_hash,
+                "markdown": record.markdown,
+            }, ensure_ascii=False).encode("utf-8") + b"\n"
+            for record in records
+        )
+
+    def _append_jsonl(self, jsonl_file, source: str, data: bytes, pages: int) -> None:
+        offset = jsonl_file.tell()
+        jsonl_file.write(data)
+        jsonl_file.flush()
+        # The index line goes last, so a crash never leaves it pointing at a partial write
+        self._write_index([{
+            "source": source,
+            "shard": os.path.basename(jsonl_file.name),
+            "offset": offset,
+            "length": len(data),
+            "pages": pages,
+        }])
+
+    def _add_parquet(self, source: str, records: List[PageRecord]) -> None:
+        if self._pending_file is None:
+            self._roll()
+            self._pending_file = open(self._pending_path(self._number), "ab")
+        self._append_jsonl(self._pending_file, source, self._jsonl_lines(records), len(records))
+        self._pending_index.append({
+            "source": source,
+            "shard": os.path.basename(self._shard_path(self._number)),
+            "row_group": self._parquet_row_groups,
+            "offset": len(self._parquet_rows),
+            "pages": len(records),
+        })
+        self._parquet_rows.extend(records)
+        self._parquet_bytes += sum(len(record.markdown) for record in records)
+        # Documents never straddle row groups, so each maps to a single one
+        if len(self._parquet_rows) >= PARQUET_ROW_GROUP_PAGES:
+            self._flush_row_group()
+        if self._parquet_bytes >= self.max_shard_bytes:
+            self._close_parquet_shard()
+
+    def _flush_row_group(self) -> None:
+        if not self._parquet_rows:
+            return
+        table = self._pa.table({
+            "source": [record.source for record in self._parquet_rows],
+            "page_index": [record.page_index for record in self._parquet_rows],
+            "content_hash": [record.content_hash for record in self._parquet_rows],
+            "markdown": [record.markdown for record in self._parquet_rows],
+        })
+        if self._parquet_writer is None:
+            self._parquet_writer = self._pq.ParquetWriter(self._shard_path(self._number), table.schema)
+        self._parquet_writer.write_table(table, row_group_size=len(self._parquet_rows))
+        self._parquet_rows = []
+        self._parquet_row_groups += 1
+
+    def _close_parquet_shard(self) -> None:
+        self._flush_row_group()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        self._write_index(self._pending_index)
+        self._pending_index = []
+        self._parquet_row_groups = 0
+        self._parquet_bytes = 0
+        if self._pending_file is not None:
+            self._pending_file.close()
+            self._pending_file = None
+            os.remove(self._pending_path(self._number))
+
+    def _recover_pending(self) -> None:
+        """Carry the documents of a pending file left by a crashed writer into a new shard."""
+        pending = sorted(glob.glob(os.path.join(
+            glob.escape(self.directory), f"pages-{glob.escape(self.prefix)}-{'[0-9]' * 5}.pending.jsonl"
+        )))
+        if not pending:
+            return
+        # New shards are numbered after the pending ones, whose Parquet file may never have been written
+        self._number = max(self._number, *(int(os.path.basename(path).split("-")[-1][:5]) for path in pending))
+        names = {os.path.basename(path) for path in pending}
+        reader = CorpusReader(self.directory)
+        for source, entry in reader.index.items():
+            if entry["shard"] in names:
+                # Indexed in the new pending file before the old one is removed
+                self._add_parquet(source, reader.pages(source))
+        for path in pending:
+            os.remove(path)
+
+    def close(self) -> None:
+        if self.output_format == "jsonl":
+            if self._jsonl_file:
+                self._jsonl_file.close()
+                self._jsonl_file = None
+        else:
+            self._close_parquet_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CorpusReader:
+    """
+    Random access to the documents of a corpus directory.
+
+    The index files are loaded into a dict once, after which finding a
+    document is a dict lookup and reading it a single seek and read (JSONL)
+    or a single row group read (Parquet).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index: Dict[str, dict] = {}
+        for path in sorted(glob.glob(os.path.join(directory, "index-*.jsonl"))):
+            with open(path, encoding="utf-8") as index_file:
+                for line in index_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.index[entry["source"]] = entry
+        self._parquet_files = {}
+
+    def sources(self) -> List[str]:
+        return sorted(self.index)
+
+    def pages(self, source: str) -> Optional[List[PageRecord]]:
+        """Return the pages of a document in order, or None if it is not in the corpus."""
+        entry = self.index.get(source)
+        if entry is None:
+            return None
+        path = os.path.join(self.directory, entry["shard"])
+
+        if entry["shard"].endswith(".jsonl"):
+            with open(path, "rb") as shard:
+                shard.seek(entry["offset"])
+                data = shard.read(entry["length"])
+            rows = [json.loads(line) for line in data.splitlines()]
+        else:
+            _, pq = _require_pyarrow()
+            parquet_file = self._parquet_files.get(path)
+            if parquet_file is None:
+                parquet_file = self._parquet_files[path] = pq.ParquetFile(path)
+            table = parquet_file.read_row_group(entry["row_group"]).slice(entry["offset"], entry["pages"])
+            rows = table.to_pylist()
+
+        return [
+            PageRecord(row["source"], row["page_index"], row["content_hash"], row["markdown"])
+            for row in rows
+        ]
+
+    def materialize(self, source: str, export_dir: str) -> Optional[str]:
+        """Write a document back out as ``<source>.md`` under export_dir and return the path."""
+        pages = self.pages(source)
+        if pages is None:
+            return None
+        output_path = os.path.join(export_dir, source.rsplit(".", 1)[0] + ".md")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as md_file:
+            md_file.write(assemble_markdown((page.page_index, page.markdown) for page in pages))
+        return output_path
@@ -0,0 +1,98 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import pymupdf
+
+logger = logging.getLogger(__name__)
+
+# Grey levels (0-255) below this count as ink: anything visibly not white,
+# since anti-aliased small text rarely renders darker than mid grey
+INK_LEVEL = 200
+
+# Lowest resolution pages are rendered at; below it a short line of small
+# text blurs into a few light pixels
+MIN_DPI = 72
+
+# Share of each edge ignored when measuring ink, so scanner shadows and punch
+# holes along the border do not make a blank page look used
+BLANK_MARGIN = 0.05
+
+# Maps every grey level to 1 if it is ink and 0 otherwise, for bytes.translate
+_INK_TABLE = bytes(1 if level < INK_LEVEL else 0 for level in range(256))
+
+
+@dataclass
+class PrunedPage:
+    index: int
+    reason: str  # "blank" or "duplicate"
+    duplicate_of: Optional[int] = None
+    ink: float = 0.0  # share of the page (inside the margins) covered by ink
+
+
+def _ink_coverage(pix: "pymupdf.Pixmap") -> float:
+    """Share of dark pixels in a greyscale pixmap, ignoring BLANK_MARGIN on each edge."""
+    x0 = int(pix.width * BLANK_MARGIN)
+    x1 = pix.width - x0
+    y0 = int(pix.height * BLANK_MARGIN)
+    y1 = pix.height - y0
+    if x1 <= x0 or y1 <= y0:
+        return 0.0
+    samples = pix.samples
+    stride = pix.stride
+    ink = 0
+    for row in range(y0, y1):
+        start = row * stride
+        ink += samples[start + x0:start + x1].translate(_INK_TABLE).count(1)
+    return ink / ((x1 - x0) * (y1 - y0))
+
+
+def find_prunable_pages(
+    pdf_path: str,
+    page_indices: Optional[Iterable[int]] = None,
+    blank_ink_ratio: float = 0.00005,
+    dpi: int = 72
+) -> Dict[int, PrunedPage]:
+    """
+    Find pages not worth sending to OCR: blank pages and exact repeats.
+
+    Each page is rendered once in greyscale at a low resolution (at least
+    MIN_DPI), which also smooths out scanner speckle. A page whose ink covers
+    less than ``blank_ink_ratio`` of it is blank: the default allows a few
+    specks, while a single short line of small text is several times above
+    it. A page whose render is identical to an earlier one is a duplicate of
+    it, and reuses that page's OCR result.
+
+    Args:
+        pdf_path: Path to the PDF
+        page_indices: Pages to check (0-based), all pages if None
+        blank_ink_ratio: Ink coverage below which a page counts as blank
+        dpi: Resolution pages are rendered at, raised to MIN_DPI
+
+    Returns:
+        Pruned pages by page index; pages not in it should be OCR'd
+    """
+    pruned: Dict[int, PrunedPage] = {}
+    first_by_hash: Dict[str, int] = {}
+    dpi = max(dpi, MIN_DPI)
+    with pymupdf.open(pdf_path) as doc:
+        indices = range(doc.page_count) if page_indices is None else sorted(page_indices)
+        for index in indices:
+            pix = doc[index].get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY, alpha=False)
+            ink = _ink_coverage(pix)
+            if ink < blank_ink_ratio:
+                pruned[index] = PrunedPage(index, "blank", ink=ink)
+                continue
+            digest = hashlib.sha256(f"{pix.width}x{pix.height}:".encode() + pix.samples).hexdigest()
+            original = first_by_hash.get(digest)
+            if original is None:
+                first_by_hash[digest] = index
+            else:
+                pruned[index] = PrunedPage(index, "duplicate", duplicate_of=original, ink=ink)
+    logger.debug(
+        f"Page pruning on {pdf_path}: "
+        f"{sum(page.reason == 'blank' for page in pruned.values())} blank, "
+        f"{sum(page.reason == 'duplicate' for page in pruned.values())} duplicate"
+    )
+    return pruned
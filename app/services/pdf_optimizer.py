@@ -0,0 +1,84 @@
+import logging
+import os
+from typing import Tuple
+
+import pymupdf
+
+logger = logging.getLogger(__name__)
+
+
+def _effective_dpi(info: dict) -> float:
+    """Return the resolution an image is rendered at on its page."""
+    bbox = pymupdf.Rect(info["bbox"])
+    if bbox.is_empty:
+        return 0.0
+    # PDF user space is 72 units per inch
+    return min(info["width"] / (bbox.width / 72), info["height"] / (bbox.height / 72))
+
+
+def _recompress_image(doc: "pymupdf.Document", xref: int, dpi: float,
+                      max_dpi: int, jpeg_quality: int) -> bytes:
+    """Downsample an image to ``max_dpi`` and encode it as JPEG."""
+    pix = pymupdf.Pixmap(doc, xref)
+    if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+        pix = pymupdf.Pixmap(pymupdf.csRGB, pix)
+    if pix.alpha:
+        pix = pymupdf.Pixmap(pix, 0)  # drop the alpha channel
+    if dpi > max_dpi:
+        scale = max_dpi / dpi
+        pix = pymupdf.Pixmap(pix, max(1, int(pix.width * scale)), max(1, int(pix.height * scale)), None)
+    return pix.tobytes("jpeg", jpg_quality=jpeg_quality)
+
+
+def optimize_pdf(
+    src_path: str,
+    dst_path: str,
+    max_dpi: int = 200,
+    jpeg_quality: int = 75
+) -> Tuple[int, int]:
+    """
+    Write a slimmed copy of a PDF before it is sent for OCR.
+
+    Page images rendered above ``max_dpi`` are downsampled, images are
+    recompressed as JPEG when that makes them smaller, and unused or duplicate
+    objects are dropped when the file is rewritten.
+
+    Args:
+        src_path: Path to the original PDF
+        dst_path: Path to write the optimized PDF to
+        max_dpi: Resolution images are downsampled to
+        jpeg_quality: JPEG quality (1-100) used for recompressed images
+
+    Returns:
+        Tuple of (original size, optimized size) in bytes
+    """
+    replaced = 0
+    with pymupdf.open(src_path) as doc:
+        seen = set()
+        for page in doc:
+            for info in page.get_image_info(xrefs=True):
+                xref = info["xref"]
+                if not xref or xref in seen or info["has-mask"]:
+                    continue
+                seen.add(xref)
+
+                try:
+                    data = _recompress_image(doc, xref, _effective_dpi(info), max_dpi, jpeg_quality)
+                except Exception as e:
+                    logger.debug(f"Keeping image {xref} of {src_path} unchanged: {e}")
+                    continue
+
+                # Bilevel scans (CCITT/JBIG2) are often smaller than any JPEG
+                if len(data) < len(doc.xref_stream_raw(xref) or b""):
+                    page.replace_image(xref, stream=data)
+                    replaced += 1
+
+        doc.save(dst_path, garbage=4, deflate=True, clean=True)
+
+    original_size = os.path.getsize(src_path)
+    optimized_size = os.path.getsize(dst_path)
+    logger.info(
+        f"Optimized {src_path}: {original_size} -> {optimized_size} bytes "
+        f"({replaced} images recompressed)"
+    )
+    return original_size, optimized_size
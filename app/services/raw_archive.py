@@ -0,0 +1,138 @@
+"""
+Compressed archive of the raw OCR response pages of a document.
+
+An archive is a gzip file of JSON lines, one record per page, appended to as
+OCR requests return: each append is a gzip member of its own, which gzip
+readers read as one stream. A page recorded again later (a retried or resumed
+request) replaces the earlier record. Output can then be rebuilt from the
+archive in any format without calling the OCR API again.
+
+Imports no settings, so it runs in CPU pool workers and the batch converter.
+"""
+import gzip
+import json
+import logging
+import os
+import types
+import zlib
+from typing import Any, Dict, Iterable, Optional
+
+from app.services.image_store import ImageStore
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = ".pages.jsonl.gz"
+
+COMPRESS_LEVEL = 6
+
+
+def _plain(value: Any) -> Any:
+    """Turn an OCR response object (pydantic model or plain object) into JSON-compatible data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if hasattr(value, "__dict__"):
+        return {key: _plain(item) for key, item in vars(value).items() if not key.startswith("_")}
+    return value
+
+
+def _object(value: Any) -> Any:
+    """Give archived data attribute access again, as code written for response objects expects."""
+    if isinstance(value, dict):
+        return types.SimpleNamespace(**{key: _object(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_object(item) for item in value]
+    return value
+
+
+def append_pages(path: str, pages: Iterable[Any], source: str = "ocr", index_offset: int = 0, **meta: Any) -> int:
+    """
+    Append page records to an archive.
+
+    Args:
+        path: Archive file, created if missing
+        pages: OCR response pages (or dicts with at least ``index``)
+        source: How the pages were produced: "ocr" for raw responses, or the
+            page source of pages stored as they are
+        index_offset: Subtracted from page indices, for pages of a document
+            that was sent as part of a larger one
+        meta: Extra fields for every record, e.g. the OCR model
+
+    Returns:
+        Compressed bytes written
+    """
+    records = []
+    for page in pages:
+        page = _plain(page)
+        if index_offset:
+            page["index"] -= index_offset
+        records.append(json.dumps({"source": source, "page": page, **meta}, ensure_ascii=False) + "\n")
+    lines = "".join(records)
+    if not lines:
+        return 0
+    data = gzip.compress(lines.encode("utf-8"), compresslevel=COMPRESS_LEVEL)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "ab") as archive:
+        archive.write(data)
+    return len(data)
+
+
+def read_records(path: str) -> Dict[int, Dict[str, Any]]:
+    """Return the latest record of each page, keyed by page index; a cut-off tail is ignored, a missing archive is empty."""
+    records: Dict[int, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return records
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as archive:
+            for line in archive:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # line cut short by a crash
+                records[record["page"]["index"]] = record
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        logger.warning(f"Archive {path} is truncated, using the {len(records)} pages read: {e}")
+    return records
+
+
+def render_page(page: Dict[str, Any], image_store=None, url_prefix: str = "") -> str:
+    """
+    Markdown of a raw OCR response page.
+
+    With an image store, the page's images are stored (once per distinct
+    content) and the markdown links to them, as when it was first processed.
+    """
+    if image_store is not None and page.get("images"):
+        markdown, _ = image_store.extract_page_images(_object(page), url_prefix)
+        return markdown
+    return page.get("markdown") or ""
+
+
+def render_archive(path: str, image_dir: Optional[str] = None, url_prefix: str = "") -> Dict[int, str]:
+    """
+    Markdown of every page in an archive, keyed by page index.
+
+    Raw OCR pages are rendered with ``render_page``, pages stored as they are
+    keep their markdown, and duplicate pages (recorded with ``duplicate_of``)
+    repeat the markdown of their original.
+    """
+    image_store = ImageStore(image_dir) if image_dir else None
+
+    markdown: Dict[int, str] = {}
+    duplicates: Dict[int, int] = {}
+    for index, record in read_records(path).items():
+        page = record["page"]
+        if record["source"] == "ocr":
+            markdown[index] = render_page(page, image_store, url_prefix)
+        elif "duplicate_of" in page:
+            duplicates[index] = page["duplicate_of"]
+        else:
+            markdown[index] = page.get("markdown") or ""
+    for index, original in duplicates.items():
+        markdown[index] = markdown.get(original, "")
+    return markdown
@@ -0,0 +1,247 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import settings
+from app.models.ocr_page import OCRPage, PageSource
+from app.models.processing_job import ProcessingJob, JobStatus
+from app.services.cpu_pool import cpu_pool
+from app.services.cpu_tasks import RerenderResult, RerenderTask, rerender_job
+from app.services.export_cache import export_cache
+from app.services.export_renderer import ExportFormat
+from app.services.ocr_service import raw_archive_path, write_markdown_export
+from app.services.search_index import index_document_pages
+from app.services.status_cache import status_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RerenderStats:
+    jobs: int = 0
+    pages: int = 0  # pages rebuilt from the raw archive
+    skipped: int = 0  # jobs without an archive (processed before archiving)
+    failed: int = 0
+    seconds: float = 0.0
+    last_job_id: Optional[int] = None
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+
+def completed_job_ids(db: Session, after_job_id: int = 0, limit: Optional[int] = None) -> List[int]:
+    """IDs of completed jobs after a job ID, in order."""
+    query = db.query(ProcessingJob.id).filter(
+        ProcessingJob.status == JobStatus.COMPLETED,
+        ProcessingJob.id > after_job_id
+    ).order_by(ProcessingJob.id)
+    if limit:
+        query = query.limit(limit)
+    return [job_id for (job_id,) in query]
+
+
+def _task(job: ProcessingJob, formats: Sequence[ExportFormat]) -> RerenderTask:
+    # Archived pages, duplicates included, replace these; they only fill pages
+    # the archive lacks (archives written before every page was recorded)
+    stored_pages = {page.page_index: page.markdown for page in job.pages}
+    return RerenderTask(
+        job_id=job.id,
+        archive_path=raw_archive_path(job.id),
+        title=job.document.original_filename.rsplit('.', 1)[0],
+        stored_pages=stored_pages,
+        formats=[export_format.value for export_format in formats],
+        export_dir=export_cache.directory,
+        image_dir=settings.IMAGE_STORE_DIR if settings.OCR_EXTRACT_IMAGES else None,
+        url_prefix=settings.IMAGE_URL_PREFIX
+    )
+
+
+def _apply(db: Session, job: ProcessingJob, result: RerenderResult, searchable: bool) -> None:
+    """Store the rebuilt pages of a job and refresh everything derived from them."""
+    by_index = {page.page_index: page for page in job.pages}
+    for index, markdown in result.changed.items():
+        page = by_index.get(index)
+        if page is None:
+            page = by_index[index] = OCRPage(job_id=job.id, page_index=index, source=PageSource.OCR)
+            db.add(page)
+        page.markdown = markdown
+
+    job.markdown_content = result.markdown
+    job.export_revision = (job.export_revision or 0) + 1
+    job.output_path = write_markdown_export(job.document, job, result.markdown)
+    db.commit()
+    status_cache.invalidate(job.id)
+
+    export_cache.invalidate(job.id)
+    for export_format, staged_path in result.exports.items():
+        export_cache.put_file(job.id, job.export_revision, ExportFormat(export_format), staged_path)
+
+    if searchable:
+        try:
+            pages = sorted((index, page.markdown) for index, page in by_index.items())
+            index_document_pages(db, job.document_id, job.id, pages)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to re-index job {job.id} for search: {e}")
+
+
+def _discard_exports(result: RerenderResult) -> None:
+    for staged_path in result.exports.values():
+        try:
+            os.remove(staged_path)
+        except FileNotFoundError:
+            pass
+
+
+def rerender_jobs(
+    db: Session,
+    job_ids: Sequence[int],
+    formats: Sequence[ExportFormat] = (),
+    batch_size: Optional[int] = None,
+    stats: Optional[RerenderStats] = None,
+    cancelled: Optional[threading.Event] = None
+) -> RerenderStats:
+    """
+    Rebuild completed jobs from their raw OCR archives, without calling the OCR API.
+
+    Pages, stored markdown, the markdown export and the search index entries
+    are rewritten, and cached exports are dropped, or rendered again for the
+    given ``formats``. Archives are decoded and rendered across the CPU pool,
+    a batch of jobs at a time; the database is updated as each batch returns.
+
+    Args:
+        db: Database session
+        job_ids: Jobs to rebuild; jobs not completed or without an archive are skipped
+        formats: Export formats to render into the export cache right away
+        batch_size: Jobs per batch, RERENDER_BATCH_SIZE by default
+        stats: Counts to update as batches finish, for progress reports
+        cancelled: Stops the run after the current batch once set
+
+    Returns:
+        Counts of jobs and pages rebuilt, and the pages/sec achieved
+    """
+    batch_size = batch_size or settings.RERENDER_BATCH_SIZE
+    stats = stats or RerenderStats()
+    started = time.monotonic()
+    for start in range(0, len(job_ids), batch_size):
+        if cancelled is not None and cancelled.is_set():
+            break
+        batch = list(job_ids[start:start + batch_size])
+        jobs = db.query(ProcessingJob).options(
+            selectinload(ProcessingJob.pages),
+            selectinload(ProcessingJob.document)
+        ).filter(
+            ProcessingJob.id.in_(batch),
+            ProcessingJob.status == JobStatus.COMPLETED
+        ).all()
+        archived = [job for job in jobs if os.path.exists(raw_archive_path(job.id))]
+        stats.skipped += len(batch) - len(archived)
+
+        # Only the latest completed job of a document is in the search index
+        document_ids = {job.document_id for job in archived}
+        latest = dict(
+            db.query(ProcessingJob.document_id, func.max(ProcessingJob.id)).filter(
+                ProcessingJob.document_id.in_(document_ids),
+                ProcessingJob.status == JobStatus.COMPLETED
+            ).group_by(ProcessingJob.document_id)
+        ) if document_ids else {}
+
+        jobs_by_id = {job.id: job for job in archived}
+        results = cpu_pool.map(rerender_job, [_task(job, formats) for job in archived])
+        for result in results:
+            job = jobs_by_id[result.job_id]
+            if result.error:
+                logger.warning(f"Could not re-render job {job.id}: {result.error}")
+                stats.failed += 1
+                continue
+            try:
+                _apply(db, job, result, searchable=latest.get(job.document_id) == job.id)
+            except Exception as e:
+                db.rollback()
+                _discard_exports(result)
+                logger.warning(f"Could not store the re-rendered job {job.id}: {e}")
+                stats.failed += 1
+                continue
+            stats.jobs += 1
+            stats.pages += result.archived_pages
+        stats.last_job_id = batch[-1]
+        db.expunge_all()
+        stats.seconds = time.monotonic() - started
+        logger.info(
+            f"Re-rendered {stats.jobs} jobs, {stats.pages} pages "
+            f"({stats.pages_per_second:.0f} pages/s, {stats.skipped} skipped, {stats.failed} failed)"
+        )
+    stats.seconds = time.monotonic() - started
+    return stats
+
+
+class RerenderRegistry:
+    """Re-render runs started through the admin API, run one at a time in background threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: Dict[int, dict] = {}
+        self._next_id = 1
+
+    def start(
+        self,
+        job_ids: List[int],
+        formats: Sequence[ExportFormat],
+        after_job_id: Optional[int],
+        more: bool,
+        session_factory: Callable[[], Session]
+    ) -> dict:
+        with self._lock:
+            if any(entry["state"] == "running" for entry in self._runs.values()):
+                raise RuntimeError("Another re-render is already running")
+            entry = {
+                "id": self._next_id, "state": "running", "error": None, "total": len(job_ids),
+                "stats": RerenderStats(), "cancelled": threading.Event(),
+                "after_job_id": after_job_id, "more": more
+            }
+            self._runs[entry["id"]] = entry
+            self._next_id += 1
+
+        def run():
+            db = session_factory()
+            try:
+                rerender_jobs(db, job_ids, formats, stats=entry["stats"], cancelled=entry["cancelled"])
+                entry["state"] = "cancelled" if entry["cancelled"].is_set() else "completed"
+            except Exception as e:
+                logger.error(f"Re-render run {entry['id']} failed: {e}")
+                entry["state"] = "failed"
+                entry["error"] = str(e)
+            finally:
+                db.close()
+
+        threading.Thread(target=run, name=f"rerender-{entry['id']}", daemon=True).start()
+        return entry
+
+    def get(self, run_id: int) -> Optional[dict]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def cancel(self, run_id: int) -> Optional[dict]:
+        entry = self.get(run_id)
+        if entry is not None:
+            entry["cancelled"].set()
+        return entry
+
+    @staticmethod
+    def next_after_job_id(entry: dict) -> Optional[int]:
+        """Where a run over completed jobs continues, once it stopped; None when done or for explicit jobs."""
+        if entry["after_job_id"] is None or entry["state"] == "running":
+            return None
+        if entry["state"] == "completed":
+            return entry["stats"].last_job_id if entry["more"] else None
+        return entry["stats"].last_job_id or entry["after_job_id"]
+
+
+rerender_registry = RerenderRegistry()
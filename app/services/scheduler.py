@@ -0,0 +1,221 @@
+import logging
+import threading
+import time
+from typing import List, Optional, Set
+
+from sqlalchemy import and_, or_
+
+from app.core import tracing
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.document import Document
+from app.models.processing_job import ProcessingJob, JobStatus
+from app.services.job_lease import lease_expired
+from app.services.scheduling_policy import QueuedJob, SchedulingPolicy
+
+logger = logging.getLogger(__name__)
+
+# Without a page count, documents are sized as one page per 100KB
+BYTES_PER_PAGE_ESTIMATE = 100 * 1024
+
+# Weight of the latest job in the moving average of job run times
+SERVICE_TIME_SMOOTHING = 0.1
+
+
+def job_size(document: Document) -> float:
+    """Estimate the OCR cost of a document in pages."""
+    if document.page_count:
+        return float(document.page_count)
+    return max(1.0, document.file_size / BYTES_PER_PAGE_ESTIMATE)
+
+
+class JobScheduler:
+    """
+    Runs queued OCR jobs on a fixed pool of worker threads in policy order.
+
+    Pending jobs survive restarts: on start, every job the database still has
+    as pending, or as processing with an expired lease (its process died), is
+    queued again. Pending jobs created outside the app (e.g. by the bulk import
+    CLI or another instance) and abandoned ones are picked up every
+    ``poll_interval`` seconds. Every process may queue the same job; the one
+    whose ``process_ocr`` claims it runs it.
+    """
+
+    def __init__(self, policy: SchedulingPolicy, workers: int, poll_interval: float = 0):
+        self.policy = policy
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._known: Set[int] = set()
+        self._last_job_id = 0  # highest job ID queued so far
+        self.mean_service_seconds: Optional[float] = None  # moving average of job run times
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    @property
+    def queue_depth(self) -> int:
+        with self._condition:
+            return len(self.policy)
+
+    def submit(self, job: ProcessingJob, document: Document) -> None:
+        """Queue a job for processing."""
+        self.submit_ids(job.id, document.id, job.client_id, job.priority, job_size(document))
+
+    def submit_ids(
+        self,
+        job_id: int,
+        document_id: int,
+        client_id: Optional[str],
+        priority: Optional[int],
+        size: float
+    ) -> None:
+        """Queue a job by its IDs, for callers that created it without loading ORM objects."""
+        if not self._threads:
+            self.start()
+        self._enqueue(QueuedJob(
+            job_id=job_id,
+            document_id=document_id,
+            client_id=client_id or "anonymous",
+            priority=priority or 0,
+            size=size,
+            enqueued_at=time.monotonic(),
+            trace_context=tracing.current_context()
+        ))
+
+    def _enqueue(self, queued: QueuedJob) -> None:
+        with self._condition:
+            if queued.job_id in self._known:
+                return
+            self._known.add(queued.job_id)
+            self._last_job_id = max(self._last_job_id, queued.job_id)
+            self.policy.push(queued)
+            self._condition.notify()
+
+    def _recover(self, new_only: bool = False) -> None:
+        """Queue unfinished jobs, or with ``new_only`` pending jobs newer than any queued so far and abandoned ones."""
+        db = SessionLocal()
+        try:
+            query = db.query(ProcessingJob, Document).join(
+                Document, ProcessingJob.document_id == Document.id
+            )
+            if new_only:
+                query = query.filter(or_(
+                    and_(ProcessingJob.status == JobStatus.PENDING, ProcessingJob.id > self._last_job_id),
+                    ProcessingJob.status == JobStatus.PROCESSING
+                ))
+            else:
+                query = query.filter(
+                    ProcessingJob.status.in_([JobStatus.PENDING, JobStatus.PROCESSING])
+                )
+            # Processing jobs still leased are run by a live process
+            rows = [
+                (job, document) for job, document in query.order_by(ProcessingJob.id)
+                if job.status == JobStatus.PENDING or lease_expired(job.updated_at)
+            ]
+            now = time.monotonic()
+            for job, document in rows:
+                self._enqueue(QueuedJob(
+                    job_id=job.id,
+                    document_id=document.id,
+                    client_id=job.client_id or "anonymous",
+                    priority=job.priority or 0,
+                    size=job_size(document),
+                    enqueued_at=now
+                ))
+            if rows:
+                if new_only:
+                    logger.info(f"Queued {len(rows)} new OCR jobs")
+                else:
+                    logger.info(f"Re-queued {len(rows)} unfinished OCR jobs")
+        finally:
+            db.close()
+
+    def _poll(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopping, timeout=self.poll_interval)
+                if self._stopping:
+                    return
+            try:
+                self._recover(new_only=True)
+            except Exception as e:
+                logger.error(f"Polling for new OCR jobs failed: {e}")
+
+    def _worker(self) -> None:
+        # Imported here to keep the scheduler importable without the OCR client
+        from app.services.ocr_service import process_ocr
+
+        while True:
+            with self._condition:
+                while not self._stopping and not len(self.policy):
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                queued = self.policy.pop(time.monotonic())
+
+            started = time.monotonic()
+            db = SessionLocal()
+            try:
+                # Continue the trace of the request that submitted the job
+                with tracing.use_context(queued.trace_context), tracing.span(
+                    "job.run",
+                    job_id=queued.job_id,
+                    document_id=queued.document_id,
+                    client_id=queued.client_id,
+                    queue_wait_ms=round((started - queued.enqueued_at) * 1000, 1)
+                ):
+                    process_ocr(db, queued.document_id, queued.job_id)
+            except Exception as e:
+                logger.error(f"Background OCR task failed: {e}")
+            finally:
+                db.close()
+                with self._condition:
+                    service_seconds = time.monotonic() - started
+                    self.policy.finish(queued, service_seconds, time.monotonic())
+                    if self.mean_service_seconds is None:
+                        self.mean_service_seconds = service_seconds
+                    else:
+                        self.mean_service_seconds += SERVICE_TIME_SMOOTHING * (
+                            service_seconds - self.mean_service_seconds
+                        )
+                    self._known.discard(queued.job_id)
+
+    def start(self) -> None:
+        """Re-queue unfinished jobs and start the worker threads."""
+        with self._condition:
+            if self._threads:
+                return
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._worker, name=f"ocr-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            if self.poll_interval > 0:
+                self._threads.append(threading.Thread(target=self._poll, name="ocr-job-poller", daemon=True))
+        self._recover()
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop the workers once their current jobs finish; queued jobs stay pending in the database."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=30)
+        with self._condition:
+            self._threads = []
+            self._known.clear()
+            self.policy.clear()
+
+
+job_scheduler = JobScheduler(
+    SchedulingPolicy(
+        aging_per_minute=settings.SCHEDULER_AGING_PER_MINUTE,
+        fair_share_weight=settings.SCHEDULER_FAIR_SHARE_WEIGHT,
+        shortest_job_first=settings.SCHEDULER_SHORTEST_JOB_FIRST,
+        usage_half_life=settings.SCHEDULER_USAGE_HALF_LIFE_SECONDS
+    ),
+    workers=settings.OCR_WORKERS,
+    poll_interval=settings.SCHEDULER_POLL_SECONDS
+)
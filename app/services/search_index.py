@@ -0,0 +1,258 @@
+import html
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.services.arabic_text import normalize_arabic, tokenize
+
+logger = logging.getLogger(__name__)
+
+# SQLite rowids encode (document_id, page_index) so re-indexing a document is
+# a rowid range delete rather than a scan over the unindexed columns.
+ROWID_STRIDE = 100_000
+
+# ``content`` is the normalized text that is matched; ``original`` is the page
+# as OCR'd, which snippets are cut from
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_pages USING fts5("
+    "content, original UNINDEXED, job_id UNINDEXED, document_id UNINDEXED, page_index UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+]
+
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS search_pages ("
+    "document_id INTEGER NOT NULL, "
+    "page_index INTEGER NOT NULL, "
+    "job_id INTEGER NOT NULL, "
+    "content TEXT NOT NULL, "
+    "original TEXT, "
+    "tsv tsvector GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED, "
+    "PRIMARY KEY (document_id, page_index))",
+    "CREATE INDEX IF NOT EXISTS ix_search_pages_tsv ON search_pages USING GIN (tsv)",
+]
+
+# Indexes created before the original text was kept get it from the stored pages
+# (FTS5 tables cannot add columns, so the SQLite one is rebuilt)
+SQLITE_ADD_ORIGINAL = [
+    "ALTER TABLE search_pages RENAME TO search_pages_old",
+    SQLITE_DDL[0],
+    "INSERT INTO search_pages (rowid, content, original, job_id, document_id, page_index) "
+    "SELECT old.rowid, old.content, "
+    "(SELECT markdown FROM ocr_pages WHERE ocr_pages.job_id = old.job_id AND ocr_pages.page_index = old.page_index), "
+    "old.job_id, old.document_id, old.page_index FROM search_pages_old AS old",
+    "DROP TABLE search_pages_old",
+]
+
+POSTGRES_ADD_ORIGINAL = [
+    "ALTER TABLE search_pages ADD COLUMN original TEXT",
+    "UPDATE search_pages SET original = ocr_pages.markdown FROM ocr_pages "
+    "WHERE ocr_pages.job_id = search_pages.job_id AND ocr_pages.page_index = search_pages.page_index",
+]
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_WORDS = 16
+
+# A word of the original text, including the tashkeel and tatweel \w leaves out
+_ORIGINAL_WORD_RE = re.compile(r"[\w\u0610-\u061a\u064b-\u065f\u0640\u0670\u06d6-\u06ed]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@dataclass
+class SearchHit:
+    document_id: int
+    job_id: int
+    page_index: int
+    snippet: str
+    score: float
+
+
+def _dialect(db: Session) -> str:
+    name = db.get_bind().dialect.name
+    if name not in ("sqlite", "postgresql"):
+        raise NotImplementedError(f"Full-text search is not supported on {name}")
+    return name
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Create the search index structures for the engine's dialect if missing."""
+    ddl = {"sqlite": SQLITE_DDL, "postgresql": POSTGRES_DDL}.get(engine.dialect.name)
+    if ddl is None:
+        logger.warning(f"Full-text search is not available on {engine.dialect.name}")
+        return
+    with engine.begin() as conn:
+        for statement in ddl:
+            conn.execute(text(statement))
+        if "original" not in conn.execute(text("SELECT * FROM search_pages LIMIT 0")).keys():
+            logger.info("Adding the original page text to the search index")
+            upgrade = SQLITE_ADD_ORIGINAL if engine.dialect.name == "sqlite" else POSTGRES_ADD_ORIGINAL
+            for statement in upgrade:
+                conn.execute(text(statement))
+
+
+def remove_document(db: Session, document_id: int) -> None:
+    """Drop every indexed page of a document. The caller commits."""
+    if _dialect(db) == "sqlite":
+        db.execute(
+            text("DELETE FROM search_pages WHERE rowid BETWEEN :first AND :last"),
+            {"first": document_id * ROWID_STRIDE, "last": (document_id + 1) * ROWID_STRIDE - 1}
+        )
+    else:
+        db.execute(
+            text("DELETE FROM search_pages WHERE document_id = :document_id"),
+            {"document_id": document_id}
+        )
+
+
+def index_document_pages(
+    db: Session,
+    document_id: int,
+    job_id: int,
+    pages: Iterable[Tuple[int, str]]
+) -> int:
+    """
+    Replace the indexed pages of a document with the results of a job.
+
+    Only the latest completed job of a document is searchable, so re-processing
+    a document does not produce duplicate hits.
+
+    Args:
+        db: Database session
+        document_id: Document the pages belong to
+        job_id: Job that produced the pages
+        pages: (page index, markdown) pairs
+
+    Returns:
+        Number of pages indexed
+    """
+    dialect = _dialect(db)
+    remove_document(db, document_id)
+
+    rows = [
+        {
+            "rowid": document_id * ROWID_STRIDE + index,
+            "document_id": document_id,
+            "job_id": job_id,
+            "page_index": index,
+            "content": normalize_arabic(markdown),
+            "original": markdown,
+        }
+        for index, markdown in pages
+    ]
+    if rows:
+        if dialect == "sqlite":
+            statement = (
+                "INSERT INTO search_pages (rowid, content, original, job_id, document_id, page_index) "
+                "VALUES (:rowid, :content, :original, :job_id, :document_id, :page_index)"
+            )
+        else:
+            statement = (
+                "INSERT INTO search_pages (document_id, page_index, job_id, content, original) "
+                "VALUES (:document_id, :page_index, :job_id, :content, :original)"
+            )
+        db.execute(text(statement), rows)
+    db.commit()
+    return len(rows)
+
+
+def _fold(term: str) -> str:
+    """Drop combining marks, as the unicode61 tokenizer does with remove_diacritics."""
+    return "".join(c for c in unicodedata.normalize("NFD", term) if not unicodedata.combining(c))
+
+
+def build_snippet(original: str, terms: List[str], words: int = SNIPPET_WORDS) -> str:
+    """
+    Cut a snippet of about ``words`` words from a page's original text.
+
+    The words that match a term once normalized are highlighted, so the page
+    reads as OCR'd (tashkeel, ta marbuta, case) while matching as indexed.
+    The page text is HTML-escaped, so the highlight marks are the only markup.
+    """
+    spans = list(_ORIGINAL_WORD_RE.finditer(original))
+    if not spans:
+        return ""
+    wanted = {_fold(term) for term in terms}
+    hits = {
+        position for position, match in enumerate(spans)
+        if any(_fold(token) in wanted for token in tokenize(match.group()))
+    }
+    first = min(hits) if hits else 0
+    start = max(0, min(first - words // 4, len(spans) - words))
+    window = spans[start:start + words]
+
+    parts = []
+    end = window[0].start()
+    for position, match in enumerate(window, start):
+        parts.append(html.escape(_SPACE_RE.sub(" ", original[end:match.start()])))
+        word = html.escape(match.group())
+        parts.append(SNIPPET_START + word + SNIPPET_END if position in hits else word)
+        end = match.end()
+    snippet = "".join(parts)
+    if start > 0:
+        snippet = "…" + snippet
+    if start + words < len(spans):
+        snippet += "…"
+    return snippet
+
+
+def search_pages(db: Session, query: str, limit: int = 20, offset: int = 0) -> List[SearchHit]:
+    """
+    Search indexed pages, best matches first.
+
+    The query is normalized like the indexed text, so it matches regardless of
+    tashkeel, tatweel and alef/hamza/ta marbuta spelling. All terms must match.
+    Snippets are cut from the original page text, or from the normalized text
+    for pages indexed before it was kept.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+
+    if _dialect(db) == "sqlite":
+        rows = db.execute(
+            text(
+                "SELECT document_id, job_id, page_index, content, original, "
+                "bm25(search_pages) AS rank "
+                "FROM search_pages WHERE search_pages MATCH :match "
+                "ORDER BY rank LIMIT :limit OFFSET :offset"
+            ),
+            {
+                "match": " ".join('"' + term.replace('"', '""') + '"' for term in terms),
+                "limit": limit,
+                "offset": offset,
+            }
+        ).all()
+        # bm25() is lower-is-better
+        return [
+            SearchHit(
+                row.document_id, row.job_id, row.page_index,
+                build_snippet(row.original or row.content, terms), -row.rank
+            )
+            for row in rows
+        ]
+
+    rows = db.execute(
+        text(
+            "SELECT document_id, job_id, page_index, content, original, ts_rank(tsv, q) AS rank "
+            "FROM search_pages, plainto_tsquery('simple', :query) AS q "
+            "WHERE tsv @@ q ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+        ),
+        {
+            "query": " ".join(terms),
+            "limit": limit,
+            "offset": offset,
+        }
+    ).all()
+    return [
+        SearchHit(
+            row.document_id, row.job_id, row.page_index,
+            build_snippet(row.original or row.content, terms), row.rank
+        )
+        for row in rows
+    ]
@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from app.core.config import settings
+from app.models.processing_job import JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Failed jobs are not terminal: they can be resumed
+TERMINAL_STATES = (JobStatus.COMPLETED,)
+
+# Kinds of cached job views
+FULL = "full"
+STATUS = "status"
+
+
+class MemoryBackend:
+    """In-process LRU dict; entries expire at their deadline (None = never)."""
+
+    shared = False  # other processes do not see its invalidations
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class FileBackend:
+    """
+    Stand-in for a shared cache: one JSON file per key in a directory.
+
+    Every process on the host (or every host on a shared mount) sees the same
+    entries and invalidations, like a Redis deployment would provide.
+    """
+
+    shared = True
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace(":", "_") + ".json")
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with open(self._path(key), encoding="utf-8") as entry_file:
+                entry = json.load(entry_file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry["expires_at"] is not None and entry["expires_at"] <= time.time():
+            return None
+        return entry["value"]
+
+    def set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        entry = {"expires_at": time.time() + ttl if ttl is not None else None, "value": value}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+            json.dump(entry, tmp_file)
+        os.replace(tmp_path, self._path(key))
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+
+class RedisBackend:
+    """Shared cache in Redis (needs the redis package)."""
+
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis status cache backend needs redis, install it with: pip install redis")
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._redis.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        self._redis.set(key, json.dumps(value), px=int(ttl * 1000) if ttl is not None else None)
+
+    def delete(self, *keys: str) -> None:
+        self._redis.delete(*keys)
+
+
+class StatusCache:
+    """
+    Cache of the JSON views of jobs served to pollers.
+
+    Views are cached for ``ttl`` seconds, which bounds staleness when an
+    update happens in a process whose invalidation this backend does not see.
+    On a shared backend, which every process invalidates, completed jobs are
+    cached until invalidated, since they only change when deleted or their
+    export path is rewritten or dropped, and all of these invalidate. Failed
+    jobs always expire, since resuming them makes them run again.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(job_id: int, kind: str) -> str:
+        return f"job:{job_id}:{kind}"
+
+    def get(self, job_id: int, kind: str) -> Optional[dict]:
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.get(self._key(job_id, kind))
+        except Exception as e:
+            logger.warning(f"Status cache read failed: {e}")
+            return None
+
+    def put(self, job_id: int, kind: str, status: JobStatus, value: dict) -> None:
+        if self.backend is None:
+            return
+        ttl = None if status in TERMINAL_STATES and self.backend.shared else self.ttl
+        try:
+            self.backend.set(self._key(job_id, kind), value, ttl)
+        except Exception as e:
+            logger.warning(f"Status cache write failed: {e}")
+
+    def invalidate(self, job_id: int) -> None:
+        """Drop every cached view of a job; call after each committed state change."""
+        if self.backend is None:
+            return
+        try:
+            self.backend.delete(self._key(job_id, FULL), self._key(job_id, STATUS))
+        except Exception as e:
+            logger.warning(f"Status cache invalidation failed: {e}")
+
+
+def create_backend():
+    name = settings.STATUS_CACHE_BACKEND.lower()
+    if name == "memory":
+        return MemoryBackend(settings.STATUS_CACHE_MAX_ENTRIES)
+    if name == "file":
+        return FileBackend(settings.STATUS_CACHE_DIR)
+    if name == "redis":
+        return RedisBackend(settings.STATUS_CACHE_REDIS_URL)
+    return None
+
+
+status_cache = StatusCache(create_backend(), settings.STATUS_CACHE_TTL_SECONDS)
@@ -0,0 +1,326 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.document import Document, DocumentStatus
+from app.models.ocr_page import OCRPage
+from app.models.processing_job import ProcessingJob, JobStatus
+from app.services.export_cache import export_cache
+from app.services.file_store import forget_document_file
+from app.services.idempotency import purge_expired as purge_expired_idempotency_keys
+from app.services.ocr_service import file_store, raw_archive_path
+from app.services.search_index import remove_document as remove_document_from_index
+from app.services.status_cache import status_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _remove_file(path: Optional[str]) -> int:
+    """Delete a file if it exists and return the number of bytes freed."""
+    if not path:
+        return 0
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
+    except OSError as e:
+        logger.warning(f"Failed to delete file {path}: {e}")
+        return 0
+
+
+def purge_job(db: Session, job: ProcessingJob) -> None:
+    """Delete a job with its pages, markdown export, raw OCR archive and cached renders. The caller commits."""
+    _remove_file(job.output_path)
+    _remove_file(raw_archive_path(job.id))
+    export_cache.invalidate(job.id)
+    status_cache.invalidate(job.id)
+    db.query(OCRPage).filter(OCRPage.job_id == job.id).delete()
+    db.delete(job)
+
+
+def purge_document(db: Session, document: Document) -> None:
+    """
+    Delete a document with every file and row derived from it. The caller commits.
+
+    Removes the upload, its copy in the OCR file store, all jobs (pages,
+    exports, cached renders) and the document's search index entries.
+    """
+    try:
+        remove_document_from_index(db, document.id)
+    except NotImplementedError:
+        pass
+    for job in list(document.processing_jobs):
+        purge_job(db, job)
+    _remove_file(document.file_path)
+    forget_document_file(file_store, document)
+    db.delete(document)
+
+
+def _utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _older_than(value: Optional[datetime], age: timedelta, now: datetime) -> bool:
+    if value is None:
+        return False
+    return _utc_naive(value) < now - age
+
+
+def _past_retention(status: str, updated_at: Optional[datetime], now: datetime) -> bool:
+    """Return True if a failed or completed row outlived its retention (0 days = forever)."""
+    days = {
+        "failed": settings.RETENTION_FAILED_DAYS,
+        "completed": settings.RETENTION_COMPLETED_DAYS,
+    }.get(status, 0)
+    return bool(days) and _older_than(updated_at, timedelta(days=days), now)
+
+
+class StorageSweeper:
+    """
+    Background reconciliation of the database with UPLOAD_DIR and EXPORT_DIR.
+
+    Every tick handles at most ``batch_size`` rows and directory entries per
+    phase and remembers where it stopped, so a full pass over a large volume is
+    spread across many ticks instead of rescanning everything each time:
+
+    - rows: failed jobs past RETENTION_FAILED_DAYS are purged, documents
+      with a completed job past RETENTION_COMPLETED_DAYS are purged, and
+      documents without one are purged once their upload vanished or they
+      failed past RETENTION_FAILED_DAYS; jobs whose markdown export vanished
+      forget its path; expired idempotency keys are deleted. Both retentions
+      default to 0 days, so nothing is purged for age unless configured
+    - files: uploads and exports that no row references are deleted once they
+      are older than the grace period (so in-flight uploads and bulk import
+      links not yet committed are left alone)
+    - quota: once exports exceed EXPORT_QUOTA_BYTES the least recently used
+      ones are deleted; their jobs keep the markdown, so downloads rewrite it
+    """
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self._document_cursor = 0
+        self._job_cursor = 0
+        self._dir_iterators: Dict[str, Iterator[os.DirEntry]] = {}
+        # Export path -> (size, last access) as seen by the directory scan
+        self._exports: Dict[str, Tuple[int, float]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- database side ---------------------------------------------------
+
+    def _sweep_documents(self, db: Session, now: datetime) -> int:
+        documents = db.query(Document).filter(
+            Document.id > self._document_cursor
+        ).order_by(Document.id).limit(self.batch_size).all()
+        self._document_cursor = documents[-1].id if len(documents) == self.batch_size else 0
+
+        # A completed job keeps its document (and its results) unless completed retention is set
+        with_results = {
+            document_id for (document_id,) in db.query(ProcessingJob.document_id).filter(
+                ProcessingJob.document_id.in_([document.id for document in documents]),
+                ProcessingJob.status == JobStatus.COMPLETED
+            ).distinct()
+        } if documents else set()
+
+        grace = timedelta(seconds=settings.SWEEPER_ORPHAN_GRACE_SECONDS)
+        purged = 0
+        for document in documents:
+            if document.status == DocumentStatus.PROCESSING:
+                continue
+            if document.id in with_results:
+                missing = False
+                expired = _past_retention("completed", document.updated_at, now)
+            else:
+                missing = (
+                    not os.path.exists(document.file_path)
+                    and _older_than(document.updated_at, grace, now)
+                )
+                expired = _past_retention(document.status.value, document.updated_at, now)
+            if missing or expired:
+                logger.info(
+                    f"Purging document {document.id} "
+                    f"({'upload missing' if missing else f'{document.status.value} past retention'})"
+                )
+                purge_document(db, document)
+                purged += 1
+        db.commit()
+        return purged
+
+    def _sweep_jobs(self, db: Session, now: datetime) -> int:
+        jobs = db.query(ProcessingJob).filter(
+            ProcessingJob.id > self._job_cursor
+        ).order_by(ProcessingJob.id).limit(self.batch_size).all()
+        self._job_cursor = jobs[-1].id if len(jobs) == self.batch_size else 0
+
+        purged = 0
+        forgotten = []
+        for job in jobs:
+            if job.status == JobStatus.FAILED and _past_retention("failed", job.updated_at, now):
+                purge_job(db, job)
+                purged += 1
+            elif job.output_path and not os.path.exists(job.output_path):
+                job.output_path = None
+                forgotten.append(job.id)
+        db.commit()
+        for job_id in forgotten:
+            status_cache.invalidate(job_id)
+        return purged
+
+    def _sweep_idempotency_keys(self, db: Session) -> int:
+        purged = purge_expired_idempotency_keys(db, self.batch_size)
+        db.commit()
+        return purged
+
+    # --- filesystem side -------------------------------------------------
+
+    def _next_entries(self, directory: str) -> List[os.DirEntry]:
+        """Return the next batch of regular files, restarting the scan when exhausted."""
+        iterator = self._dir_iterators.get(directory)
+        if iterator is None:
+            try:
+                iterator = os.scandir(directory)
+            except FileNotFoundError:
+                return []
+            self._dir_iterators[directory] = iterator
+
+        entries = []
+        for entry in iterator:
+            if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                continue
+            entries.append(entry)
+            if len(entries) >= self.batch_size:
+                return entries
+        iterator.close()
+        del self._dir_iterators[directory]
+        return entries
+
+    def _sweep_uploads(self, db: Session) -> int:
+        entries = self._next_entries(settings.UPLOAD_DIR)
+        if not entries:
+            return 0
+        known = {
+            filename for (filename,) in db.query(Document.filename).filter(
+                Document.filename.in_([entry.name for entry in entries])
+            )
+        }
+        cutoff = time.time() - settings.SWEEPER_ORPHAN_GRACE_SECONDS
+        removed = 0
+        for entry in entries:
+            # A bulk import hardlink keeps the source's old mtime; linking sets ctime
+            stat = entry.stat()
+            if entry.name not in known and max(stat.st_mtime, stat.st_ctime) < cutoff:
+                logger.info(f"Removing orphaned upload {entry.path}")
+                _remove_file(entry.path)
+                removed += 1
+        return removed
+
+    def _sweep_exports(self, db: Session) -> int:
+        entries = self._next_entries(settings.EXPORT_DIR)
+        if not entries:
+            return 0
+        known = {
+            path for (path,) in db.query(ProcessingJob.output_path).filter(
+                ProcessingJob.output_path.in_([entry.path for entry in entries])
+            )
+        }
+        cutoff = time.time() - settings.SWEEPER_ORPHAN_GRACE_SECONDS
+        removed = 0
+        for entry in entries:
+            stat = entry.stat()
+            if entry.path in known:
+                self._exports[entry.path] = (stat.st_size, max(stat.st_atime, stat.st_mtime))
+            elif stat.st_mtime < cutoff:
+                logger.info(f"Removing orphaned export {entry.path}")
+                _remove_file(entry.path)
+                self._exports.pop(entry.path, None)
+                removed += 1
+        return removed
+
+    def _enforce_quota(self, db: Session) -> int:
+        quota = settings.EXPORT_QUOTA_BYTES
+        total = sum(size for size, _ in self._exports.values())
+        if not quota or total <= quota:
+            return 0
+
+        evicted = []
+        for path, (size, _) in sorted(self._exports.items(), key=lambda item: item[1][1]):
+            if total <= quota:
+                break
+            total -= size
+            _remove_file(path)
+            evicted.append(path)
+        for path in evicted:
+            del self._exports[path]
+
+        job_ids = [
+            job_id for (job_id,) in db.query(ProcessingJob.id).filter(ProcessingJob.output_path.in_(evicted))
+        ]
+        db.query(ProcessingJob).filter(
+            ProcessingJob.id.in_(job_ids)
+        ).update({ProcessingJob.output_path: None}, synchronize_session=False)
+        db.commit()
+        for job_id in job_ids:
+            status_cache.invalidate(job_id)
+        logger.info(f"Evicted {len(evicted)} exports to stay within {quota} bytes")
+        return len(evicted)
+
+    # --- scheduling ------------------------------------------------------
+
+    def run_once(self) -> Dict[str, int]:
+        """Run one incremental sweep tick and return what it did."""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            return {
+                "documents_purged": self._sweep_documents(db, now),
+                "jobs_purged": self._sweep_jobs(db, now),
+                "idempotency_keys_purged": self._sweep_idempotency_keys(db),
+                "uploads_removed": self._sweep_uploads(db),
+                "exports_removed": self._sweep_exports(db),
+                "exports_evicted": self._enforce_quota(db),
+            }
+        finally:
+            db.close()
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                stats = self.run_once()
+                if any(stats.values()):
+                    logger.info(f"Storage sweep: {stats}")
+            except Exception as e:
+                logger.error(f"Storage sweep failed: {e}")
+
+    def start(self, interval: Optional[float] = None) -> None:
+        """Start sweeping in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(interval or settings.SWEEPER_INTERVAL_SECONDS,),
+            name="storage-sweeper",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+
+storage_sweeper = StorageSweeper(batch_size=settings.SWEEPER_BATCH_SIZE)
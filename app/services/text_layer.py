@@ -0,0 +1,93 @@
+import logging
+import unicodedata
+from dataclasses import dataclass
+from typing import List
+
+import pymupdf
+
+logger = logging.getLogger(__name__)
+
+# Pages whose images cover more than this fraction of the page are treated as
+# scans even if they carry some text (captions, stamps or an old OCR layer).
+MAX_IMAGE_COVERAGE = 0.6
+
+# Share of characters that may be undecodable before a text layer is rejected.
+MAX_GARBAGE_RATIO = 0.1
+
+
+@dataclass
+class PageText:
+    """Embedded text layer found on a single PDF page."""
+    index: int
+    markdown: str
+    usable: bool
+
+
+def _garbage_ratio(text: str) -> float:
+    """Return the share of non-space characters that failed to decode."""
+    chars = [c for c in text if not c.isspace()]
+    if not chars:
+        return 1.0
+    garbage = sum(
+        1 for c in chars
+        if c == "\ufffd" or unicodedata.category(c) in ("Co", "Cc", "Cs")
+    )
+    return garbage / len(chars)
+
+
+def _image_coverage(page: "pymupdf.Page") -> float:
+    """Return the fraction of the page area covered by raster images."""
+    page_area = abs(page.rect)
+    if not page_area:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = pymupdf.Rect(info["bbox"]) & page.rect
+        covered += abs(bbox)
+    return min(covered / page_area, 1.0)
+
+
+def _page_markdown(page: "pymupdf.Page") -> str:
+    """Extract the page text as markdown paragraphs, one per text block."""
+    paragraphs = []
+    for block in page.get_text("blocks", sort=True):
+        # block = (x0, y0, x1, y1, text, block_no, block_type); type 1 is an image
+        if block[6] != 0:
+            continue
+        # NFKC folds Arabic presentation forms back to their base letters
+        text = unicodedata.normalize("NFKC", " ".join(block[4].split()))
+        if text:
+            paragraphs.append(text)
+    return "\n\n".join(paragraphs)
+
+
+def analyze_text_layer(pdf_path: str, min_chars: int = 50) -> List[PageText]:
+    """
+    Inspect every page of a PDF for a usable embedded text layer.
+
+    A page is usable when it has at least ``min_chars`` letters or digits,
+    decodes cleanly and is not dominated by a scanned image.
+
+    Args:
+        pdf_path: Path to the PDF file
+        min_chars: Minimum number of letters/digits for a page to count as text
+
+    Returns:
+        One PageText per page, in page order
+    """
+    pages = []
+    with pymupdf.open(pdf_path) as doc:
+        for page in doc:
+            markdown = _page_markdown(page)
+            letters = sum(1 for c in markdown if c.isalnum())
+            usable = (
+                letters >= min_chars
+                and _garbage_ratio(markdown) <= MAX_GARBAGE_RATIO
+                and _image_coverage(page) <= MAX_IMAGE_COVERAGE
+            )
+            pages.append(PageText(index=page.number, markdown=markdown, usable=usable))
+    logger.debug(
+        f"Text layer pre-pass on {pdf_path}: "
+        f"{sum(p.usable for p in pages)}/{len(pages)} pages usable"
+    )
+    return pages
@@ -0,0 +1,171 @@
+import logging
+import os
+import zipfile
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session, defer, selectinload
+
+from app.db.session import SessionLocal
+from app.models.processing_job import ProcessingJob
+from app.services.export_cache import open_job_export
+from app.services.export_renderer import ExportFormat
+from app.services.ocr_service import write_markdown_export
+from app.services.status_cache import status_cache
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from an export file per write into the archive
+READ_CHUNK_BYTES = 64 * 1024
+
+# Jobs loaded per query while streaming, then dropped from the session
+JOB_BATCH_SIZE = 200
+
+# Extensions of files that are compressed already and are stored as they are
+STORED_EXTENSIONS = (".docx",)
+
+# An archive entry: name in the archive, file path, open file or content, modification time
+ZipEntry = Tuple[str, Union[str, BinaryIO, bytes], Optional[datetime]]
+
+
+class _StreamSink:
+    """
+    Write-only file object for zipfile whose bytes are taken out as they arrive.
+
+    It can tell its position but not seek, so zipfile writes each entry's sizes
+    in a data descriptor after its data instead of going back to the header.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[ZipEntry]) -> Iterator[bytes]:
+    """
+    Build a ZIP archive on the fly, yielding its bytes as they are produced.
+
+    Files are read in READ_CHUNK_BYTES pieces and nothing is buffered beyond
+    the piece being compressed, so memory use does not grow with the size of
+    the entries (only the central directory, a small record per entry, is
+    kept until the end), and the first bytes go out as soon as the first
+    entry is available. Entries given as open files are closed once written.
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, source, modified in entries:
+            info = zipfile.ZipInfo(name, date_time=(modified or datetime.now()).timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED if name.endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+            if isinstance(source, bytes):
+                info.file_size = len(source)
+                with archive.open(info, "w") as entry:
+                    entry.write(source)
+            else:
+                # Opened before the entry is started, so an unreadable file fails without writing to it
+                source_file = open(source, "rb") if isinstance(source, str) else source
+                with source_file:
+                    info.file_size = os.fstat(source_file.fileno()).st_size  # lets zipfile decide on ZIP64 up front
+                    with archive.open(info, "w") as entry:
+                        while True:
+                            chunk = source_file.read(READ_CHUNK_BYTES)
+                            if not chunk:
+                                break
+                            entry.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def _archive_name(job: ProcessingJob, extension: str) -> str:
+    original = os.path.basename(job.document.original_filename.replace("\\", "/"))
+    stem = original.rsplit(".", 1)[0] or "document"
+    return f"{stem}_{job.id}.{extension}"
+
+
+def _open_export(db: Session, job: ProcessingJob, export_format: Optional[ExportFormat]) -> Optional[BinaryIO]:
+    if export_format is not None:
+        return open_job_export(job, export_format)
+    if job.output_path and os.path.exists(job.output_path):
+        return open(job.output_path, "rb")
+    if not job.markdown_content:
+        return None
+    # The export was evicted by the storage sweeper, rewrite it from the database
+    job.output_path = write_markdown_export(job.document, job, job.markdown_content)
+    db.commit()
+    status_cache.invalidate(job.id)
+    return open(job.output_path, "rb")
+
+
+def job_export_entries(
+    job_ids: List[int],
+    export_format: Optional[ExportFormat] = None,
+    session_factory: Callable[[], Session] = SessionLocal
+) -> Iterator[ZipEntry]:
+    """
+    Yield the archive entries of completed jobs, loading the jobs in batches.
+
+    Markdown exports are used as they are (rewritten if evicted); other formats
+    come from the export cache. Each export is opened before its entry is
+    yielded, so jobs whose export cannot be produced or read are listed in a
+    final MISSING.txt entry instead of cutting the archive short.
+
+    Args:
+        job_ids: Completed jobs to export, in archive order
+        export_format: Format of the entries, markdown if None
+        session_factory: Creates the session used while streaming, which
+            outlives the request's session
+    """
+    extension = export_format.value if export_format is not None else "md"
+    missing = []
+    db = session_factory()
+    try:
+        for start in range(0, len(job_ids), JOB_BATCH_SIZE):
+            batch = job_ids[start:start + JOB_BATCH_SIZE]
+            # The markdown is only loaded for the jobs whose export must be rewritten
+            jobs = {
+                job.id: job
+                for job in db.query(ProcessingJob).options(
+                    defer(ProcessingJob.markdown_content),
+                    selectinload(ProcessingJob.document)
+                ).filter(ProcessingJob.id.in_(batch))
+            }
+            for job_id in batch:
+                job = jobs.get(job_id)
+                try:
+                    # Opened here, so a file removed or unreadable since is listed as missing
+                    source = _open_export(db, job, export_format) if job else None
+                except Exception as e:
+                    logger.warning(f"Could not export job {job_id} for the archive: {e}")
+                    source = None
+                if source is None:
+                    missing.append(job_id)
+                    continue
+                yield _archive_name(job, extension), source, job.completed_at
+            db.expunge_all()
+    finally:
+        db.close()
+
+    if missing:
+        logger.warning(f"{len(missing)} jobs left out of the export archive")
+        listing = "".join(f"job {job_id}: export not available\n" for job_id in missing)
+        yield "MISSING.txt", listing.encode("utf-8"), None
@@ -0,0 +1,118 @@
+"""
+Pytest plugin that fails tests whose requests run more SQL than budgeted.
+
+Load it with ``-p app.testing.query_budget`` or ``pytest_plugins =
+["app.testing.query_budget"]`` in a conftest.py, as tests/conftest.py does. Requests made while the
+``query_budget`` fixture is active (through TestClient or a live server in
+the same process) are checked against ENDPOINT_BUDGETS and any budget set in
+the test; the test fails at teardown, listing the statements of each request
+over budget, so N+1 queries and extra commits show up in CI::
+
+    def test_document_jobs(client, query_budget):
+        query_budget.limit("POST /api/v1/ocr/process", queries=80, commits=8)  # a 40 page document
+        client.post("/api/v1/ocr/process", json={"document_id": 1})
+
+With ``--query-budgets`` every test checks ENDPOINT_BUDGETS.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from app.core import query_stats
+from app.core.config import settings
+from app.core.query_stats import QueryStats
+
+API = settings.API_V1_STR
+
+
+@dataclass(frozen=True)
+class Budget:
+    queries: Optional[int] = None
+    commits: Optional[int] = None
+
+
+# Endpoints by method and route path, measured with a cold status cache;
+# reads must not commit, and their query count must not grow with the number
+# of rows returned
+ENDPOINT_BUDGETS: Dict[str, Budget] = {
+    f"GET {API}/documents/": Budget(queries=1, commits=0),
+    f"GET {API}/documents/{{document_id}}": Budget(queries=1, commits=0),
+    f"GET {API}/jobs/{{job_id}}": Budget(queries=1, commits=0),
+    # job, document, and the count of stored pages while in progress
+    f"GET {API}/jobs/{{job_id}}/status": Budget(queries=3, commits=0),
+    f"GET {API}/jobs/{{job_id}}/pages": Budget(queries=2, commits=0),
+    f"GET {API}/jobs/document/{{document_id}}": Budget(queries=2, commits=0),
+    f"GET {API}/search/": Budget(queries=1, commits=0),
+    f"POST {API}/documents/upload": Budget(queries=2, commits=1),
+    f"POST {API}/ocr/process-async": Budget(queries=4, commits=1),
+    # A document of up to OCR_CHUNK_PAGES (16) pages, sent in one OCR request;
+    # each page is one INSERT, the rest does not grow with the page count
+    f"POST {API}/ocr/process": Budget(queries=40, commits=6),
+}
+
+
+class QueryBudget:
+    """Records the query stats of each request and checks them against the budgets."""
+
+    def __init__(self, budgets: Dict[str, Budget]):
+        self.budgets = dict(budgets)
+        self.requests: List[Tuple[str, QueryStats]] = []
+
+    def limit(self, endpoint: str, queries: Optional[int] = None, commits: Optional[int] = None) -> None:
+        """Set the budget of an endpoint ("METHOD /route/{param}") for this test."""
+        self.budgets[endpoint] = Budget(queries, commits)
+
+    def __call__(self, endpoint: str, stats: QueryStats) -> None:
+        self.requests.append((endpoint, stats))
+
+    def violations(self) -> List[str]:
+        found = []
+        for endpoint, stats in self.requests:
+            budget = self.budgets.get(endpoint)
+            if budget is None:
+                continue
+            over = []
+            if budget.queries is not None and stats.queries > budget.queries:
+                over.append(f"{stats.queries} queries (budget {budget.queries})")
+            if budget.commits is not None and stats.commits > budget.commits:
+                over.append(f"{stats.commits} commits (budget {budget.commits})")
+            if over:
+                statements = "".join(f"\n    {statement}" for statement in stats.statements or [])
+                found.append(f"{endpoint}: {', '.join(over)}{statements}")
+        return found
+
+    def check(self) -> None:
+        """Fail the test if any request so far was over budget."""
+        violations = self.violations()
+        self.requests.clear()
+        if violations:
+            pytest.fail("Query budget exceeded:\n" + "\n".join(violations), pytrace=False)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--query-budgets",
+        action="store_true",
+        help="check the requests of every test against ENDPOINT_BUDGETS"
+    )
+
+
+@pytest.fixture
+def query_budget():
+    budget = QueryBudget(ENDPOINT_BUDGETS)
+    previous = query_stats.record_statements
+    query_stats.record_statements = True
+    query_stats.add_observer(budget)
+    try:
+        yield budget
+    finally:
+        query_stats.remove_observer(budget)
+        query_stats.record_statements = previous
+    budget.check()
+
+
+@pytest.fixture(autouse=True)
+def _enforce_query_budgets(request):
+    if request.config.getoption("--query-budgets"):
+        request.getfixturevalue("query_budget")
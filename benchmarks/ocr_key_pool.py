@@ -0,0 +1,83 @@
+"""
+Benchmark the pooled OCR clients against fake backends with per-key rate limits.
+
+Every fake key answers 429 above ``--key-rate`` requests per second. The same
+workload runs from ``--concurrency`` threads through pools of 1 to ``--keys``
+keys, with the pool's token buckets set just under the key limit; with
+``--bad-key`` one key fails every request and should end up quarantined.
+Reports requests/sec, throttled calls and per key usage.
+
+    python benchmarks/ocr_key_pool.py --keys 4 --key-rate 5 --requests 200
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ocr_clients import FakeOCRClient, OCRClientPool  # noqa: E402
+
+
+def run(args, key_count):
+    clients = [
+        (f"key{index + 1}", FakeOCRClient(
+            latency=args.latency_ms / 1000,
+            requests_per_second=args.key_rate,
+            error_rate=1.0 if args.bad_key and index == key_count - 1 and key_count > 1 else 0.0,
+            seed=index
+        ))
+        for index in range(key_count)
+    ]
+    pool = OCRClientPool(
+        clients,
+        requests_per_second=args.key_rate * args.budget,
+        quarantine_seconds=args.quarantine,
+        max_failures=2,
+        acquire_timeout=120
+    )
+
+    def one_request(index):
+        for _ in range(args.retries):
+            try:
+                pool.ocr.process(model="fake", document={"type": "document_url", "document_url": "x"}, pages=[0])
+                return True
+            except Exception:
+                continue
+        return False
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        succeeded = sum(executor.map(one_request, range(args.requests)))
+    seconds = time.perf_counter() - started
+
+    usage = pool.usage()
+    throttled = sum(key["throttled"] for key in usage)
+    print(f"{key_count} key(s): {succeeded}/{args.requests} in {seconds:5.1f}s  "
+          f"{succeeded / seconds:6.1f} req/s  {throttled} throttled")
+    for key in usage:
+        print(f"    {key['name']}: {key['requests']} requests, {key['failures']} failures, "
+              f"{'healthy' if key['healthy'] else 'quarantined'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=4)
+    parser.add_argument("--key-rate", type=float, default=5.0, help="requests/sec each fake key accepts")
+    parser.add_argument("--budget", type=float, default=0.9, help="share of the key rate the pool's buckets allow")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--quarantine", type=float, default=5.0, help="seconds a failing key is left out")
+    parser.add_argument("--retries", type=int, default=5, help="attempts per request, as run_ocr retries")
+    parser.add_argument("--bad-key", action="store_true", help="make the last key fail every request")
+    args = parser.parse_args()
+
+    key_counts = sorted({1, args.keys} | ({2} if args.keys > 2 else set()))
+    for key_count in key_counts:
+        run(args, key_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark packing small PDFs into one OCR request in BatchPdfConv.
+
+Builds a directory of one and two page scanned PDFs and converts it with
+BatchPdfConv against a simulated OCR backend, once with one request per file
+and once with packing, reporting files/sec and requests made. Every simulated
+request costs ``--request-ms`` of overhead plus ``--page-ms`` per page, and
+``--bad-files`` corrupt PDFs check that a broken file only fails itself.
+
+    python benchmarks/pdf_packing.py --files 200 --request-ms 800
+"""
+import argparse
+import base64
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+
+import pymupdf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def build_small_pdf(path, pages, rng):
+    """Write a PDF of scan-like pages (a raster with dark text lines, no text layer)."""
+    doc = pymupdf.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        width, height = 620, 877
+        samples = bytearray(b"\xff" * (width * height))
+        for _ in range(20):
+            x, y = rng.randrange(0, width - 60), rng.randrange(0, height - 7)
+            for row in range(y, y + 7):
+                samples[row * width + x:row * width + x + 60] = bytes([rng.randrange(0, 80)]) * 60
+        page.insert_image(page.rect, pixmap=pymupdf.Pixmap(pymupdf.csGRAY, width, height, bytes(samples), False))
+    doc.save(path, garbage=4, deflate=True)
+    doc.close()
+
+
+class SimulatedOCR:
+    """Stands in for ``ocr_client.ocr``: returns one markdown page per page of the PDF sent."""
+
+    def __init__(self, request_ms, page_ms):
+        self.request_ms = request_ms
+        self.page_ms = page_ms
+        self.requests = 0
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    def process(self, model, document, include_image_base64=False, pages=None, **kwargs):
+        data = base64.b64decode(document["document_url"].split(",", 1)[1])
+        with pymupdf.open(stream=data, filetype="pdf") as pdf:
+            indices = pages if pages is not None else list(range(pdf.page_count))
+        with self._lock:
+            self.requests += 1
+            self.pages += len(indices)
+        time.sleep((self.request_ms + self.page_ms * len(indices)) / 1000)
+        return types.SimpleNamespace(pages=[
+            types.SimpleNamespace(index=index, markdown=f"page {index}") for index in indices
+        ])
+
+
+def run(batch, source_dir, work_dir, args, pack):
+    """Convert every PDF of ``source_dir`` from a fresh working directory."""
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+    shutil.copytree(source_dir, os.path.join(work_dir, batch.DOC_DIR))
+    os.chdir(work_dir)
+
+    backend = SimulatedOCR(args.request_ms, args.page_ms)
+    batch.ocr_client = types.SimpleNamespace(ocr=backend)
+    batch.PACK_SMALL_PDFS = pack
+    started = time.perf_counter()
+    batch.main()
+    seconds = time.perf_counter() - started
+
+    processed = batch.load_processed()
+    converted = sum(1 for record in processed.values() if record['status'] == 'success')
+    return converted, backend.requests, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100, help="number of small PDFs")
+    parser.add_argument("--bad-files", type=int, default=2, help="corrupt PDFs among them")
+    parser.add_argument("--request-ms", type=float, default=500, help="simulated overhead per OCR request")
+    parser.add_argument("--page-ms", type=float, default=20, help="simulated OCR time per page")
+    parser.add_argument("--interval", type=float, default=0.0,
+                        help="REQUEST_INTERVAL, the wait after each file or pack (3s in the script)")
+    parser.add_argument("--pack-pages", type=int, default=50, help="PACK_MAX_PAGES")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault("MISTRAL_API_KEY", "benchmark")
+    os.chdir(tmp)  # BatchPdfConv logs to a file in the working directory
+    import BatchPdfConv as batch
+
+    batch.UPLOAD_ONCE = False
+    batch.TEXT_LAYER_FAST_PATH = True
+    batch.REQUEST_INTERVAL = args.interval
+    batch.PACK_MAX_PAGES = args.pack_pages
+    batch.MAX_RETRIES = 2
+    batch.INITIAL_BACKOFF = 0
+
+    rng = random.Random(args.seed)
+    source_dir = os.path.join(tmp, "source")
+    os.makedirs(source_dir)
+    for index in range(args.files):
+        build_small_pdf(os.path.join(source_dir, f"doc_{index:05d}.pdf"), rng.choice((1, 1, 2)), rng)
+    for index in rng.sample(range(args.files), min(args.bad_files, args.files)):
+        with open(os.path.join(source_dir, f"doc_{index:05d}.pdf"), "wb") as bad:
+            bad.write(b"%PDF-1.7 truncated")
+
+    results = {}
+    stdout = sys.stdout
+    try:
+        for pack in (False, True):
+            sys.stdout = open(os.devnull, "w")
+            try:
+                results[pack] = run(batch, source_dir, os.path.join(tmp, f"run-{int(pack)}"), args, pack)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"files:       {args.files} ({args.bad_files} corrupt), request overhead {args.request_ms:.0f}ms")
+    for pack, (converted, requests, seconds) in results.items():
+        print(
+            f"{'packed' if pack else 'per file':11} {converted} converted in {seconds:6.1f}s  "
+            f"{converted / seconds:6.1f} files/s  {requests} OCR requests"
+        )
+    baseline, packed = results[False][2], results[True][2]
+    print(f"speedup:     {baseline / packed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
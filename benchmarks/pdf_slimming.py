@@ -0,0 +1,81 @@
+"""
+Benchmark pre-upload PDF slimming on synthetic high-DPI scans.
+
+Builds a scan-like PDF (grayscale JPEG pages at ``--scan-dpi``), runs the
+optimizer and estimates the upload time of the base64 data URL before and
+after at a given uplink bandwidth.
+
+    python benchmarks/pdf_slimming.py --pages 10 --scan-dpi 600 --max-dpi 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pymupdf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.pdf_optimizer import optimize_pdf  # noqa: E402
+
+A4_INCHES = (8.27, 11.69)
+
+
+def build_scan_pdf(path, pages, dpi, seed=0):
+    """Write a PDF of grayscale 'scanned' pages with paper noise and text lines."""
+    rng = random.Random(seed)
+    width, height = int(A4_INCHES[0] * dpi), int(A4_INCHES[1] * dpi)
+    # Map random bytes to light paper-grain values
+    paper = bytes(235 + b % 20 for b in range(256))
+    line_height, line_width = max(4, dpi // 12), width * 3 // 4
+    doc = pymupdf.open()
+    for _ in range(pages):
+        samples = bytearray(os.urandom(width * height).translate(paper))
+        for y in range(dpi, height - dpi, line_height * 2):
+            x = rng.randrange(dpi // 2, width - line_width - dpi // 2)
+            for row in range(y, y + line_height):
+                samples[row * width + x:row * width + x + line_width] = b"\x20" * line_width
+        pix = pymupdf.Pixmap(pymupdf.csGRAY, width, height, bytes(samples), False)
+        page = doc.new_page(width=A4_INCHES[0] * 72, height=A4_INCHES[1] * 72)
+        page.insert_image(page.rect, stream=pix.tobytes("jpeg", jpg_quality=92))
+    doc.save(path)
+    doc.close()
+
+
+def upload_seconds(size, bandwidth_mbps):
+    """Time to send a base64 data URL of a ``size`` byte file."""
+    return size * 4 / 3 * 8 / (bandwidth_mbps * 1_000_000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--scan-dpi", type=int, default=600)
+    parser.add_argument("--max-dpi", type=int, default=200)
+    parser.add_argument("--jpeg-quality", type=int, default=75)
+    parser.add_argument("--bandwidth-mbps", type=float, default=20.0, help="uplink bandwidth")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "scan.pdf")
+        dst = os.path.join(tmp, "scan_optimized.pdf")
+        build_scan_pdf(src, args.pages, args.scan_dpi)
+
+        started = time.perf_counter()
+        before, after = optimize_pdf(src, dst, max_dpi=args.max_dpi, jpeg_quality=args.jpeg_quality)
+        optimize_time = time.perf_counter() - started
+
+    upload_before = upload_seconds(before, args.bandwidth_mbps)
+    upload_after = upload_seconds(after, args.bandwidth_mbps)
+    print(f"pages:          {args.pages} at {args.scan_dpi} DPI -> {args.max_dpi} DPI")
+    print(f"size:           {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({after / before:.1%})")
+    print(f"optimize time:  {optimize_time:.2f}s")
+    print(f"upload time:    {upload_before:.2f}s -> {upload_after:.2f}s "
+          f"at {args.bandwidth_mbps:g} Mbit/s (base64 payload)")
+    print(f"net saving:     {upload_before - upload_after - optimize_time:.2f}s per document")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Simulate the OCR job queue under mixed load and compare scheduling policies.
+
+One bulk client submits ``--bulk-jobs`` large documents at once while
+``--interactive-clients`` clients submit single-page documents as a Poisson
+stream. Jobs take ``--seconds-per-page`` per page on ``--workers`` workers.
+The same arrivals are replayed through plain FIFO and through the scheduling
+policy (with and without shortest-job-first), reporting the queue wait of
+small jobs and the worst wait of the bulk client.
+
+    python benchmarks/scheduler_simulation.py --bulk-jobs 3000 --workers 4
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.scheduling_policy import QueuedJob, SchedulingPolicy  # noqa: E402
+
+
+class FifoPolicy:
+    """Arrival order, as with the previous background task queue."""
+
+    def __init__(self):
+        self._queue = deque()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def push(self, job):
+        self._queue.append(job)
+
+    def pop(self, now):
+        return self._queue.popleft() if self._queue else None
+
+    def finish(self, job, service_seconds, now):
+        pass
+
+
+def generate_arrivals(args, rng):
+    jobs = []
+    job_id = 0
+    for _ in range(args.bulk_jobs):
+        job_id += 1
+        pages = rng.randint(args.bulk_min_pages, args.bulk_max_pages)
+        jobs.append(QueuedJob(job_id, job_id, "bulk", size=pages, enqueued_at=0.0))
+
+    rate = args.small_jobs_per_minute / 60
+    now = 0.0
+    while True:
+        now += rng.expovariate(rate)
+        if now > args.duration:
+            break
+        job_id += 1
+        client = f"interactive-{rng.randrange(args.interactive_clients)}"
+        jobs.append(QueuedJob(job_id, job_id, client, size=rng.randint(1, 3), enqueued_at=now))
+    return jobs
+
+
+def simulate(policy, arrivals, workers, seconds_per_page):
+    """Replay arrivals through a policy and return each job's queue wait."""
+    events = [(job.enqueued_at, 0, job.job_id, job) for job in arrivals]  # 0 = arrival
+    heapq.heapify(events)
+    idle = workers
+    waits = {}
+
+    while events:
+        now, kind, _, job = heapq.heappop(events)
+        if kind == 0:
+            policy.push(QueuedJob(job.job_id, job.document_id, job.client_id, job.priority, job.size, job.enqueued_at))
+        else:
+            policy.finish(job, job.size * seconds_per_page, now)
+            idle += 1
+
+        # Start as many queued jobs as there are idle workers
+        while idle and len(policy):
+            started = policy.pop(now)
+            waits[started.job_id] = now - started.enqueued_at
+            idle -= 1
+            heapq.heappush(events, (now + started.size * seconds_per_page, 1, started.job_id, started))
+    return waits
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bulk-jobs", type=int, default=3000)
+    parser.add_argument("--bulk-min-pages", type=int, default=20)
+    parser.add_argument("--bulk-max-pages", type=int, default=200)
+    parser.add_argument("--interactive-clients", type=int, default=20)
+    parser.add_argument("--small-jobs-per-minute", type=float, default=30)
+    parser.add_argument("--duration", type=float, default=3600, help="seconds of interactive arrivals")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds-per-page", type=float, default=0.5)
+    parser.add_argument("--aging-per-minute", type=float, default=0.1)
+    parser.add_argument("--fair-share-weight", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    arrivals = generate_arrivals(args, random.Random(args.seed))
+    small = {job.job_id for job in arrivals if job.client_id != "bulk"}
+    print(f"{args.bulk_jobs} bulk jobs, {len(small)} small jobs, {args.workers} workers")
+
+    policies = {
+        "fifo": FifoPolicy,
+        "fair-share": lambda: SchedulingPolicy(args.aging_per_minute, args.fair_share_weight),
+        "fair-share+sjf": lambda: SchedulingPolicy(
+            args.aging_per_minute, args.fair_share_weight, shortest_job_first=True
+        ),
+    }
+    print(f"{'policy':16} {'small p50':>11} {'small p95':>11} {'small max':>11} {'bulk max':>11}")
+    for name, factory in policies.items():
+        waits = simulate(factory(), arrivals, args.workers, args.seconds_per_page)
+        small_waits = [wait for job_id, wait in waits.items() if job_id in small]
+        bulk_waits = [wait for job_id, wait in waits.items() if job_id not in small]
+        print(
+            f"{name:16} {statistics.median(small_waits):10.1f}s {percentile(small_waits, 0.95):10.1f}s "
+            f"{max(small_waits):10.1f}s {max(bulk_waits):10.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark indexing throughput and query latency of the full-text search index.
+
+Indexes ``--pages`` synthetic Arabic pages (with tashkeel, tatweel and mixed
+alef/hamza spellings) into a fresh SQLite database, or the database given by
+``--database-url``, then reports query latency percentiles.
+
+    python benchmarks/search_latency.py --pages 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_index import ensure_search_index, index_document_pages, search_pages  # noqa: E402
+
+VOCABULARY = [
+    "الكِتَابُ", "مَكْتَبَة", "مكتبه", "أحمد", "احمد", "إسلام", "آداب", "القاهرة", "القاهره",
+    "تاريــخ", "الدولة", "العباسية", "مُؤَسَّسَة", "مسألة", "شاطئ", "الفقه", "اللغة", "العربية",
+    "الشعر", "النحو", "الصرف", "البلاغة", "مخطوطة", "الوثائق", "السجلات", "المحكمة", "الوقف",
+    "الحديث", "التفسير", "الرحلة", "الجغرافيا", "الطب", "الفلك", "الرياضيات", "الفلسفة",
+]
+QUERIES = ["مكتبة", "القاهرة احمد", "تاريخ الدولة العباسية", "مؤسسة", "اسلام", "مخطوطه الوقف", "شاطئ"]
+
+
+def synthetic_page(rng, words=250):
+    extra = [f"كلمة{rng.randrange(5000)}" for _ in range(words // 5)]
+    return " ".join(rng.choices(VOCABULARY, k=words - len(extra)) + extra)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100_000)
+    parser.add_argument("--pages-per-document", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200, help="queries to time")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'search.db')}"
+        engine = create_engine(url)
+        ensure_search_index(engine)
+        db = sessionmaker(bind=engine)()
+        db.execute(text("DELETE FROM search_pages"))
+        db.commit()
+
+        started = time.perf_counter()
+        document_id = 0
+        for first in range(0, args.pages, args.pages_per_document):
+            document_id += 1
+            count = min(args.pages_per_document, args.pages - first)
+            index_document_pages(db, document_id, document_id, ((i, synthetic_page(rng)) for i in range(count)))
+        index_seconds = time.perf_counter() - started
+
+        latencies = []
+        hits = 0
+        for i in range(args.queries):
+            started = time.perf_counter()
+            hits += len(search_pages(db, QUERIES[i % len(QUERIES)], limit=20))
+            latencies.append((time.perf_counter() - started) * 1000)
+        db.close()
+        engine.dispose()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]  # noqa: E731
+    print(f"indexed:  {args.pages} pages in {index_seconds:.1f}s ({args.pages / index_seconds:.0f} pages/s)")
+    print(f"queries:  {args.queries} ({hits / args.queries:.1f} hits/query)")
+    print(f"latency:  p50 {pct(50):.1f} ms, p95 {pct(95):.1f} ms, p99 {pct(99):.1f} ms, "
+          f"mean {statistics.mean(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark the database load of clients polling job status, with and without
+the status cache.
+
+``--clients`` pollers each call ``GET /jobs/{id}/status`` and ``GET /jobs/{id}``
+for a job every ``--interval`` seconds, while a simulated worker moves the jobs
+through their states the way ``process_ocr`` does (processing, a page
+checkpoint every ``--checkpoint-every`` seconds, completed) and invalidates the
+cache after each commit. The same polling rate runs against each backend and
+the SQL statements the API issues are counted.
+
+Runs against a throwaway SQLite database in a temporary directory.
+
+    python benchmarks/status_polling.py --clients 50 --interval 0.2 --seconds 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+WORK_DIR = tempfile.mkdtemp(prefix="status-polling-")
+os.chdir(WORK_DIR)  # keeps the repo .env, uploads and exports out of the run
+os.environ.setdefault("MISTRAL_API_KEY", "benchmark")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+os.environ["STORAGE_SWEEPER_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.document import Document, DocumentStatus  # noqa: E402
+from app.models.ocr_page import OCRPage, PageSource  # noqa: E402
+from app.models.processing_job import JobStatus, ProcessingJob  # noqa: E402
+from app.services.status_cache import FileBackend, MemoryBackend, status_cache  # noqa: E402
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        self.enabled = False
+
+    def __call__(self, *args):
+        if self.enabled:
+            with self._lock:
+                self.count += 1
+
+
+def create_jobs(count, pages):
+    db = SessionLocal()
+    job_ids = []
+    for n in range(count):
+        document = Document(
+            filename=f"doc{n}.pdf", original_filename=f"doc{n}.pdf", file_path=f"doc{n}.pdf",
+            file_size=1, status=DocumentStatus.UPLOADED, page_count=pages
+        )
+        db.add(document)
+        db.flush()
+        job = ProcessingJob(document_id=document.id, status=JobStatus.PENDING)
+        db.add(job)
+        db.flush()
+        job_ids.append(job.id)
+    db.commit()
+    db.close()
+    return job_ids
+
+
+def simulate_worker(job_ids, pages, checkpoint_every, stop):
+    """Move every job through its states, invalidating after each commit like process_ocr."""
+    db = SessionLocal()
+    jobs = [db.get(ProcessingJob, job_id) for job_id in job_ids]
+    for job in jobs:
+        job.status = JobStatus.PROCESSING
+    db.commit()
+    for job in jobs:
+        status_cache.invalidate(job.id)
+
+    page = 0
+    while not stop.wait(checkpoint_every) and page < pages:
+        for job in jobs:
+            db.add(OCRPage(job_id=job.id, page_index=page, markdown=f"page {page}", source=PageSource.OCR))
+            if page == pages - 1:
+                job.status = JobStatus.COMPLETED
+                job.markdown_content = "done"
+        db.commit()
+        for job in jobs:
+            status_cache.invalidate(job.id)
+        page += 1
+    db.close()
+
+
+def run(args, name, backend, counter):
+    status_cache.backend = backend
+    job_ids = create_jobs(args.jobs, args.pages)
+    client = TestClient(app)
+    stop = threading.Event()
+    polls = [0] * args.clients
+
+    def poller(n):
+        job_id = job_ids[n % len(job_ids)]
+        next_poll = time.perf_counter()
+        while not stop.is_set():
+            client.get(f"/api/v1/jobs/{job_id}/status")
+            client.get(f"/api/v1/jobs/{job_id}")
+            polls[n] += 1
+            next_poll += args.interval
+            time.sleep(max(0.0, next_poll - time.perf_counter()))
+
+    counter.count = 0
+    counter.enabled = True
+    worker = threading.Thread(
+        target=simulate_worker, args=(job_ids, args.pages, args.checkpoint_every, stop), daemon=True
+    )
+    started = time.perf_counter()
+    worker.start()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        for n in range(args.clients):
+            pool.submit(poller, n)
+        time.sleep(args.seconds)
+        stop.set()
+    elapsed = time.perf_counter() - started
+    worker.join()
+    counter.enabled = False
+
+    requests = sum(polls) * 2
+    print(
+        f"{name:7} {requests / elapsed:8.1f} req/s  {counter.count / elapsed:8.1f} queries/s  "
+        f"{counter.count / max(requests, 1):5.2f} queries/request"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between polls per client")
+    parser.add_argument("--checkpoint-every", type=float, default=0.5)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--ttl", type=float, default=2.0)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    status_cache.ttl = args.ttl
+
+    run(args, "none", None, counter)
+    run(args, "memory", MemoryBackend(), counter)
+    run(args, "file", FileBackend(os.path.join(WORK_DIR, "status_cache")), counter)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark the embedded text layer fast path on mixed documents.
+
+Builds synthetic PDFs that mix born-digital pages with image-only (scanned)
+pages, runs the local pre-pass and compares the estimated end-to-end time of
+OCR-ing every page against OCR-ing only the pages without a usable text layer.
+
+    python benchmarks/text_layer_fast_path.py --pages 200 --text-ratio 0.5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pymupdf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.text_layer import analyze_text_layer  # noqa: E402
+
+SAMPLE_TEXT = (
+    "Mistral OCR converts scanned Arabic books into editable markdown. "
+    "Born-digital reports already carry a text layer that can be extracted "
+    "locally without a round trip to the OCR API. "
+)
+
+
+def build_mixed_pdf(path, pages, text_ratio, seed=0):
+    """Write a PDF where roughly ``text_ratio`` of the pages carry real text."""
+    rng = random.Random(seed)
+    expected_text = set()
+    doc = pymupdf.open()
+    for index in range(pages):
+        page = doc.new_page()
+        if rng.random() < text_ratio:
+            page.insert_textbox(page.rect + (50, 50, -50, -50), SAMPLE_TEXT * 8, fontsize=11)
+            expected_text.add(index)
+        else:
+            # A grayscale raster covering the page with dark "text lines", like a 150 DPI scan
+            width, height = 1240, 1754
+            samples = bytearray(b"\xff" * (width * height))
+            for _ in range(40):
+                x, y = rng.randrange(0, width - 120), rng.randrange(0, height - 14)
+                shade = bytes([rng.randrange(0, 80)]) * 120
+                for row in range(y, y + 14):
+                    samples[row * width + x:row * width + x + 120] = shade
+            pix = pymupdf.Pixmap(pymupdf.csGRAY, width, height, bytes(samples), False)
+            page.insert_image(page.rect, pixmap=pix)
+    doc.save(path, garbage=4, deflate=True)
+    doc.close()
+    return expected_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100, help="pages per document")
+    parser.add_argument("--documents", type=int, default=5, help="number of documents")
+    parser.add_argument("--text-ratio", type=float, default=0.5, help="share of born-digital pages")
+    parser.add_argument("--ocr-seconds-per-page", type=float, default=0.4,
+                        help="assumed OCR latency per page for the estimate")
+    args = parser.parse_args()
+
+    total_pages = total_text = misclassified = 0
+    prepass_seconds = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        for doc_index in range(args.documents):
+            path = os.path.join(tmp, f"mixed_{doc_index}.pdf")
+            expected = build_mixed_pdf(path, args.pages, args.text_ratio, seed=doc_index)
+
+            started = time.perf_counter()
+            pages = analyze_text_layer(path)
+            prepass_seconds += time.perf_counter() - started
+
+            detected = {page.index for page in pages if page.usable}
+            misclassified += len(detected ^ expected)
+            total_pages += len(pages)
+            total_text += len(detected)
+
+    ocr_pages = total_pages - total_text
+    baseline = total_pages * args.ocr_seconds_per_page
+    fast_path = prepass_seconds + ocr_pages * args.ocr_seconds_per_page
+
+    print(f"documents:            {args.documents} x {args.pages} pages")
+    print(f"text layer pages:     {total_text}/{total_pages} ({misclassified} misclassified)")
+    print(f"pre-pass:             {prepass_seconds:.3f}s "
+          f"({prepass_seconds / total_pages * 1000:.2f} ms/page)")
+    print(f"pages sent to OCR:    {ocr_pages} (baseline {total_pages})")
+    print(f"estimated total time: {fast_path:.1f}s vs {baseline:.1f}s baseline "
+          f"({baseline / fast_path if fast_path else float('inf'):.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
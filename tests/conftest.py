@@ -0,0 +1,52 @@
+"""
+Test settings: the suite runs in a scratch directory, so the default relative
+database and storage paths (and no .env file) apply there, against the local
+fake OCR backend, without API keys or network.
+"""
+import os
+import tempfile
+
+os.chdir(tempfile.mkdtemp(prefix="mistral-ocr-tests-"))
+os.environ.update({
+    "MISTRAL_API_KEY": "test",
+    "OCR_BACKEND": "fake",
+    "FAKE_OCR_LATENCY_SECONDS": "0",
+    "OCR_FILE_STORE": "inline",
+    "SQLALCHEMY_DATABASE_URI": "sqlite:///./test.db",
+    "STORAGE_SWEEPER_ENABLED": "false",
+    "SCHEDULER_POLL_SECONDS": "0",
+    "CPU_POOL_WORKERS": "0",
+})
+
+import pymupdf  # noqa: E402
+import pytest  # noqa: E402
+
+pytest_plugins = ["app.testing.query_budget"]
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def completed_job(client, tmp_path):
+    """Factory of documents OCR'd through the API; returns the job of each as JSON."""
+
+    def create(name="document.pdf", pages=1):
+        path = tmp_path / name
+        pdf = pymupdf.open()
+        for _ in range(pages):
+            pdf.new_page()
+        pdf.save(str(path))
+        pdf.close()
+        with open(path, "rb") as upload:
+            document = client.post("/api/v1/documents/upload", files={"file": (name, upload, "application/pdf")}).json()
+        assert client.post("/api/v1/ocr/process", json={"document_id": document["id"]}).status_code == 200
+        return client.get(f"/api/v1/jobs/document/{document['id']}").json()[0]
+
+    return create
@@ -0,0 +1,51 @@
+import pymupdf
+
+from app.services.admission import admission
+from app.services.scheduler import JobScheduler, job_scheduler
+
+API = "/api/v1"
+
+
+def _document(client, tmp_path):
+    path = tmp_path / "document.pdf"
+    pdf = pymupdf.open()
+    pdf.new_page()
+    pdf.save(str(path))
+    pdf.close()
+    with open(path, "rb") as upload:
+        return client.post(f"{API}/documents/upload", files={"file": ("document.pdf", upload, "application/pdf")}).json()
+
+
+def test_sync_ocr_is_refused_while_every_slot_is_taken(client, tmp_path, monkeypatch):
+    document = _document(client, tmp_path)
+    monkeypatch.setattr(admission, "max_sync", 1)
+    monkeypatch.setattr(admission, "mean_sync_seconds", 20.0)
+
+    with admission.sync_ocr_slot():
+        response = client.post(f"{API}/ocr/process", json={"document_id": document["id"]})
+        assert response.status_code == 503
+        assert 1 <= int(response.headers["Retry-After"]) <= 20
+        ready = client.get("/ready")
+        assert ready.status_code == 503
+        assert ready.json()["ready"] is False and ready.json()["sync_ocr_in_flight"] == 1
+
+    assert client.get("/ready").status_code == 200
+    assert client.post(f"{API}/ocr/process", json={"document_id": document["id"]}).status_code == 200
+
+
+def test_async_jobs_are_refused_once_the_queue_is_full(client, tmp_path, monkeypatch):
+    document = _document(client, tmp_path)
+    monkeypatch.setattr(admission, "max_pending", 2)
+    monkeypatch.setattr(JobScheduler, "queue_depth", property(lambda self: 3))
+    monkeypatch.setattr(job_scheduler, "mean_service_seconds", 10.0)
+    monkeypatch.setattr(job_scheduler, "workers", 2)
+
+    response = client.post(f"{API}/ocr/process-async", json={"document_id": document["id"]})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "10"  # 2 jobs over the limit, 10s each, 2 workers
+    ready = client.get("/ready")
+    assert ready.status_code == 503
+    assert ready.headers["Retry-After"] == "10" and ready.json()["pending_jobs"] == 3
+
+    monkeypatch.setattr(JobScheduler, "queue_depth", property(lambda self: 1))
+    assert client.get("/ready").status_code == 200
@@ -0,0 +1,64 @@
+import json
+import os
+import time
+
+import pytest
+
+import BatchPdfConv
+
+
+@pytest.fixture
+def claims(tmp_path, monkeypatch):
+    monkeypatch.setattr(BatchPdfConv, "CLAIM_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _stale_claim(pdf, node_id):
+    path = BatchPdfConv._claim_path(pdf, "claim")
+    with open(path, "w", encoding="utf-8") as claim:
+        json.dump({"node": node_id}, claim)
+    old = time.time() - 2 * BatchPdfConv.CLAIM_TTL
+    os.utime(path, (old, old))
+    return path
+
+
+def _holder(path):
+    with open(path, encoding="utf-8") as claim:
+        return json.load(claim)["node"]
+
+
+def test_live_claim_is_not_taken(claims):
+    assert BatchPdfConv.try_claim("a.pdf", "node-a")
+    assert not BatchPdfConv.try_claim("a.pdf", "node-b")
+    assert _holder(BatchPdfConv._claim_path("a.pdf", "claim")) == "node-a"
+
+
+def test_late_takeover_does_not_steal_the_new_claim(claims):
+    path = _stale_claim("a.pdf", "dead")
+    seen_by_b = os.stat(path)  # node B finds the claim stale, then stalls
+
+    assert BatchPdfConv.try_claim("a.pdf", "node-a")
+    assert not BatchPdfConv._take_over(path, "node-b", seen_by_b)
+    assert _holder(path) == "node-a"
+
+
+def test_claim_taken_by_mistake_is_put_back(claims):
+    path = _stale_claim("a.pdf", "dead")
+    seen_by_b = os.stat(path)
+    assert BatchPdfConv.try_claim("a.pdf", "node-a")
+    # Node A's claim reused the inode: the takeover lock no longer tells them apart
+    fresh = os.stat(path)
+    stale = os.stat_result((fresh.st_mode, fresh.st_ino) + tuple(seen_by_b)[2:])
+    for lock in claims.glob("*.takeover-*"):
+        lock.unlink()
+
+    assert not BatchPdfConv._take_over(path, "node-b", stale)
+    assert _holder(path) == "node-a"
+
+
+def test_release_drops_takeover_locks(claims):
+    _stale_claim("a.pdf", "dead")
+    assert BatchPdfConv.try_claim("a.pdf", "node-a")
+    BatchPdfConv.release_claim("a.pdf", done=True)
+    assert BatchPdfConv.is_done("a.pdf")
+    assert not list(claims.glob("*.takeover-*"))
@@ -0,0 +1,100 @@
+import os
+import types
+
+import pymupdf
+import pytest
+
+import BatchPdfConv
+from app.services.ocr_clients import FakeOCRClient, OCRClientPool
+from app.services.raw_archive import read_records
+
+
+class RecordingOCRClient(FakeOCRClient):
+    """Fake OCR client that records the pages of every request."""
+
+    def __init__(self):
+        super().__init__(latency=0)
+        self.requests = []
+
+    def process(self, model, document, pages=None, **kwargs):
+        self.requests.append(pages)
+        return super().process(model, document, pages, **kwargs)
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    """BatchPdfConv working under tmp_path, with a recording fake OCR client."""
+    doc_dir, export_dir = tmp_path / "docs", tmp_path / "exports"
+    doc_dir.mkdir()
+    ocr = RecordingOCRClient()
+    for name, value in {
+        "DOC_DIR": str(doc_dir), "EXPORT_DIR": str(export_dir), "DB_CSV": str(tmp_path / "db.csv"),
+        "CHECKPOINT_DIR": str(export_dir / ".checkpoints"), "RAW_DIR": str(export_dir / ".raw"),
+        "API_KEYS": ["a"], "ocr_client": OCRClientPool([("a", ocr)]), "REQUEST_INTERVAL": 0,
+        "UPLOAD_ONCE": False, "TEXT_LAYER_FAST_PATH": False, "PAGE_PRUNING": False,
+    }.items():
+        monkeypatch.setattr(BatchPdfConv, name, value)
+    ocr.doc_dir = doc_dir
+    return ocr
+
+
+def _pdf(path, pages):
+    pdf = pymupdf.open()
+    for number in range(pages):
+        pdf.new_page().insert_text((72, 72), f"page {number + 1}")
+    pdf.save(str(path))
+    pdf.close()
+
+
+def test_resume_sends_only_missing_pages_without_the_text_layer_pass(batch, monkeypatch):
+    monkeypatch.setattr(BatchPdfConv, "OCR_CHUNK_PAGES", 2)
+    _pdf(batch.doc_dir / "scan.pdf", 5)
+    BatchPdfConv.save_checkpoint("scan.pdf", [
+        {"index": index, "source": "ocr", "markdown": f"stored {index}", "attempt": 1, "seconds": 0}
+        for index in (0, 1)
+    ])
+
+    BatchPdfConv.convert_pdf_to_markdown("scan.pdf")
+
+    assert batch.requests == [[2, 3], [4]]
+
+
+def test_small_pdfs_are_packed_within_the_page_budget(batch, monkeypatch):
+    monkeypatch.setattr(BatchPdfConv, "PACK_MAX_PAGES", 3)
+    for name, pages in (("a.pdf", 1), ("b.pdf", 2), ("big.pdf", 3), ("c.pdf", 1)):
+        _pdf(batch.doc_dir / name, pages)
+
+    packs, singles = BatchPdfConv.plan_packs(["a.pdf", "b.pdf", "big.pdf", "c.pdf"])
+
+    assert packs == [[("a.pdf", 1), ("b.pdf", 2)]]
+    assert singles == ["big.pdf", "c.pdf"]  # too many pages; alone in its pack
+
+
+def test_pack_results_are_split_back_at_file_boundaries(batch, monkeypatch):
+    monkeypatch.setattr(BatchPdfConv, "OUTPUT_FORMAT", "md")
+    for name, pages in (("a.pdf", 1), ("b.pdf", 2), ("c.pdf", 1)):
+        _pdf(batch.doc_dir / name, pages)
+
+    assert BatchPdfConv.convert_pack([("a.pdf", 1), ("b.pdf", 2), ("c.pdf", 1)]) == []
+
+    assert batch.requests == [None]  # one request for the combined document
+    with open(os.path.join(BatchPdfConv.EXPORT_DIR, "b.md"), encoding="utf-8") as md_file:
+        assert md_file.read() == "## Page 1\n\nPage 2 (mistral-ocr-latest)\n\n## Page 2\n\nPage 3 (mistral-ocr-latest)\n\n"
+    archived = read_records(BatchPdfConv.raw_archive_path("c.pdf"))
+    assert {index: record["page"]["markdown"] for index, record in archived.items()} == {
+        0: "Page 4 (mistral-ocr-latest)"
+    }
+
+
+def test_files_with_pages_missing_from_the_pack_response_are_converted_alone(batch, monkeypatch):
+    monkeypatch.setattr(BatchPdfConv, "OUTPUT_FORMAT", "md")
+    for name, pages in (("a.pdf", 1), ("b.pdf", 2)):
+        _pdf(batch.doc_dir / name, pages)
+    process = batch.process
+    monkeypatch.setattr(batch, "process", lambda *args, **kwargs: types.SimpleNamespace(
+        pages=process(*args, **kwargs).pages[:-1]
+    ))
+
+    assert BatchPdfConv.convert_pack([("a.pdf", 1), ("b.pdf", 2)]) == ["b.pdf"]
+    assert os.path.exists(os.path.join(BatchPdfConv.EXPORT_DIR, "a.md"))
+    assert not os.path.exists(os.path.join(BatchPdfConv.EXPORT_DIR, "b.md"))
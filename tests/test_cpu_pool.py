@@ -0,0 +1,54 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.services.cpu_pool import CPUPool
+
+
+def _slow_square(value):
+    time.sleep(0.3)
+    return value * value
+
+
+def _crash(marker=None):
+    """Kill the worker, only the first time if ``marker`` is a path."""
+    if marker is None or not os.path.exists(marker):
+        if marker is not None:
+            open(marker, "w").close()
+        os._exit(1)
+    return "recovered"
+
+
+def _square_or_crash(item):
+    return _slow_square(item) if isinstance(item, int) else _crash(item)
+
+
+@pytest.fixture
+def pool():
+    cpu_pool = CPUPool(2)
+    cpu_pool.start()
+    yield cpu_pool
+    cpu_pool.stop()
+
+
+def test_tasks_beside_a_dead_worker_are_run_again(pool, tmp_path):
+    results = {}
+    slow = threading.Thread(target=lambda: results.setdefault("slow", pool.run(_slow_square, 7)))
+    slow.start()
+    time.sleep(0.1)
+    assert pool.run(_crash, str(tmp_path / "crashed")) == "recovered"
+    slow.join()
+    assert results["slow"] == 49
+
+    with pytest.raises(RuntimeError, match="_crash"):
+        pool.run(_crash)
+    assert pool.run(_slow_square, 3) == 9
+
+
+def test_map_resubmits_interrupted_items_once(pool, tmp_path):
+    marker = str(tmp_path / "crashed")
+    assert pool.map(_square_or_crash, [2, marker, 3]) == [4, "recovered", 9]
+    with pytest.raises(RuntimeError, match="_square_or_crash"):
+        pool.map(_square_or_crash, [2, None])
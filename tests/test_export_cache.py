@@ -0,0 +1,36 @@
+import os
+
+from app.db.session import SessionLocal
+from app.models.processing_job import ProcessingJob
+from app.services.export_cache import ExportCache, export_cache
+from app.services.export_renderer import ExportFormat
+from app.services.rerender import rerender_jobs
+
+API = "/api/v1"
+
+
+def test_an_open_export_outlives_its_eviction(tmp_path):
+    cache = ExportCache(str(tmp_path), max_bytes=0)
+    cache.put(1, 1, ExportFormat.TXT, b"first").close()
+
+    cached = cache.get(1, 1, ExportFormat.TXT)
+    cache.put(2, 1, ExportFormat.TXT, b"second").close()  # evicts job 1's export
+    with cached:
+        assert not os.path.exists(os.path.join(tmp_path, "job-1-1.txt"))
+        assert cached.read() == b"first"
+    assert cache.get(1, 1, ExportFormat.TXT) is None
+
+
+def test_a_rerender_gets_a_new_export_revision(client, completed_job):
+    job = completed_job("annual report.pdf")
+    response = client.get(f"{API}/jobs/{job['id']}/export", params={"format": "txt"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == "attachment; filename*=utf-8''annual%20report_ocr.txt"
+    assert int(response.headers["content-length"]) == len(response.content) > 0
+
+    with SessionLocal() as db:
+        revision = db.get(ProcessingJob, job["id"]).export_revision
+        assert rerender_jobs(db, [job["id"]], formats=[ExportFormat.TXT]).jobs == 1
+        assert db.get(ProcessingJob, job["id"]).export_revision == revision + 1
+    cached = [name for name in os.listdir(export_cache.directory) if name.startswith(f"job-{job['id']}-")]
+    assert cached == [f"job-{job['id']}-{revision + 1}.txt"]
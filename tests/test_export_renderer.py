@@ -0,0 +1,18 @@
+from app.services.export_renderer import render_html
+
+
+def _html(markdown):
+    return render_html([(0, markdown)], "t").decode("utf-8")
+
+
+def test_link_urls_are_escaped_once():
+    out = _html("[site](https://example.com/?a=1&b=2) ![a & b](img-0.jpeg)")
+    assert '<a href="https://example.com/?a=1&amp;b=2">site</a>' in out
+    assert '<img alt="a &amp; b" src="img-0.jpeg">' in out
+    assert "&amp;amp;" not in out
+
+
+def test_script_urls_are_not_linked():
+    out = _html("[click](javascript:alert(1)) [tab](java\tscript:x) ![pic](data:text/html;base64,AA)")
+    assert "<a " not in out and "<img " not in out
+    assert "click" in out and "pic" in out
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from app.services.hedging import HedgeBudget, HedgedCaller, LatencyTracker
+
+
+def _fast_history(samples=500):
+    tracker = LatencyTracker(window=1000, min_samples=20)
+    for _ in range(samples):
+        tracker.record(0.001)
+    return tracker
+
+
+def test_latency_is_tracked_per_page_once_there_are_enough_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record(4.0, pages=4)
+    tracker.record(1.0)
+    assert tracker.percentile(50) is None
+    tracker.record(30.0, pages=10)
+    assert tracker.percentile(50) == 1.0
+    assert tracker.percentile(99) == 3.0
+
+
+def test_budget_allows_one_hedge_per_earned_token():
+    budget = HedgeBudget(ratio=0.25, burst=1)
+    assert budget.spend() and not budget.spend()
+    for _ in range(3):
+        budget.earn()
+    assert not budget.spend()
+    budget.earn()
+    assert budget.spend()
+
+
+def test_hedges_stay_within_budget_when_every_call_is_slow():
+    caller = HedgedCaller(budget=HedgeBudget(ratio=0.25, burst=1), tracker=_fast_history(), min_delay=0.01)
+    try:
+        for _ in range(12):
+            assert caller.call(lambda: time.sleep(0.05) or "ok") == "ok"
+    finally:
+        caller.shutdown()
+    # The burst token, then one per four calls: calls 1, 5 and 9
+    assert caller.calls == 12 and caller.hedges == 3
+
+
+def test_a_stuck_call_is_won_by_its_hedge():
+    release = threading.Event()
+    attempts = []
+
+    def call():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            release.wait(5)
+            return "primary"
+        return "hedge"
+
+    caller = HedgedCaller(tracker=_fast_history(), min_delay=0.01)
+    try:
+        assert caller.call(call) == "hedge"
+    finally:
+        release.set()
+        caller.shutdown()
+    assert caller.hedges == 1 and caller.hedge_wins == 1
+
+
+def test_the_error_is_raised_only_once_every_attempt_failed():
+    def call():
+        time.sleep(0.05)
+        raise RuntimeError("down")
+
+    caller = HedgedCaller(tracker=_fast_history(), min_delay=0.01)
+    try:
+        with pytest.raises(RuntimeError, match="down"):
+            caller.call(call)
+    finally:
+        caller.shutdown()
+    assert caller.hedges == 1
@@ -0,0 +1,72 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+from app.services.idempotency import REPLAY_HEADER, begin
+
+API = "/api/v1"
+
+
+def test_retry_replays_the_first_response(client, completed_job):
+    document_id = completed_job()["document_id"]
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    first = client.post(f"{API}/ocr/process-async", json={"document_id": document_id}, headers=headers)
+    retry = client.post(f"{API}/ocr/process-async", json={"document_id": document_id}, headers=headers)
+    assert first.status_code == retry.status_code == 202
+    assert retry.json()["job_id"] == first.json()["job_id"]
+    assert retry.headers[REPLAY_HEADER] == "true" and REPLAY_HEADER not in first.headers
+
+    other = client.post(f"{API}/ocr/process-async", json={"document_id": document_id, "priority": 5}, headers=headers)
+    assert other.status_code == 422
+
+
+def test_duplicate_waits_for_the_first_request_without_blocking(client):
+    key = str(uuid.uuid4())
+
+    async def scenario():
+        first_db, duplicate_db = SessionLocal(), SessionLocal()
+        try:
+            first = await begin(first_db, "test", key, "fp")
+            assert first.record is not None
+            ticks = 0
+
+            async def finish_first():
+                nonlocal ticks
+                for _ in range(30):
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+                await run_in_threadpool(first.complete, 201, {"id": 7})
+
+            duplicate, _ = await asyncio.gather(begin(duplicate_db, "test", key, "fp"), finish_first())
+            return duplicate, ticks
+        finally:
+            first_db.close()
+            duplicate_db.close()
+
+    duplicate, ticks = asyncio.run(scenario())
+    assert ticks == 30
+    assert duplicate.replay.status_code == 201 and duplicate.replay.body == b'{"id":7}'
+
+
+def test_abandoned_claim_is_taken_over(client):
+    key = str(uuid.uuid4())
+    long_ago = datetime.utcnow() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS + 1)
+    with SessionLocal() as db:
+        db.add(IdempotencyKey(
+            scope="test", key=key, fingerprint="fp", created_at=long_ago,
+            expires_at=long_ago + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        ))
+        db.commit()
+        taken = asyncio.run(begin(db, "test", key, "fp"))
+        assert taken.replay is None and taken.record.created_at > long_ago
+
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(begin(SessionLocal(), "test", key, "other"))
+        assert raised.value.status_code == 422
@@ -0,0 +1,60 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.document import Document
+from app.models.processing_job import JobStatus, ProcessingJob
+from app.services.job_lease import claim_job
+from app.services.ocr_service import process_ocr
+from app.services.scheduler import JobScheduler
+from app.services.scheduling_policy import SchedulingPolicy
+
+
+def _job(db, status, updated_at=None):
+    document = Document(
+        filename=f"{uuid.uuid4()}.pdf", original_filename="a.pdf", file_path="/nonexistent.pdf", file_size=1
+    )
+    db.add(document)
+    db.flush()
+    job = ProcessingJob(document_id=document.id, status=status, updated_at=updated_at or datetime.utcnow())
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def test_only_one_process_claims_a_job(client):
+    with SessionLocal() as db:
+        job_id = _job(db, JobStatus.PENDING)
+    with SessionLocal() as a, SessionLocal() as b:
+        seen_by_a = a.get(ProcessingJob, job_id)
+        seen_by_b = b.get(ProcessingJob, job_id)
+        assert claim_job(a, seen_by_a)
+        assert not claim_job(b, seen_by_b)
+        assert seen_by_b.status == JobStatus.PROCESSING and seen_by_b.attempts == 1
+
+
+def test_finished_and_leased_jobs_are_left_alone(client):
+    with SessionLocal() as db:
+        completed = _job(db, JobStatus.COMPLETED)
+        running = _job(db, JobStatus.PROCESSING)
+        for job_id, status in ((completed, JobStatus.COMPLETED), (running, JobStatus.PROCESSING)):
+            job = process_ocr(db, db.get(ProcessingJob, job_id).document_id, job_id)
+            assert job.status == status and job.attempts == 0
+
+
+def test_only_abandoned_processing_jobs_are_requeued(client):
+    long_ago = datetime.utcnow() - timedelta(seconds=2 * settings.JOB_LEASE_SECONDS)
+    with SessionLocal() as db:
+        pending = _job(db, JobStatus.PENDING)
+        abandoned = _job(db, JobStatus.PROCESSING, updated_at=long_ago)
+        leased = _job(db, JobStatus.PROCESSING)
+        completed = _job(db, JobStatus.COMPLETED, updated_at=long_ago)
+
+    scheduler = JobScheduler(SchedulingPolicy(), workers=0)
+    scheduler._recover()
+    queued = set()
+    while len(scheduler.policy):
+        queued.add(scheduler.policy.pop(0).job_id)
+    assert {pending, abandoned} <= queued
+    assert not {leased, completed} & queued
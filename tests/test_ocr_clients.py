@@ -0,0 +1,108 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pymupdf
+import pytest
+
+import BatchPdfConv
+from app.services.ocr_clients import FakeOCRClient, FakeOCRError, OCRClientPool
+
+DOCUMENT = {"type": "document_url", "document_url": "https://example.com/a.pdf"}
+
+
+def _process(pool):
+    return pool.ocr.process(model="m", document=DOCUMENT, pages=[0])
+
+
+def _usage(pool):
+    return {usage["name"]: usage for usage in pool.usage()}
+
+
+def test_requests_are_spread_over_keys():
+    pool = OCRClientPool([("a", FakeOCRClient(latency=0.05)), ("b", FakeOCRClient(latency=0.05))])
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: _process(pool), range(8)))
+    usage = _usage(pool)
+    assert usage["a"]["requests"] == usage["b"]["requests"] == 4
+    assert usage["a"]["in_flight"] == usage["b"]["in_flight"] == 0
+
+
+def test_throttled_key_is_quarantined_for_retry_after():
+    throttled = FakeOCRClient(latency=0, requests_per_second=0.1)
+    pool = OCRClientPool([("a", throttled), ("b", FakeOCRClient(latency=0))], quarantine_seconds=1)
+    _process(pool)  # a
+    _process(pool)  # b
+    with pytest.raises(FakeOCRError) as raised:
+        _process(pool)  # a again, over its rate
+    assert raised.value.status_code == 429
+
+    usage = _usage(pool)
+    assert usage["a"]["throttled"] == 1 and not usage["a"]["healthy"]
+    assert usage["a"]["quarantined_for"] > 1  # the Retry-After, not quarantine_seconds
+    for _ in range(3):
+        _process(pool)
+    assert _usage(pool)["b"]["requests"] == 4
+    assert throttled.calls == 2
+
+
+def test_failing_key_is_quarantined_after_max_failures():
+    pool = OCRClientPool(
+        [("bad", FakeOCRClient(latency=0, error_rate=1.0)), ("good", FakeOCRClient(latency=0))],
+        quarantine_seconds=60, max_failures=2
+    )
+    failures = 0
+    for _ in range(6):
+        try:
+            _process(pool)
+        except FakeOCRError as e:
+            assert e.status_code == 500
+            failures += 1
+    usage = _usage(pool)
+    assert failures == 2 and not usage["bad"]["healthy"]
+    assert usage["good"]["requests"] == 4 and usage["good"]["healthy"]
+
+
+class _ConcurrencyProbe(FakeOCRClient):
+    """Records the most requests running at once over all probes sharing ``state``."""
+
+    def __init__(self, state, **kwargs):
+        super().__init__(**kwargs)
+        self.state = state
+
+    def process(self, *args, **kwargs):
+        with self.state["lock"]:
+            self.state["running"] += 1
+            self.state["peak"] = max(self.state["peak"], self.state["running"])
+        try:
+            return super().process(*args, **kwargs)
+        finally:
+            with self.state["lock"]:
+                self.state["running"] -= 1
+
+
+def test_batch_converts_with_one_worker_per_key(tmp_path, monkeypatch):
+    doc_dir, export_dir = tmp_path / "docs", tmp_path / "exports"
+    doc_dir.mkdir()
+    for number in range(6):
+        pdf = pymupdf.open()
+        pdf.new_page()
+        pdf.save(str(doc_dir / f"scan{number}.pdf"))
+        pdf.close()
+    state = {"lock": threading.Lock(), "running": 0, "peak": 0}
+    pool = OCRClientPool([(name, _ConcurrencyProbe(state, latency=0.2)) for name in ("a", "b", "c")])
+    for name, value in {
+        "DOC_DIR": str(doc_dir), "EXPORT_DIR": str(export_dir), "DB_CSV": str(tmp_path / "db.csv"),
+        "CHECKPOINT_DIR": str(export_dir / ".checkpoints"), "RAW_DIR": str(export_dir / ".raw"),
+        "API_KEYS": ["a", "b", "c"], "ocr_client": pool, "REQUEST_INTERVAL": 0,
+        "UPLOAD_ONCE": False, "TEXT_LAYER_FAST_PATH": False,
+    }.items():
+        monkeypatch.setattr(BatchPdfConv, name, value)
+
+    BatchPdfConv.main()
+
+    assert sorted(name for name in os.listdir(export_dir) if name.endswith(".md")) == [
+        f"scan{number}.md" for number in range(6)
+    ]
+    assert [usage["requests"] for usage in pool.usage()] == [2, 2, 2]
+    assert state["peak"] == 3
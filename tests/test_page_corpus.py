@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from app.services.page_corpus import CorpusReader, CorpusWriter
+
+pytest.importorskip("pyarrow")
+
+
+def _pages(source):
+    return [(index, f"{source} page {index}") for index in range(3)]
+
+
+def _kill_after_adding(directory, sources):
+    """Add documents in a child process that dies without closing its writer."""
+    script = textwrap.dedent(f"""
+        import os
+        from app.services.page_corpus import CorpusWriter
+        writer = CorpusWriter({directory!r}, "parquet")
+        for source in {sources!r}:
+            writer.add_document(source, [(index, source + " page " + str(index)) for index in range(3)])
+        os._exit(1)
+    """)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=False)
+
+
+def test_parquet_documents_are_readable_before_the_shard_closes(tmp_path):
+    writer = CorpusWriter(str(tmp_path), "parquet")
+    writer.add_document("a.pdf", _pages("a.pdf"))
+    assert [page.markdown for page in CorpusReader(str(tmp_path)).pages("a.pdf")] == [
+        markdown for _, markdown in _pages("a.pdf")
+    ]
+    writer.close()
+    reader = CorpusReader(str(tmp_path))
+    assert reader.index["a.pdf"]["shard"].endswith(".parquet")
+    assert len(reader.pages("a.pdf")) == 3
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".pending.jsonl")]
+
+
+def test_parquet_documents_survive_a_crash(tmp_path):
+    _kill_after_adding(str(tmp_path), ["a.pdf", "b.pdf"])
+    assert CorpusReader(str(tmp_path)).sources() == ["a.pdf", "b.pdf"]
+
+    with CorpusWriter(str(tmp_path), "parquet") as writer:
+        writer.add_document("c.pdf", _pages("c.pdf"))
+    reader = CorpusReader(str(tmp_path))
+    assert reader.sources() == ["a.pdf", "b.pdf", "c.pdf"]
+    for source in reader.sources():
+        assert reader.index[source]["shard"].endswith(".parquet")
+        assert [page.markdown for page in reader.pages(source)] == [markdown for _, markdown in _pages(source)]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".pending.jsonl")]
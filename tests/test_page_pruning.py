@@ -0,0 +1,43 @@
+import pymupdf
+import pytest
+
+from app.services.page_pruning import find_prunable_pages
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    def build(pages):
+        doc = pymupdf.open()
+        for text, fontsize in pages:
+            page = doc.new_page()
+            if text:
+                page.insert_text((72, 720), text, fontsize=fontsize)
+        path = tmp_path / "doc.pdf"
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+    return build
+
+
+def test_short_lines_are_not_blank(pdf_path):
+    path = pdf_path([("Chapter 3", 11), ("Signed: J. Smith", 11), ("1. A footnote.", 9)])
+    assert find_prunable_pages(path) == {}
+
+
+def test_low_dpi_is_raised(pdf_path):
+    path = pdf_path([("1. A footnote.", 9)])
+    assert find_prunable_pages(path, dpi=24) == {}
+
+
+def test_empty_pages_are_blank(pdf_path):
+    path = pdf_path([("Chapter 3", 11), (None, 0), (None, 0)])
+    pruned = find_prunable_pages(path)
+    assert sorted(pruned) == [1, 2]
+    assert all(page.reason == "blank" for page in pruned.values())
+
+
+def test_repeated_pages_are_duplicates(pdf_path):
+    path = pdf_path([("Chapter 3", 11), ("Chapter 4", 11), ("Chapter 3", 11)])
+    pruned = find_prunable_pages(path)
+    assert list(pruned) == [2]
+    assert (pruned[2].reason, pruned[2].duplicate_of) == ("duplicate", 0)
@@ -0,0 +1,86 @@
+"""Every budgeted endpoint, called with a cold status cache, stays within ENDPOINT_BUDGETS."""
+import pymupdf
+import pytest
+
+from app.core.query_stats import QueryStats
+from app.db.session import SessionLocal
+from app.models.processing_job import JobStatus, ProcessingJob
+from app.services.status_cache import status_cache
+from app.testing.query_budget import ENDPOINT_BUDGETS, QueryBudget
+
+API = "/api/v1"
+
+
+def _upload(client, tmp_path, name="scan.pdf", pages=3):
+    doc = pymupdf.open()
+    for _ in range(pages):
+        doc.new_page()
+    path = tmp_path / name
+    doc.save(str(path))
+    doc.close()
+    with open(path, "rb") as pdf:
+        response = client.post(f"{API}/documents/upload", files={"file": (name, pdf, "application/pdf")})
+    assert response.status_code == 201
+    return response.json()
+
+
+@pytest.fixture
+def completed_job(client, tmp_path):
+    document = _upload(client, tmp_path)
+    assert client.post(f"{API}/ocr/process", json={"document_id": document["id"]}).status_code == 200
+    job = client.get(f"{API}/jobs/document/{document['id']}").json()[0]
+    return document, job
+
+
+@pytest.fixture
+def running_job(client, tmp_path):
+    document = _upload(client, tmp_path, name="running.pdf")
+    with SessionLocal() as db:
+        job = ProcessingJob(document_id=document["id"], status=JobStatus.PROCESSING)
+        db.add(job)
+        db.commit()
+        return document, job.id
+
+
+def test_upload_and_process(client, tmp_path, query_budget):
+    document = _upload(client, tmp_path, pages=16)
+    assert client.post(f"{API}/ocr/process", json={"document_id": document["id"]}).status_code == 200
+    response = client.post(f"{API}/ocr/process-async", json={"document_id": document["id"]})
+    assert response.status_code == 202
+    assert {endpoint for endpoint, _ in query_budget.requests} == {
+        f"POST {API}/documents/upload", f"POST {API}/ocr/process", f"POST {API}/ocr/process-async"
+    }
+
+
+def test_reads_of_a_completed_job(client, completed_job, query_budget):
+    document, job = completed_job
+    for path in (
+        f"{API}/jobs/{job['id']}",
+        f"{API}/jobs/{job['id']}/status",
+        f"{API}/jobs/{job['id']}/pages",
+        f"{API}/jobs/document/{document['id']}",
+        f"{API}/documents/",
+        f"{API}/documents/{document['id']}",
+        f"{API}/search/?q=page",
+    ):
+        status_cache.invalidate(job["id"])
+        assert client.get(path).status_code == 200, path
+
+
+def test_polling_a_running_job(client, running_job, query_budget):
+    _, job_id = running_job
+    for _ in range(3):
+        status_cache.invalidate(job_id)
+        assert client.get(f"{API}/jobs/{job_id}/status").json()["status"] == "processing"
+        assert client.get(f"{API}/jobs/{job_id}").status_code == 200
+
+
+def test_over_budget_requests_are_reported():
+    budget = QueryBudget(ENDPOINT_BUDGETS)
+    budget(f"GET {API}/jobs/{{job_id}}", QueryStats(queries=5, statements=["SELECT 1"] * 5))
+    budget(f"GET {API}/documents/", QueryStats(queries=1))
+    violations = budget.violations()
+    assert len(violations) == 1
+    assert "5 queries (budget 1)" in violations[0]
+    with pytest.raises(pytest.fail.Exception):
+        budget.check()
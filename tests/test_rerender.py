@@ -0,0 +1,79 @@
+import os
+import time
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.ocr_page import OCRPage, PageSource
+from app.services.cpu_tasks import RerenderTask, rerender_job
+from app.services.export_cache import export_cache
+from app.services.export_renderer import assemble_markdown
+from app.services.ocr_service import raw_archive_path
+from app.services.raw_archive import append_pages, read_records
+from app.services.rerender import rerender_jobs
+
+API = "/api/v1"
+
+
+def test_rerender_runs_in_the_background(client, completed_job, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    job = completed_job("archived.pdf")
+
+    response = client.post(f"{API}/admin/rerender", json={"job_ids": [job["id"]], "formats": ["docx"]}, headers=headers)
+    assert response.status_code == 202
+    run = response.json()
+    assert run["total"] == 1
+    deadline = time.monotonic() + 10
+    while run["state"] == "running" and time.monotonic() < deadline:
+        time.sleep(0.05)
+        run = client.get(f"{API}/admin/rerender/{run['id']}", headers=headers).json()
+
+    assert run["state"] == "completed" and run["jobs"] == 1 and run["failed"] == 0
+    assert run["next_after_job_id"] is None
+    cached = [name for name in os.listdir(export_cache.directory) if name.startswith(f"job-{job['id']}-")]
+    assert cached == [name for name in cached if name.endswith(".docx")] and cached
+    assert not [name for name in os.listdir(export_cache.directory) if name.startswith(".tmp-")]
+    assert client.get(f"{API}/admin/rerender/{run['id'] + 1}", headers=headers).status_code == 404
+
+
+def test_pages_that_skip_ocr_are_archived(completed_job, monkeypatch):
+    monkeypatch.setattr(settings, "PAGE_PRUNING_ENABLED", True)
+    job = completed_job("blank.pdf", pages=2)
+
+    records = read_records(raw_archive_path(job["id"]))
+    assert {index: record["source"] for index, record in records.items()} == {0: "blank", 1: "blank"}
+
+
+def test_duplicates_are_rebuilt_from_the_page_they_repeat(completed_job):
+    job = completed_job("repeated.pdf", pages=3)
+    archive_path = raw_archive_path(job["id"])
+    os.remove(archive_path)
+    append_pages(archive_path, [{"index": 0, "markdown": "zero"}, {"index": 1, "markdown": "one"}])
+    append_pages(archive_path, [{"index": 2, "duplicate_of": 1}], source="duplicate")
+    with SessionLocal() as db:
+        # Pages 0 and 1 were OCR'd to the same markdown; page 2 repeats page 1
+        for page in db.query(OCRPage).filter(OCRPage.job_id == job["id"]):
+            page.markdown = "same"
+            if page.page_index == 2:
+                page.source = PageSource.DUPLICATE
+        db.commit()
+
+        stats = rerender_jobs(db, [job["id"]])
+        pages = db.query(OCRPage).filter(OCRPage.job_id == job["id"]).order_by(OCRPage.page_index)
+        assert stats.jobs == 1
+        assert [page.markdown for page in pages] == ["zero", "one", "one"]
+
+
+def test_only_changed_pages_come_back_from_the_worker(tmp_path):
+    archive_path = str(tmp_path / "job.pages.jsonl.gz")
+    append_pages(archive_path, [{"index": 0, "markdown": "kept"}, {"index": 1, "markdown": "new"}])
+    task = RerenderTask(
+        job_id=1, archive_path=archive_path, title="t",
+        stored_pages={0: "kept", 1: "old", 2: "not archived"}
+    )
+
+    result = rerender_job(task)
+
+    assert result.error is None and result.archived_pages == 2
+    assert result.changed == {1: "new"}
+    assert result.markdown == assemble_markdown([(0, "kept"), (1, "new"), (2, "not archived")])
@@ -0,0 +1,100 @@
+import uuid
+
+from app.db.session import SessionLocal
+from app.models.document import Document
+from app.models.processing_job import JobStatus, ProcessingJob
+from app.services.scheduler import JobScheduler
+from app.services.scheduling_policy import QueuedJob, SchedulingPolicy
+
+
+def _queued(job_id, client_id="a", priority=0, size=1.0, enqueued_at=0.0):
+    return QueuedJob(job_id, job_id, client_id, priority=priority, size=size, enqueued_at=enqueued_at)
+
+
+def _drain(policy, now):
+    order = []
+    while len(policy):
+        order.append(policy.pop(now).job_id)
+    return order
+
+
+def test_higher_priority_runs_first_and_ties_run_in_order():
+    policy = SchedulingPolicy(fair_share_weight=0)
+    for job in (_queued(1), _queued(2, priority=5), _queued(3), _queued(4, priority=5)):
+        policy.push(job)
+    assert _drain(policy, now=0) == [2, 4, 1, 3]
+    assert policy.pop(now=0) is None
+
+
+def test_waiting_jobs_age_past_newer_higher_priority_ones():
+    policy = SchedulingPolicy(aging_per_minute=1, fair_share_weight=0)
+    policy.push(_queued(1, enqueued_at=0))
+    policy.push(_queued(2, priority=5, enqueued_at=60))
+    assert policy.pop(now=60).job_id == 2  # waited one minute: 1 < 5
+
+    policy = SchedulingPolicy(aging_per_minute=1, fair_share_weight=0)
+    policy.push(_queued(1, enqueued_at=0))
+    policy.push(_queued(2, priority=5, enqueued_at=600))
+    assert policy.pop(now=600).job_id == 1  # waited ten minutes: 10 > 5
+
+
+def test_recent_service_penalizes_a_client_until_it_decays():
+    policy = SchedulingPolicy(aging_per_minute=0, fair_share_weight=1, usage_half_life=60)
+    policy.push(_queued(1, client_id="bulk", priority=3))
+    first = policy.pop(now=0)
+    policy.finish(first, service_seconds=600, now=0)  # ten minutes of OCR
+    policy.push(_queued(2, client_id="bulk", priority=3))
+    policy.push(_queued(3, client_id="light"))
+    assert policy.pop(now=0).job_id == 3
+
+    policy.push(_queued(4, client_id="light"))
+    running = policy.pop(now=0)  # bulk's penalty is 10, light's one running job counts 1
+    assert running.job_id == 4
+    policy.finish(running, service_seconds=0, now=0)
+    policy.push(_queued(5, client_id="light"))
+    # Five half-lives later bulk's usage is 10/32 minutes, below its priority lead
+    assert policy.pop(now=300).job_id == 2
+
+
+def test_shortest_job_first_prefers_small_documents():
+    jobs = [_queued(1, size=100), _queued(2, size=1), _queued(3, size=10)]
+    fifo = SchedulingPolicy(fair_share_weight=0)
+    sjf = SchedulingPolicy(fair_share_weight=0, shortest_job_first=True)
+    for job in jobs:
+        fifo.push(job)
+        sjf.push(job)
+    assert _drain(fifo, now=0) == [1, 2, 3]
+    assert _drain(sjf, now=0) == [2, 3, 1]
+
+
+def _pending_job(db, priority, client_id):
+    document = Document(
+        filename=f"{uuid.uuid4()}.pdf", original_filename="a.pdf", file_path="/nonexistent.pdf",
+        file_size=1, page_count=1
+    )
+    db.add(document)
+    db.flush()
+    job = ProcessingJob(document_id=document.id, status=JobStatus.PENDING, priority=priority, client_id=client_id)
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def test_pending_jobs_are_requeued_in_policy_order_after_a_restart(client):
+    with SessionLocal() as db:
+        low = _pending_job(db, priority=0, client_id="a")
+        high = _pending_job(db, priority=9, client_id="b")
+
+    scheduler = JobScheduler(SchedulingPolicy(fair_share_weight=0), workers=0)
+    scheduler._recover()
+    order = [job_id for job_id in _drain(scheduler.policy, now=0) if job_id in (low, high)]
+    assert order == [high, low]
+
+    # Polling only queues jobs created since
+    scheduler._recover(new_only=True)
+    assert len(scheduler.policy) == 0
+    with SessionLocal() as db:
+        new = _pending_job(db, priority=0, client_id="a")
+    scheduler._recover(new_only=True)
+    queued = scheduler.policy.pop(now=0)
+    assert (queued.job_id, queued.client_id, queued.size) == (new, "a", 1.0)
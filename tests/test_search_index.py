@@ -0,0 +1,68 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models.document import Document
+from app.models.ocr_page import OCRPage, PageSource
+from app.models.processing_job import JobStatus, ProcessingJob
+from app.services.arabic_text import tokenize
+from app.services.search_index import build_snippet, ensure_search_index, index_document_pages, search_pages
+
+PAGE = "## المقدمة\n\nكَتَبَ الطالبُ رسالةً طويلة إلى المدرسة في Paris."
+
+
+def test_snippet_keeps_the_original_text():
+    snippet = build_snippet(PAGE, tokenize("رساله مدرسه paris"))
+    assert "<mark>رسالةً</mark>" in snippet
+    assert "<mark>Paris</mark>" in snippet
+    assert "كَتَبَ الطالبُ" in snippet
+    assert "المدرسة" in snippet and "<mark>المدرسة</mark>" not in snippet  # the article makes it another word
+
+
+def test_snippet_is_cut_around_the_first_match():
+    words = [f"w{i}" for i in range(100)]
+    snippet = build_snippet(" ".join(words), ["w50"], words=8)
+    assert snippet == "…w48 w49 <mark>w50</mark> w51 w52 w53 w54 w55…"
+
+
+def test_snippet_escapes_the_page_text():
+    snippet = build_snippet('Paris <script>alert("x")</script> & <b>Paris</b>', ["paris", "script"])
+    assert "<script>" not in snippet and "<b>" not in snippet
+    assert snippet.startswith("<mark>Paris</mark> &lt;")
+    assert "&amp;" in snippet and "<mark>script</mark>" in snippet
+
+
+def test_search_shows_the_page_as_ocrd(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/search.db")
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    with Session(engine) as db:
+        index_document_pages(db, 1, 1, [(0, PAGE)])
+        [hit] = search_pages(db, "رساله")
+    assert "<mark>رسالةً</mark>" in hit.snippet
+    assert "كَتَبَ" in hit.snippet
+
+
+def test_index_without_original_text_is_upgraded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE search_pages USING fts5("
+            "content, job_id UNINDEXED, document_id UNINDEXED, page_index UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            "INSERT INTO search_pages (rowid, content, job_id, document_id, page_index) "
+            "VALUES (100000, :content, 1, 1, 0)"
+        ), {"content": " ".join(tokenize(PAGE))})
+    with Session(engine) as db:
+        document = Document(filename="a.pdf", original_filename="a.pdf", file_path="a.pdf", file_size=1)
+        job = ProcessingJob(document=document, status=JobStatus.COMPLETED)
+        db.add(OCRPage(job=job, page_index=0, source=PageSource.OCR, markdown=PAGE))
+        db.commit()
+
+    ensure_search_index(engine)
+    with Session(engine) as db:
+        [hit] = search_pages(db, "رساله")
+    assert "<mark>رسالةً</mark>" in hit.snippet
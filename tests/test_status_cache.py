@@ -0,0 +1,56 @@
+import os
+from datetime import datetime
+
+from app.db.session import SessionLocal
+from app.models.processing_job import JobStatus, ProcessingJob
+from app.services.status_cache import FULL, FileBackend, MemoryBackend, StatusCache, status_cache
+from app.services.storage_sweeper import StorageSweeper
+
+API = "/api/v1"
+
+
+def test_views_with_markdown_are_not_cached(client, completed_job):
+    job = completed_job("cached.pdf")
+    assert client.get(f"{API}/jobs/{job['id']}").json()["markdown_content"]
+    assert status_cache.get(job["id"], FULL) is None
+
+
+def test_running_job_views_are_cached(client, completed_job):
+    job = completed_job("cached.pdf")
+    with SessionLocal() as db:
+        running = ProcessingJob(document_id=job["document_id"], status=JobStatus.PROCESSING)
+        db.add(running)
+        db.commit()
+        running_id = running.id
+    client.get(f"{API}/jobs/{running_id}")
+    assert status_cache.get(running_id, FULL)["status"] == "processing"
+
+
+def test_output_path_changes_invalidate(client, completed_job):
+    job = completed_job("cached.pdf")
+    os.remove(job["output_path"])
+    status_cache.put(job["id"], FULL, JobStatus.COMPLETED, {"stale": True})
+    with SessionLocal() as db:
+        StorageSweeper(batch_size=10000)._sweep_jobs(db, datetime.utcnow())
+    assert status_cache.get(job["id"], FULL) is None
+    assert client.get(f"{API}/jobs/{job['id']}").json()["output_path"] is None
+
+    status_cache.put(job["id"], FULL, JobStatus.COMPLETED, {"stale": True})
+    assert client.get(f"{API}/jobs/{job['id']}/download").status_code == 200
+    assert status_cache.get(job["id"], FULL) is None
+    assert os.path.exists(client.get(f"{API}/jobs/{job['id']}").json()["output_path"])
+
+
+def _cached_ttls(backend):
+    """TTLs a StatusCache over ``backend`` gives completed and failed views."""
+    ttls = {}
+    backend.set = lambda key, value, ttl: ttls.__setitem__(key, ttl)
+    cache = StatusCache(backend, ttl=2.0)
+    cache.put(1, FULL, JobStatus.COMPLETED, {})
+    cache.put(2, FULL, JobStatus.FAILED, {})
+    return ttls
+
+
+def test_only_completed_views_on_a_shared_backend_never_expire(tmp_path):
+    assert _cached_ttls(MemoryBackend()) == {"job:1:full": 2.0, "job:2:full": 2.0}
+    assert _cached_ttls(FileBackend(str(tmp_path))) == {"job:1:full": None, "job:2:full": 2.0}
@@ -0,0 +1,73 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.document import Document, DocumentStatus
+from app.models.processing_job import JobStatus, ProcessingJob
+from app.services.bulk_import import link_file
+from app.services.storage_sweeper import StorageSweeper
+
+
+def _old_file(path):
+    with open(path, "wb") as pdf:
+        pdf.write(b"%PDF-1.7")
+    old = os.path.getmtime(path) - 10 * settings.SWEEPER_ORPHAN_GRACE_SECONDS
+    os.utime(path, (old, old))
+
+
+def test_fresh_hardlink_of_an_old_file_is_kept(client, tmp_path):
+    source = str(tmp_path / "archived.pdf")
+    _old_file(source)
+    upload = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4()}.pdf")
+    assert link_file(source, upload, "hardlink") == "hardlink"
+    assert os.path.getmtime(upload) < os.path.getmtime(source) + 1  # the link shares the old mtime
+
+    with SessionLocal() as db:
+        StorageSweeper(batch_size=10000)._sweep_uploads(db)
+    assert os.path.exists(upload)
+    os.remove(upload)
+
+
+def _failed_document(db, *job_statuses):
+    """Add a document that failed long ago, with jobs in the given statuses."""
+    long_ago = datetime.utcnow() - timedelta(days=365)
+    document = Document(
+        filename=f"{uuid.uuid4()}.pdf", original_filename="old.pdf", file_path="/nonexistent.pdf",
+        file_size=1, status=DocumentStatus.FAILED, updated_at=long_ago
+    )
+    db.add(document)
+    db.flush()
+    jobs = [ProcessingJob(document_id=document.id, status=status, updated_at=long_ago) for status in job_statuses]
+    db.add_all(jobs)
+    db.commit()
+    return document.id, [job.id for job in jobs]
+
+
+def _sweep_rows(db):
+    sweeper = StorageSweeper(batch_size=10000)
+    now = datetime.utcnow()
+    sweeper._sweep_documents(db, now)
+    sweeper._sweep_jobs(db, now)
+
+
+def test_failed_retention_is_opt_in(client, monkeypatch):
+    monkeypatch.setattr(settings, "SWEEPER_ORPHAN_GRACE_SECONDS", 10 ** 9)
+    with SessionLocal() as db:
+        document_id, job_ids = _failed_document(db, JobStatus.FAILED)
+        _sweep_rows(db)
+        assert db.get(Document, document_id) is not None
+        assert db.get(ProcessingJob, job_ids[0]) is not None
+
+
+def test_failed_retention_keeps_completed_results(client, monkeypatch):
+    monkeypatch.setattr(settings, "RETENTION_FAILED_DAYS", 30)
+    with SessionLocal() as db:
+        kept_id, (completed_id, failed_id) = _failed_document(db, JobStatus.COMPLETED, JobStatus.FAILED)
+        purged_id, _ = _failed_document(db, JobStatus.FAILED, JobStatus.FAILED)
+        _sweep_rows(db)
+        assert db.get(Document, kept_id) is not None
+        assert db.get(ProcessingJob, completed_id) is not None
+        assert db.get(ProcessingJob, failed_id) is None
+        assert db.get(Document, purged_id) is None
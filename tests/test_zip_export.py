@@ -0,0 +1,40 @@
+import io
+import os
+import zipfile
+
+from app.db.session import SessionLocal
+from app.models.processing_job import ProcessingJob
+from app.services.zip_export import job_export_entries, stream_zip
+
+
+def test_unreadable_export_is_listed_as_missing(client, completed_job):
+    kept = completed_job("kept.pdf")
+    broken = completed_job("broken.pdf")
+    os.remove(broken["output_path"])
+    os.mkdir(broken["output_path"])  # exists, but cannot be read as a file
+
+    data = b"".join(stream_zip(job_export_entries([broken["id"], kept["id"]])))
+    os.rmdir(broken["output_path"])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == [f"kept_{kept['id']}.md", "MISSING.txt"]
+        assert f"job {broken['id']}" in archive.read("MISSING.txt").decode("utf-8")
+
+
+def test_markdown_is_loaded_only_to_rewrite_an_export(client, completed_job):
+    jobs = [completed_job(name) for name in ("present.pdf", "evicted.pdf")]
+    os.remove(jobs[1]["output_path"])
+    sessions = []
+
+    def session_factory():
+        sessions.append(SessionLocal())
+        return sessions[-1]
+
+    entries = job_export_entries([job["id"] for job in jobs], session_factory=session_factory)
+    for job, (name, source, _) in zip(jobs, entries):
+        with source:
+            assert source.read()
+        stored = sessions[0].get(ProcessingJob, job["id"])
+        assert ("markdown_content" in stored.__dict__) == (job is jobs[1])
+    entries.close()